@@ -1,24 +1,58 @@
 from flask_openapi3 import OpenAPI, Info, Tag
-from flask import redirect, jsonify
+from flask import redirect, jsonify, Response, stream_with_context, send_file, request, g
 from flask import Flask
 
 from model import *
-from logger import logger
+from logger import logger, id_requisicao
 from schemas import *
 from flask_cors import CORS
 from sqlalchemy import desc
 from datetime import datetime
+import json
+import os
+import time
+import uuid
 
 app = Flask(__name__)
 
 # Instanciando o objeto OpenAPI
 info = Info(title="API de Análise de sentimentos em textos.", version="1.0.0")
 app = OpenAPI(__name__, info=info)
-CORS(app)
+CORS(app, expose_headers=["X-Proximo-Cursor", "X-Request-ID", "ETag"])
 
 # Definindo tags para agrupamento das rotas
 home_tag = Tag(name="Documentação", description="Seleção de documentação: Swagger, Redoc ou RapiDoc")
 review_tag = Tag(name="Review", description="Adição, visualização, remoção e análise de sentimentos em textos.")
+estatisticas_tag = Tag(name="Estatísticas", description="Estatísticas de carga e de execução dos modelos no worker")
+job_tag = Tag(name="Job", description="Análise em segundo plano de grandes volumes de textos, com acompanhamento do progresso")
+
+# Quantidade máxima de textos aceitos por requisição na rota de lote
+TAMANHO_MAXIMO_LOTE = int(os.environ.get("TAMANHO_MAXIMO_LOTE", 1000))
+# Quantidade máxima de reviews (ou ids) aceitos por requisição nas rotas de importação e remoção em lote
+TAMANHO_MAXIMO_IMPORTACAO = int(os.environ.get("TAMANHO_MAXIMO_IMPORTACAO", 10000))
+# Quantidade de reviews lidos da base por vez na listagem em streaming
+TAMANHO_BLOCO_STREAM = int(os.environ.get("TAMANHO_BLOCO_STREAM", 500))
+
+# Executor dos jobs de análise em lote, com pool de processos próprio em cada worker
+executor_jobs = ExecutorJobs(Session, os.path.join(db_path, "jobs"))
+# Jobs interrompidos com o término da execução anterior da aplicação
+jobs_orfaos = executor_jobs.recupera_orfaos()
+if jobs_orfaos:
+    logger.warning("%d jobs interrompidos marcados com erro", jobs_orfaos)
+
+# Divide os núcleos entre os workers (CPU_WORKERS) e limita as threads do torch, do BLAS, do
+# scikit-learn e do spaCy antes de carregar qualquer modelo; com o gunicorn, é reaplicado em cada worker
+RecursosCPU.aplica()
+
+# Carrega e aquece os modelos informados em AQUECER_MODELOS antes de atender requisições.
+# Com o preload do gunicorn (gunicorn.conf.py), o processo principal apenas carrega os
+# artefatos, que ficam compartilhados com os workers, e a inferência de teste é feita após o fork.
+modelos_aquecimento = Analisador.modelos_para_aquecer()
+if modelos_aquecimento is None or modelos_aquecimento:
+    logger.info("Aquecendo modelos: %s", ", ".join(modelos_aquecimento or ["todos"]))
+    inferencia = os.environ.get("AQUECER_SEM_INFERENCIA", "0") != "1"
+    for tipo, estatisticas in Analisador.aquecer(modelos_aquecimento, inferencia=inferencia).items():
+        logger.info("Modelo %s carregado em %.2fs (%.1f MB)", tipo, estatisticas["tempo_carga_s"], estatisticas["memoria_mb"])
 
 # Rota home
 @app.get('/', tags=[home_tag])
@@ -28,37 +62,174 @@ def home():
     return redirect('/openapi')
 
 
+@app.before_request
+def inicia_medicao():
+    """Identifica a requisição nos logs (cabeçalho X-Request-ID ou um novo id) e passa a medir as suas etapas."""
+    g.inicio_requisicao = time.perf_counter()
+    g.id_requisicao = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.token_id_requisicao = id_requisicao.set(g.id_requisicao)
+    g.token_etapas = Metricas.inicia_requisicao()
+
+
+@app.after_request
+def registra_requisicao(response):
+    """Conta a requisição e registra a sua duração nas métricas, por rota (a regra, não a URL),
+    e no log, em nível DEBUG, com a duração de cada etapa.
+    """
+    rota = request.url_rule.rule if request.url_rule else "desconhecida"
+    Metricas.REQUISICOES.labels(request.method, rota, response.status_code).inc()
+    if "inicio_requisicao" in g:
+        duracao = time.perf_counter() - g.inicio_requisicao
+        Metricas.DURACAO_REQUISICAO.labels(request.method, rota).observe(duracao)
+        etapas = Metricas.finaliza_requisicao(g.pop("token_etapas"))
+        logger.debug("%s %s %d em %.1fms", request.method, rota, response.status_code, duracao * 1000,
+                     extra={"duracao_ms": round(duracao * 1000, 2),
+                            "etapas_ms": {etapa: round(valor * 1000, 2) for etapa, valor in etapas.items()}})
+        response.headers["X-Request-ID"] = g.id_requisicao
+    return response
+
+
+@app.teardown_request
+def finaliza_medicao(erro=None):
+    if "token_etapas" in g:
+        Metricas.finaliza_requisicao(g.pop("token_etapas"))
+    if "token_id_requisicao" in g:
+        id_requisicao.reset(g.pop("token_id_requisicao"))
+
+
 # Rota de listagem de reviews
 @app.get('/review', tags=[review_tag], responses={"200": ListaReviewsSchema, "404": ErrorSchema})
 def get_reviews(query: BuscaReviewSchema):
     """Faz a busca por todos os reviews ou filtra dependendo dos parametros passados
     Retorna uma representação da listagem de reviews.
+
+    Com `limit`, retorna no máximo `limit` reviews e, se houver mais, o cursor da próxima
+    página no cabeçalho X-Proximo-Cursor, que deve ser enviado no parâmetro `cursor`.
+    Com `stream`, os reviews são lidos da base em blocos e o JSON é enviado aos poucos.
+    Sem `stream`, a resposta traz o ETag da versão atual dos reviews: com o mesmo valor em
+    If-None-Match, retorna 304 sem corpo; e respostas já geradas nesta versão vêm do cache.
     """     
     #filtro condicional por id,texto,sentimento e modelo do review 
     filtros = []
     if query.id:
         filtros.append(Review.id == query.id)    
     if query.texto:
-        filtros.append(Review.texto.ilike(f'%{query.texto}%'))
+        filtros.append(IndiceTextual.filtro(query.texto))
     if query.sentimento:
         filtros.append(Review.sentimento == query.sentimento)       
     if query.modelo:
         filtros.append(Review.modelo == query.modelo)       
-        
+    if query.cursor:
+        try:
+            filtros.append(RepositorioReview.filtro_cursor(query.cursor))
+        except ValueError:
+            error_msg = "Cursor inválido"
+            logger.warning("Erro ao buscar reviews com o cursor '%s', %s", query.cursor, error_msg)
+            return {"error": error_msg}, 200
+
+    limite = max(query.limit, 1) if query.limit else None
+    ordenacao = [desc(Review.data_criacao), desc(Review.id)]
+
+    if query.stream:
+        logger.debug("Enviando reviews em streaming")
+        return Response(stream_with_context(gera_reviews_json(filtros, ordenacao, limite)), mimetype='application/json')
+
     logger.debug("Coletando dados sobre todos os reviews")
     # Criando conexão com a base
     session = Session()
+    # A resposta guardada e a que o cliente já tem (ETag) só valem na versão atual da tabela reviews
+    chave = CacheRespostas.chave(query.model_dump())
+    versao = CacheRespostas.versao(session)
+    etag = CacheRespostas.etag(chave, versao)
+    validacao = {"ETag": etag, "Cache-Control": "no-cache"}
+    if CacheRespostas.nao_modificado(request.headers.get("If-None-Match"), etag):
+        session.close()
+        return Response(status=304, headers=validacao)
+    guardada = CacheRespostas.busca(chave, versao)
+    if guardada:
+        session.close()
+        corpo, cabecalhos = guardada
+        return Response(corpo, mimetype='application/json', headers={**cabecalhos, **validacao})
+
     # Buscando todos os reviews utilizando filtros, se informados.
-    reviews = session.query(Review).filter(*filtros).order_by(desc(Review.data_criacao)).all() 
+    consulta = session.query(Review).filter(*filtros).order_by(*ordenacao)
+    if limite:
+        # Um review a mais indica se existe uma próxima página
+        consulta = consulta.limit(limite + 1)
+    reviews = consulta.all() 
     # Fechando a conexão
     session.close()
     
+    cabecalhos = {}
     if not reviews:
         # Se não houver reviews, retorna uma lista vazia
-        return {}, 200
+        resposta = jsonify({})
     else:
-        logger.debug(f"%d reviews econtrados" % len(reviews))
-        return jsonify(apresenta_reviews(reviews)), 200
+        if limite and len(reviews) > limite:
+            reviews = reviews[:limite]
+            cabecalhos["X-Proximo-Cursor"] = RepositorioReview.codifica_cursor(reviews[-1])
+        logger.debug("%d reviews econtrados", len(reviews))
+        resposta = jsonify(apresenta_reviews(reviews))
+    CacheRespostas.grava(chave, versao, resposta.get_data(), cabecalhos)
+    resposta.headers.update({**cabecalhos, **validacao})
+    return resposta
+
+
+def gera_reviews_json(filtros: list, ordenacao: list, limite: int = None):
+    """Gera a listagem de reviews em JSON aos poucos, lendo a base em blocos de
+    TAMANHO_BLOCO_STREAM reviews, de forma que a memória usada não depende do total.
+    """
+    session = Session()
+    try:
+        consulta = session.query(Review).filter(*filtros).order_by(*ordenacao)
+        if limite:
+            consulta = consulta.limit(limite)
+
+        yield "["
+        separador = ""
+        for review in consulta.yield_per(TAMANHO_BLOCO_STREAM):
+            yield separador + json.dumps(apresenta_review(review))
+            separador = ","
+        yield "]"
+    finally:
+        session.close()
+
+
+# Rota do resumo de sentimentos
+@app.get('/review/stats', tags=[review_tag], responses={"200": ResumoSchema, "404": ErrorSchema})
+def get_resumo_reviews(query: BuscaResumoSchema):
+    """Retorna a quantidade de reviews positivos e negativos por período e modelo
+    Lida da tabela de resumo mantida a cada inserção e remoção, sem percorrer os reviews.
+
+    Args:
+        granularidade (str): dia, semana, mes, ano ou total
+        modelo (str): filtra um tipo de modelo
+        inicio (str): primeiro dia considerado (AAAA-MM-DD)
+        fim (str): último dia considerado (AAAA-MM-DD)
+
+    Returns:
+        dict: contagem de reviews de cada período e modelo
+    """
+    for data in (query.inicio, query.fim):
+        if data:
+            try:
+                datetime.strptime(data, "%Y-%m-%d")
+            except ValueError:
+                error_msg = "Data inválida, use o formato AAAA-MM-DD"
+                logger.warning("Erro ao consultar o resumo de sentimentos com a data '%s', %s", data, error_msg)
+                return {"error": error_msg}, 200
+
+    session = Session()
+    try:
+        periodos = ResumoSentimentos.consulta(session, query.granularidade, query.modelo, query.inicio, query.fim)
+    except ValueError:
+        error_msg = "Granularidade não suportada"
+        logger.warning("Erro ao consultar o resumo de sentimentos com a granularidade '%s', %s", query.granularidade, error_msg)
+        return {"error": error_msg}, 200
+    finally:
+        session.close()
+
+    return {"granularidade": query.granularidade, "periodos": periodos}, 200
 
 
 # Rota de adição de review
@@ -80,66 +251,161 @@ def add_review(form: ReviewSchema):
     texto = form.texto  
     tipo_modelo = form.modelo
 
-    if tipo_modelo not in [TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_SCIKIT_LEARN, TipoModelo.MODEL_TRANSFORMERS]:
+    if tipo_modelo not in TipoModelo.todos():
         error_msg = "Tipo de modelo não suportado"
-        logger.warning(f"Erro ao selecionar o tipo de modelo do review '{tipo_modelo}', {error_msg}")
+        logger.warning("Erro ao selecionar o tipo de modelo do review '%s', %s", tipo_modelo, error_msg)
+        Metricas.ERROS.labels("/review", "invalido").inc()
         return {"error": error_msg}, 200  
     
     if not texto:
         error_msg = "Texto do review não informado"
-        logger.warning(f"Erro ao adicionar review '{texto}', {error_msg}")
+        logger.warning("Erro ao adicionar review '%s', %s", texto, error_msg)
+        Metricas.ERROS.labels("/review", tipo_modelo).inc()
         return {"error": error_msg}, 200    
     
-    # Vetorizando e limpando o texto
-    preprocessador = PreProcessadorFactory.cria_preprocessador(tipo_modelo)    
-    X_input = preprocessador.preparar_textos(texto)
-    
-    # Carregando modelo 
-    model = ModelFactory.cria_modelo(tipo_modelo)
-
-    # Realizando a predição
-    sentimento = int(model.realizar_predicao(X_input)[0])
-    
-    review = Review(
-        texto=texto,
-        sentimento=sentimento,
-        modelo=tipo_modelo,
-        data_criacao=datetime.now()
-    )
-
-    logger.debug(f"Adicionando review : '{review.texto}'")
+    logger.debug("Adicionando review : '%s'", texto)
     
     try:
         # Criando conexão com a base
         session = Session()
         
-        # Checando se review já existe na base
+        # Checando se review já existe na base antes de realizar a predição
         filtros = []
         filtros.append(Review.texto == texto)
         filtros.append(Review.modelo == tipo_modelo)
-        if session.query(Review).filter(*filtros).first():
+        with Metricas.mede("banco_dedupe", tipo_modelo):
+            existente = session.query(Review.id).filter(*filtros).first()
+        if existente:
             error_msg = "Review já existente na base :/"
-            logger.warning(f"Erro ao adicionar review '{review.texto}', {error_msg}")
+            logger.warning("Erro ao adicionar review '%s', %s", texto, error_msg)
+            Metricas.DUPLICADOS.labels(tipo_modelo).inc()
             return {"error": error_msg}, 200
         
+        # Vetorizando, limpando o texto e realizando a predição, a menos que o texto já esteja no cache
+        sentimento, estagio = Analisador.analisar_com_cache(session, [texto], tipo_modelo)[0]
+
+        review = Review(
+            texto=texto,
+            sentimento=sentimento,
+            modelo=tipo_modelo,
+            data_criacao=datetime.now(),
+            estagio=estagio
+        )
+
         # Adicionando review
         session.add(review)
         # Efetivando o comando de adição
-        session.commit()
+        with Metricas.mede("banco_commit", tipo_modelo):
+            session.commit()
         # Concluindo a transação
-        logger.debug(f"Adicionado review: '{review.uid}'")
+        logger.debug("Adicionado review: '%s'", review.uid)
         return jsonify(apresenta_review(review)), 200
     
     # Caso ocorra algum erro na adição
     except Exception as e:
         error_msg = "Não foi possível salvar novo review :/"
-        logger.warning(f"Erro ao adicionar review '{review.uid}', {error_msg}")
+        logger.warning("Erro ao adicionar review '%s', %s", texto, error_msg)
+        Metricas.ERROS.labels("/review", tipo_modelo).inc()
         return {"error": error_msg}, 200
     
     finally:
         # Fechando a conexão
         session.close()
     
+
+
+# Rota de adição de reviews em lote
+@app.post('/review/batch', tags=[review_tag],
+          responses={"200": ListaResultadoLoteSchema, "400": ErrorSchema})
+def add_reviews_lote(body: ReviewLoteSchema):
+    """Adiciona um lote de reviews à base de dados, analisados pelo mesmo modelo
+    Retorna, para cada texto do lote, o review criado ou o erro ocorrido.
+
+    Args:
+        textos (list): textos dos reviews
+        modelo (str): tipo de modelo a ser utilizado para análise de sentimento
+
+    Returns:
+        dict: lista de resultados na mesma ordem dos textos enviados
+    """
+    textos = body.textos
+    tipo_modelo = body.modelo
+
+    if tipo_modelo not in TipoModelo.todos():
+        error_msg = "Tipo de modelo não suportado"
+        logger.warning("Erro ao selecionar o tipo de modelo do lote '%s', %s", tipo_modelo, error_msg)
+        Metricas.ERROS.labels("/review/batch", "invalido").inc()
+        return {"error": error_msg}, 200
+
+    if not textos:
+        error_msg = "Nenhum texto informado no lote"
+        logger.warning("Erro ao adicionar lote, %s", error_msg)
+        Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+        return {"error": error_msg}, 200
+
+    if len(textos) > TAMANHO_MAXIMO_LOTE:
+        error_msg = f"Lote excede o tamanho máximo de {TAMANHO_MAXIMO_LOTE} textos"
+        logger.warning("Erro ao adicionar lote de %d textos, %s", len(textos), error_msg)
+        Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+        return {"error": error_msg}, 200
+
+    resultados = [{"indice": indice} for indice in range(len(textos))]
+    logger.debug("Adicionando lote de %d reviews", len(textos))
+
+    try:
+        # Criando conexão com a base
+        session = Session()
+
+        # Checando, com uma única consulta, quais reviews já existem na base
+        with Metricas.mede("banco_dedupe", tipo_modelo):
+            existentes = RepositorioReview.busca_textos_existentes(session, [texto for texto in textos if texto], tipo_modelo)
+
+        # Selecionando os textos que precisam ser analisados, na ordem em que foram enviados
+        novos = {}
+        for indice, texto in enumerate(textos):
+            if not texto:
+                resultados[indice]["error"] = "Texto do review não informado"
+            elif texto in existentes:
+                resultados[indice]["error"] = "Review já existente na base :/"
+                Metricas.DUPLICADOS.labels(tipo_modelo).inc()
+            elif texto in novos:
+                resultados[indice]["error"] = "Review repetido no lote"
+            else:
+                novos[texto] = indice
+
+        if novos:
+            # Vetorizando, limpando e realizando a predição de uma só vez dos textos novos fora do cache
+            predicoes = Analisador.analisar_com_cache(session, list(novos.keys()), tipo_modelo)
+
+            data_criacao = datetime.now()
+            reviews = [
+                Review(texto=texto, sentimento=int(sentimento), modelo=tipo_modelo, data_criacao=data_criacao, estagio=estagio)
+                for texto, (sentimento, estagio) in zip(novos.keys(), predicoes)
+            ]
+
+            # Adicionando todos os reviews em uma única transação
+            RepositorioReview.insere_lote(session, reviews)
+            # Montando a resposta antes do commit, que expira os objetos da sessão
+            for review in reviews:
+                resultados[novos[review.texto]]["review"] = apresenta_review(review)
+            with Metricas.mede("banco_commit", tipo_modelo):
+                session.commit()
+
+        logger.debug("Adicionados %d reviews do lote", len(novos))
+        return {"resultados": resultados}, 200
+
+    # Caso ocorra algum erro na adição
+    except Exception as e:
+        session.rollback()
+        error_msg = "Não foi possível salvar o lote de reviews :/"
+        logger.warning("Erro ao adicionar lote de reviews, %s: %s", error_msg, e)
+        Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+        return {"error": error_msg}, 200
+
+    finally:
+        # Fechando a conexão
+        session.close()
+
     
 # Rota de remoção de review por nome
 @app.delete('/review', tags=[review_tag],responses={"200": ReviewDelSchema, "404": ErrorSchema})
@@ -162,14 +428,311 @@ def delete_review(query: ReviewDelSchema):
     
     if not review:
         error_msg = "Review não encontrado na base :/"
-        logger.warning(f"Erro ao deletar review '{query.id}', {error_msg}")
+        logger.warning("Erro ao deletar review '%s', %s", query.id, error_msg)
         return {"error": error_msg}, 200
     else:
         session.delete(review)
         session.commit()
         session.close()
-        logger.debug(f"Deletado review #{query.id}")
+        logger.debug("Deletado review #%s", query.id)
         return {"message": f"Review {query.id} removido com sucesso!"}, 200
     
+
+# Rota de remoção de reviews em lote
+@app.delete('/review/batch', tags=[review_tag],
+            responses={"200": ResultadoRemocaoLoteSchema, "404": ErrorSchema})
+def delete_reviews_lote(body: ReviewRemocaoLoteSchema):
+    """Remove de uma só vez os reviews da lista de ids ou que atendem aos filtros
+    Executa um único DELETE na base, sem carregar os reviews.
+
+    Args:
+        ids (list): ids dos reviews
+        modelo (str): remove apenas os reviews do tipo de modelo
+        sentimento (int): remove apenas os reviews com o sentimento
+        inicio (str): primeiro dia de criação considerado (AAAA-MM-DD)
+        fim (str): último dia de criação considerado (AAAA-MM-DD)
+
+    Returns:
+        dict: quantidade de reviews removidos e duração da remoção
+    """
+    if len(body.ids) > TAMANHO_MAXIMO_IMPORTACAO:
+        error_msg = f"Lista excede o tamanho máximo de {TAMANHO_MAXIMO_IMPORTACAO} ids"
+        logger.warning("Erro ao remover lote de %d reviews, %s", len(body.ids), error_msg)
+        return {"error": error_msg}, 200
+
+    datas = {}
+    for nome in ("inicio", "fim"):
+        data = getattr(body, nome)
+        if data:
+            try:
+                datas[nome] = datetime.strptime(data, "%Y-%m-%d")
+            except ValueError:
+                error_msg = "Data inválida, use o formato AAAA-MM-DD"
+                logger.warning("Erro ao remover lote de reviews com a data '%s', %s", data, error_msg)
+                return {"error": error_msg}, 200
+
+    session = Session()
+    try:
+        inicio = time.perf_counter()
+        with Metricas.mede("banco_remocao", body.modelo or ""):
+            removidos = RepositorioReview.remove_lote(session, body.ids, body.modelo, body.sentimento, **datas)
+            session.commit()
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    except ValueError:
+        error_msg = "Informe os ids ou ao menos um filtro dos reviews a remover"
+        logger.warning("Erro ao remover lote de reviews, %s", error_msg)
+        return {"error": error_msg}, 200
+    except Exception as e:
+        session.rollback()
+        error_msg = "Não foi possível remover os reviews :/"
+        logger.warning("Erro ao remover lote de reviews, %s: %s", error_msg, e)
+        Metricas.ERROS.labels("/review/batch", body.modelo or "").inc()
+        return {"error": error_msg}, 200
+    finally:
+        session.close()
+
+    logger.debug("Removidos %d reviews em %.1fms", removidos, duracao_ms)
+    return {"removidos": removidos, "duracao_ms": duracao_ms}, 200
+
+
+# Rota de importação de reviews já rotulados
+@app.put('/review/batch', tags=[review_tag],
+         responses={"200": ResultadoImportacaoSchema, "400": ErrorSchema})
+def importa_reviews_lote(body: ReviewImportacaoSchema):
+    """Grava reviews cujo sentimento já é conhecido, sem realizar a predição
+    Os textos novos são inseridos e os já existentes para o modelo têm o sentimento
+    atualizado, todos em uma única transação.
+
+    Args:
+        modelo (str): tipo de modelo ao qual os reviews são associados
+        reviews (list): textos e sentimentos (0 ou 1)
+
+    Returns:
+        dict: quantidade de reviews inseridos, atualizados e inalterados e duração da importação
+    """
+    tipo_modelo = body.modelo
+
+    if tipo_modelo not in TipoModelo.todos():
+        error_msg = "Tipo de modelo não suportado"
+        logger.warning("Erro ao selecionar o tipo de modelo da importação '%s', %s", tipo_modelo, error_msg)
+        Metricas.ERROS.labels("/review/batch", "invalido").inc()
+        return {"error": error_msg}, 200
+
+    if not body.reviews:
+        error_msg = "Nenhum review informado na importação"
+        logger.warning("Erro ao importar reviews, %s", error_msg)
+        return {"error": error_msg}, 200
+
+    if len(body.reviews) > TAMANHO_MAXIMO_IMPORTACAO:
+        error_msg = f"Importação excede o tamanho máximo de {TAMANHO_MAXIMO_IMPORTACAO} reviews"
+        logger.warning("Erro ao importar %d reviews, %s", len(body.reviews), error_msg)
+        return {"error": error_msg}, 200
+
+    invalidos = [indice for indice, review in enumerate(body.reviews) if not review.texto or review.sentimento not in (0, 1)]
+    if invalidos:
+        error_msg = f"Reviews sem texto ou com sentimento diferente de 0 e 1 nas posições {invalidos[:10]}"
+        logger.warning("Erro ao importar reviews, %s", error_msg)
+        return {"error": error_msg}, 200
+
+    # Um texto repetido na importação fica com o último sentimento informado
+    rotulados = {review.texto: review.sentimento for review in body.reviews}
+
+    session = Session()
+    try:
+        inicio = time.perf_counter()
+        with Metricas.mede("banco_importacao", tipo_modelo):
+            contagem = RepositorioReview.importa_lote(session, rotulados, tipo_modelo)
+            session.commit()
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    except Exception as e:
+        session.rollback()
+        error_msg = "Não foi possível importar os reviews :/"
+        logger.warning("Erro ao importar reviews, %s: %s", error_msg, e)
+        Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+        return {"error": error_msg}, 200
+    finally:
+        session.close()
+
+    logger.debug("Importados %d reviews em %.1fms", len(rotulados), duracao_ms)
+    return {**contagem, "duracao_ms": duracao_ms}, 200
+
+
+# Rota de criação de job a partir de uma lista de textos
+@app.post('/job', tags=[job_tag],
+          responses={"200": JobViewSchema, "400": ErrorSchema})
+def add_job(body: JobSchema):
+    """Cria um job que analisa a lista de textos em segundo plano e insere os reviews novos na base
+    Retorna imediatamente o ID do job, usado para acompanhar o progresso.
+
+    Args:
+        textos (list): textos dos reviews
+        modelo (str): tipo de modelo a ser utilizado para análise de sentimento
+
+    Returns:
+        dict: representação do job criado
+    """
+    if body.modelo not in TipoModelo.todos():
+        error_msg = "Tipo de modelo não suportado"
+        logger.warning("Erro ao selecionar o tipo de modelo do job '%s', %s", body.modelo, error_msg)
+        return {"error": error_msg}, 200
+
+    if not body.textos:
+        error_msg = "Nenhum texto informado no job"
+        logger.warning("Erro ao criar job, %s", error_msg)
+        return {"error": error_msg}, 200
+
+    try:
+        job = executor_jobs.submete_textos(body.textos, body.modelo)
+        logger.debug("Criado job %s com %d textos", job.uid, job.total)
+        return apresenta_job(job), 200
+
+    except Exception as e:
+        error_msg = "Não foi possível criar o job :/"
+        logger.warning("Erro ao criar job, %s: %s", error_msg, e)
+        Metricas.ERROS.labels("/job", body.modelo).inc()
+        return {"error": error_msg}, 200
+
+
+# Rota de criação de job a partir de um arquivo CSV
+@app.post('/job/arquivo', tags=[job_tag],
+          responses={"200": JobViewSchema, "400": ErrorSchema})
+def add_job_arquivo(form: JobArquivoSchema):
+    """Cria um job que analisa os textos de uma coluna de um arquivo CSV em segundo plano
+    Retorna imediatamente o ID do job, usado para acompanhar o progresso.
+
+    Args:
+        arquivo (file): arquivo CSV com os textos
+        coluna (str): nome da coluna com os textos, "content" por padrão
+        modelo (str): tipo de modelo a ser utilizado para análise de sentimento
+
+    Returns:
+        dict: representação do job criado
+    """
+    if form.modelo not in TipoModelo.todos():
+        error_msg = "Tipo de modelo não suportado"
+        logger.warning("Erro ao selecionar o tipo de modelo do job '%s', %s", form.modelo, error_msg)
+        return {"error": error_msg}, 200
+
+    try:
+        job = executor_jobs.submete_arquivo(form.arquivo, form.modelo, form.coluna)
+        logger.debug("Criado job %s com %d textos do arquivo '%s'", job.uid, job.total, form.arquivo.filename)
+        return apresenta_job(job), 200
+
+    except ValueError as e:
+        logger.warning("Erro ao criar job do arquivo '%s', %s", form.arquivo.filename, e)
+        return {"error": str(e)}, 200
+
+    except Exception as e:
+        error_msg = "Não foi possível criar o job :/"
+        logger.warning("Erro ao criar job do arquivo '%s', %s: %s", form.arquivo.filename, error_msg, e)
+        Metricas.ERROS.labels("/job/arquivo", form.modelo).inc()
+        return {"error": error_msg}, 200
+
+
+# Rota de acompanhamento de job
+@app.get('/job', tags=[job_tag], responses={"200": JobViewSchema, "404": ErrorSchema})
+def get_job(query: JobBuscaSchema):
+    """Retorna o status, o progresso, a vazão e o tempo restante estimado de um job
+    Um job cujo worker terminou durante a execução é retornado com o status erro.
+
+    Args:
+        id (str): ID do job
+
+    Returns:
+        dict: representação do job
+    """
+    session = Session()
+    try:
+        job = session.query(Job).filter(Job.uid == query.id).first()
+        if not job:
+            error_msg = "Job não encontrado na base :/"
+            logger.warning("Erro ao buscar job '%s', %s", query.id, error_msg)
+            return {"error": error_msg}, 200
+        if executor_jobs.orfao(job):
+            logger.warning("Job '%s' interrompido, o processo %s deixou de executá-lo", job.uid, job.processo)
+            executor_jobs.marca_orfao(job)
+            session.commit()
+        return apresenta_job(job), 200
+    finally:
+        session.close()
+
+
+# Rota de download do resultado de job
+@app.get('/job/resultado', tags=[job_tag], responses={"404": ErrorSchema})
+def get_job_resultado(query: JobBuscaSchema):
+    """Retorna o arquivo CSV com o sentimento de cada texto do job (texto, sentimento, situacao)
+    O arquivo é gravado bloco a bloco e pode ser baixado antes do fim do job.
+
+    Args:
+        id (str): ID do job
+
+    Returns:
+        file: arquivo CSV do resultado
+    """
+    session = Session()
+    try:
+        job = session.query(Job).filter(Job.uid == query.id).first()
+        if not job or not job.arquivo_resultado or not os.path.exists(job.arquivo_resultado):
+            error_msg = "Resultado do job não encontrado :/"
+            logger.warning("Erro ao buscar resultado do job '%s', %s", query.id, error_msg)
+            return {"error": error_msg}, 200
+        return send_file(os.path.abspath(job.arquivo_resultado), mimetype="text/csv",
+                         as_attachment=True, download_name=f"{job.uid}.csv")
+    finally:
+        session.close()
+
+
+# Rota de estatísticas dos modelos
+@app.get('/estatisticas', tags=[estatisticas_tag], responses={"200": EstatisticasSchema})
+def get_estatisticas():
+    """Retorna o tempo de carga e a memória ocupada pelos modelos e pré-processadores
+    já carregados neste worker, a fila e os tamanhos de lote dos agendadores do DistilBERT, os
+    acertos do cache de predições, os tokens de padding gerados para o DistilBERT, os
+    limites de threads do worker, os acertos do cache de respostas de GET /review e, no modo
+    ASGI, a ocupação do executor de inferência.
+    """
+    tokenizacao = None
+    if TipoModelo.MODEL_TRANSFORMERS in RegistroPreProcessadores.carregados():
+        tokenizacao = RegistroPreProcessadores.obtem_preprocessador(TipoModelo.MODEL_TRANSFORMERS).estatisticas()
+    return {
+        "modelos": RegistroModelos.estatisticas(),
+        "preprocessadores": RegistroPreProcessadores.estatisticas(),
+        "agendadores": {tipo: agendador.estatisticas() for tipo, agendador in Analisador.agendadores.items()},
+        "cache": CachePredicoes.estatisticas(),
+        "tokenizacao": tokenizacao,
+        "cpu": RecursosCPU.estatisticas(),
+        "inferencia": ExecutorInferencia.atual.estatisticas() if ExecutorInferencia.atual else None,
+        "cache_respostas": CacheRespostas.estatisticas(),
+    }, 200
+
+
+# Rota de métricas no formato do Prometheus
+@app.get('/metrics', tags=[estatisticas_tag])
+def get_metrics():
+    """Retorna as métricas da API no formato texto do Prometheus, agregadas entre os workers do gunicorn:
+    histogramas de latência por etapa (carga, limpeza do spaCy, vetorização, tokenização,
+    inferência, checagem de duplicados e commit) e por modelo, duração das requisições por rota
+    e contadores de requisições, textos analisados, duplicados e erros.
+    """
+    metricas, content_type = Metricas.exporta()
+    return Response(metricas, mimetype=content_type)
+
+
+# Comando de reconstrução do índice de texto completo
+@app.cli.command("reconstruir-indice-textual")
+def reconstruir_indice_textual():
+    """Recria o índice de texto completo a partir da tabela reviews."""
+    total = IndiceTextual.reconstroi(engine)
+    logger.info("Índice de texto completo reconstruído com %d reviews", total)
+
+
+
+# Comando de reconstrução do resumo de sentimentos
+@app.cli.command("reconstruir-resumo")
+def reconstruir_resumo():
+    """Recalcula o resumo de sentimentos por modelo e dia a partir da tabela reviews."""
+    total = ResumoSentimentos.reconstroi(engine)
+    logger.info("Resumo de sentimentos reconstruído com %d reviews", total)
+
 if __name__ == '__main__':
     app.run()
\ No newline at end of file
@@ -0,0 +1,307 @@
+""" Modo ASGI da API: as rotas de maior volume atendidas de forma assíncrona.
+
+Uso:
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+    uvicorn asgi:app --port 5000
+
+POST /review, POST /review/batch e GET /review são atendidas no loop de eventos: o acesso ao
+banco passa por uma AsyncSession (aiosqlite) e o pré-processamento e a inferência por um
+pool de threads limitado (ExecutorInferencia). Assim um worker mantém várias requisições em
+andamento, consultando e gravando no banco enquanto outras estão na inferência. Quando o pool
+está cheio, a requisição é recusada com 503 e Retry-After, em vez de aumentar a fila e a
+latência de todas. As demais rotas são atendidas pela aplicação Flask (app.py), montada como WSGI.
+"""
+import functools
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from pydantic import ValidationError
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import app as app_flask, TAMANHO_MAXIMO_LOTE, TAMANHO_BLOCO_STREAM
+from logger import logger, id_requisicao
+from model import Analisador, CacheRespostas, ExecutorInferencia, IndiceTextual, InferenciaSaturada, Metricas, RepositorioReview, \
+    Review, TipoModelo, db_url
+from model.banco import cria_engine_async
+from schemas import ReviewSchema, ReviewLoteSchema, BuscaReviewSchema, apresenta_review, apresenta_reviews
+
+# Segundos sugeridos ao cliente, no cabeçalho Retry-After, quando a inferência está saturada
+ESPERA_SATURADO = int(os.environ.get("ASGI_ESPERA_SATURADO", 1))
+
+engine_async = cria_engine_async(db_url)
+# Os objetos continuam legíveis após o commit, sem uma nova consulta (que exigiria um await)
+SessionAsync = async_sessionmaker(engine_async, expire_on_commit=False)
+executor_inferencia = ExecutorInferencia()
+
+
+def rota_assincrona(funcao):
+    """ Faz nas rotas assíncronas o que os hooks do app Flask fazem nas demais: identifica a
+    requisição nos logs, mede as etapas e a duração, e conta a requisição nas métricas. Também
+    converte erros de validação (inclusive de um corpo JSON ausente ou malformado) em 422 e a
+    saturação da inferência em 503.
+    """
+    @functools.wraps(funcao)
+    async def atende(request):
+        inicio = time.perf_counter()
+        identificador = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        token_id = id_requisicao.set(identificador)
+        token_etapas = Metricas.inicia_requisicao()
+        rota = request.url.path
+        try:
+            try:
+                response = await funcao(request)
+            except ValidationError as e:
+                response = JSONResponse(json.loads(e.json()), status_code=422)
+            except InferenciaSaturada as e:
+                logger.warning("Requisição recusada em %s, inferência saturada: %s", rota, e)
+                Metricas.ERROS.labels(rota, "saturado").inc()
+                response = JSONResponse({"error": "Servidor ocupado, tente novamente em instantes"}, status_code=503,
+                                        headers={"Retry-After": str(ESPERA_SATURADO)})
+        finally:
+            etapas = Metricas.finaliza_requisicao(token_etapas)
+            id_requisicao.reset(token_id)
+
+        duracao = time.perf_counter() - inicio
+        Metricas.REQUISICOES.labels(request.method, rota, response.status_code).inc()
+        Metricas.DURACAO_REQUISICAO.labels(request.method, rota).observe(duracao)
+        logger.debug("%s %s %d em %.1fms", request.method, rota, response.status_code, duracao * 1000,
+                     extra={"duracao_ms": round(duracao * 1000, 2),
+                            "etapas_ms": {etapa: round(valor * 1000, 2) for etapa, valor in etapas.items()}})
+        response.headers["X-Request-ID"] = identificador
+        if "origin" in request.headers:
+            response.headers["Access-Control-Allow-Origin"] = "*"
+            response.headers["Access-Control-Expose-Headers"] = "X-Proximo-Cursor, X-Request-ID, ETag"
+        return response
+    return atende
+
+
+@rota_assincrona
+async def get_reviews(request):
+    """ Versão assíncrona de GET /review (ver app.get_reviews). """
+    query = BuscaReviewSchema(**request.query_params)
+    filtros = []
+    if query.id:
+        filtros.append(Review.id == query.id)
+    if query.texto:
+        filtros.append(IndiceTextual.filtro(query.texto))
+    if query.sentimento:
+        filtros.append(Review.sentimento == query.sentimento)
+    if query.modelo:
+        filtros.append(Review.modelo == query.modelo)
+    if query.cursor:
+        try:
+            filtros.append(RepositorioReview.filtro_cursor(query.cursor))
+        except ValueError:
+            error_msg = "Cursor inválido"
+            logger.warning("Erro ao buscar reviews com o cursor '%s', %s", query.cursor, error_msg)
+            return JSONResponse({"error": error_msg})
+
+    limite = max(query.limit, 1) if query.limit else None
+    consulta = select(Review).where(*filtros).order_by(desc(Review.data_criacao), desc(Review.id))
+
+    if query.stream:
+        logger.debug("Enviando reviews em streaming")
+        return StreamingResponse(gera_reviews_json(consulta.limit(limite) if limite else consulta),
+                                 media_type="application/json")
+
+    logger.debug("Coletando dados sobre todos os reviews")
+    async with SessionAsync() as session:
+        # Validação pela versão da tabela reviews, como em app.get_reviews
+        chave = CacheRespostas.chave(query.model_dump())
+        versao = await session.run_sync(CacheRespostas.versao)
+        etag = CacheRespostas.etag(chave, versao)
+        validacao = {"ETag": etag, "Cache-Control": "no-cache"}
+        if CacheRespostas.nao_modificado(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers=validacao)
+        guardada = CacheRespostas.busca(chave, versao)
+        if guardada:
+            corpo, cabecalhos = guardada
+            return Response(corpo, media_type="application/json", headers={**cabecalhos, **validacao})
+
+        # Um review a mais indica se existe uma próxima página
+        reviews = (await session.scalars(consulta.limit(limite + 1) if limite else consulta)).all()
+
+    cabecalhos = {}
+    if limite and len(reviews) > limite:
+        reviews = reviews[:limite]
+        cabecalhos["X-Proximo-Cursor"] = RepositorioReview.codifica_cursor(reviews[-1])
+    if reviews:
+        logger.debug("%d reviews econtrados", len(reviews))
+    resposta = JSONResponse(apresenta_reviews(reviews) if reviews else {}, headers=cabecalhos)
+    CacheRespostas.grava(chave, versao, resposta.body, cabecalhos)
+    resposta.headers.update(validacao)
+    return resposta
+
+
+async def le_json(request):
+    """ Corpo JSON da requisição, ou None se ausente ou inválido. Como no app Flask, o None é
+    recusado pela validação do schema com 422, em vez de virar um erro 500.
+    """
+    try:
+        return await request.json()
+    except ValueError:
+        # json.JSONDecodeError e UnicodeDecodeError
+        return None
+
+
+async def gera_reviews_json(consulta):
+    """ Gera a listagem em JSON aos poucos, lendo a base em blocos de TAMANHO_BLOCO_STREAM reviews. """
+    async with SessionAsync() as session:
+        reviews = await session.stream_scalars(consulta.execution_options(yield_per=TAMANHO_BLOCO_STREAM))
+        yield "["
+        separador = ""
+        async for review in reviews:
+            yield separador + json.dumps(apresenta_review(review))
+            separador = ","
+        yield "]"
+
+
+@rota_assincrona
+async def add_review(request):
+    """ Versão assíncrona de POST /review (ver app.add_review). """
+    form = ReviewSchema(**(await request.form()))
+    texto = form.texto
+    tipo_modelo = form.modelo
+
+    if tipo_modelo not in TipoModelo.todos():
+        error_msg = "Tipo de modelo não suportado"
+        logger.warning("Erro ao selecionar o tipo de modelo do review '%s', %s", tipo_modelo, error_msg)
+        Metricas.ERROS.labels("/review", "invalido").inc()
+        return JSONResponse({"error": error_msg})
+
+    if not texto:
+        error_msg = "Texto do review não informado"
+        logger.warning("Erro ao adicionar review '%s', %s", texto, error_msg)
+        Metricas.ERROS.labels("/review", tipo_modelo).inc()
+        return JSONResponse({"error": error_msg})
+
+    logger.debug("Adicionando review : '%s'", texto)
+    async with SessionAsync() as session:
+        try:
+            with Metricas.mede("banco_dedupe", tipo_modelo):
+                existente = await session.scalar(
+                    select(Review.id).where(Review.texto == texto, Review.modelo == tipo_modelo).limit(1))
+            if existente:
+                error_msg = "Review já existente na base :/"
+                logger.warning("Erro ao adicionar review '%s', %s", texto, error_msg)
+                Metricas.DUPLICADOS.labels(tipo_modelo).inc()
+                return JSONResponse({"error": error_msg})
+
+            sentimento, estagio = (await Analisador.analisar_com_cache_async(session, [texto], tipo_modelo,
+                                                                             executor_inferencia))[0]
+            review = Review(texto=texto, sentimento=sentimento, modelo=tipo_modelo,
+                            data_criacao=datetime.now(), estagio=estagio)
+            session.add(review)
+            with Metricas.mede("banco_commit", tipo_modelo):
+                await session.commit()
+            logger.debug("Adicionado review: '%s'", review.uid)
+            return JSONResponse(apresenta_review(review))
+
+        except InferenciaSaturada:
+            raise
+        except Exception:
+            error_msg = "Não foi possível salvar novo review :/"
+            logger.warning("Erro ao adicionar review '%s', %s", texto, error_msg)
+            Metricas.ERROS.labels("/review", tipo_modelo).inc()
+            return JSONResponse({"error": error_msg})
+
+
+@rota_assincrona
+async def add_reviews_lote(request):
+    """ Versão assíncrona de POST /review/batch (ver app.add_reviews_lote). """
+    body = ReviewLoteSchema.model_validate(await le_json(request))
+    textos = body.textos
+    tipo_modelo = body.modelo
+
+    if tipo_modelo not in TipoModelo.todos():
+        error_msg = "Tipo de modelo não suportado"
+        logger.warning("Erro ao selecionar o tipo de modelo do lote '%s', %s", tipo_modelo, error_msg)
+        Metricas.ERROS.labels("/review/batch", "invalido").inc()
+        return JSONResponse({"error": error_msg})
+
+    if not textos:
+        error_msg = "Nenhum texto informado no lote"
+        logger.warning("Erro ao adicionar lote, %s", error_msg)
+        Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+        return JSONResponse({"error": error_msg})
+
+    if len(textos) > TAMANHO_MAXIMO_LOTE:
+        error_msg = f"Lote excede o tamanho máximo de {TAMANHO_MAXIMO_LOTE} textos"
+        logger.warning("Erro ao adicionar lote de %d textos, %s", len(textos), error_msg)
+        Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+        return JSONResponse({"error": error_msg})
+
+    resultados = [{"indice": indice} for indice in range(len(textos))]
+    logger.debug("Adicionando lote de %d reviews", len(textos))
+
+    async with SessionAsync() as session:
+        try:
+            with Metricas.mede("banco_dedupe", tipo_modelo):
+                existentes = await session.run_sync(RepositorioReview.busca_textos_existentes,
+                                                    [texto for texto in textos if texto], tipo_modelo)
+
+            novos = {}
+            for indice, texto in enumerate(textos):
+                if not texto:
+                    resultados[indice]["error"] = "Texto do review não informado"
+                elif texto in existentes:
+                    resultados[indice]["error"] = "Review já existente na base :/"
+                    Metricas.DUPLICADOS.labels(tipo_modelo).inc()
+                elif texto in novos:
+                    resultados[indice]["error"] = "Review repetido no lote"
+                else:
+                    novos[texto] = indice
+
+            if novos:
+                predicoes = await Analisador.analisar_com_cache_async(session, list(novos.keys()), tipo_modelo,
+                                                                      executor_inferencia)
+                data_criacao = datetime.now()
+                reviews = [
+                    Review(texto=texto, sentimento=int(sentimento), modelo=tipo_modelo, data_criacao=data_criacao, estagio=estagio)
+                    for texto, (sentimento, estagio) in zip(novos.keys(), predicoes)
+                ]
+                await session.run_sync(RepositorioReview.insere_lote, reviews)
+                for review in reviews:
+                    resultados[novos[review.texto]]["review"] = apresenta_review(review)
+                with Metricas.mede("banco_commit", tipo_modelo):
+                    await session.commit()
+
+            logger.debug("Adicionados %d reviews do lote", len(novos))
+            return JSONResponse({"resultados": resultados})
+
+        except InferenciaSaturada:
+            raise
+        except Exception as e:
+            await session.rollback()
+            error_msg = "Não foi possível salvar o lote de reviews :/"
+            logger.warning("Erro ao adicionar lote de reviews, %s: %s", error_msg, e)
+            Metricas.ERROS.labels("/review/batch", tipo_modelo).inc()
+            return JSONResponse({"error": error_msg})
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    yield
+    executor_inferencia.encerra()
+    await engine_async.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route("/review", get_reviews, methods=["GET"]),
+        Route("/review", add_review, methods=["POST"]),
+        Route("/review/batch", add_reviews_lote, methods=["POST"]),
+        # Demais rotas (e os métodos não atendidos acima, como DELETE /review e o preflight do CORS)
+        Mount("/", app=WSGIMiddleware(app_flask)),
+    ],
+    lifespan=ciclo_de_vida,
+)
@@ -0,0 +1,12 @@
+# Benchmarks de desempenho da API e dos modelos.
+# Execute a partir da raiz do projeto, ex.: python -m benchmarks.busca_textual
+import atexit
+import os
+import shutil
+import tempfile
+
+# Os benchmarks gravam e removem reviews: por padrão usam uma base temporária, herdada pelos
+# servidores que iniciam, e não a base da aplicação (informe DB_DIRETORIO para escolher outra)
+if "DB_DIRETORIO" not in os.environ:
+    os.environ["DB_DIRETORIO"] = tempfile.mkdtemp(prefix="benchmark-reviews-")
+    atexit.register(shutil.rmtree, os.environ["DB_DIRETORIO"], ignore_errors=True)
@@ -0,0 +1,92 @@
+""" Compara a busca por trecho de texto usando o índice FTS5 com a varredura ILIKE.
+
+Uso:
+    python -m benchmarks.busca_textual [--tamanhos 10000 100000 1000000] [--repeticoes 5]
+
+Para cada tamanho, cria uma base SQLite temporária com reviews gerados a partir do
+conjunto de teste, executa as mesmas buscas com ILIKE e com o índice e mostra a
+mediana do tempo de cada consulta.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from model.base import Base
+from model.review import Review
+from model.busca import IndiceTextual
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+TRECHOS = ["entrega", "demora", "app", "pedido cancelado", "xyzw"]
+
+
+def popula(engine, total: int, textos: list, tamanho_bloco: int = 50000):
+    """ Insere `total` reviews sorteados do conjunto de teste, cada um com um sufixo único. """
+    aleatorio = random.Random(7)
+    with engine.begin() as conexao:
+        for inicio in range(0, total, tamanho_bloco):
+            bloco = [
+                {"uid": f"uid-{indice}", "texto": f"{aleatorio.choice(textos)} #{indice}", "sentimento": indice % 2,
+                 "modelo": "pipeline-et", "data_criacao": pd.Timestamp("2024-01-01").to_pydatetime()}
+                for indice in range(inicio, min(inicio + tamanho_bloco, total))
+            ]
+            conexao.execute(insert(Review), bloco)
+
+
+def mede(Session, filtro, repeticoes: int) -> tuple:
+    """ Mediana, em milissegundos, e quantidade de reviews encontrados pela consulta. """
+    tempos = []
+    encontrados = 0
+    for _ in range(repeticoes):
+        session = Session()
+        inicio = time.perf_counter()
+        encontrados = len(session.query(Review.id).filter(filtro).all())
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        session.close()
+    return statistics.median(tempos), encontrados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a busca com índice FTS5 e com ILIKE.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    textos = pd.read_csv(url_X_teste)['content'].dropna().tolist()
+    resultados = []
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        for total in args.tamanhos:
+            engine = create_engine(f"sqlite:///{os.path.join(diretorio, f'reviews_{total}.sqlite3')}")
+            Base.metadata.create_all(engine)
+            popula(engine, total, textos)
+            if not IndiceTextual.cria(engine):
+                raise SystemExit("SQLite sem suporte a FTS5 com tokenizador trigram")
+            Session = sessionmaker(bind=engine)
+
+            print(f"\n{total} reviews")
+            print(f"{'trecho':<20} {'ilike (ms)':>11} {'fts5 (ms)':>10} {'ganho':>7} {'encontrados':>12}")
+            for trecho in TRECHOS:
+                tempo_like, encontrados_like = mede(Session, Review.texto.ilike(f'%{trecho}%'), args.repeticoes)
+                tempo_fts, encontrados_fts = mede(Session, IndiceTextual.filtro(trecho), args.repeticoes)
+                print(f"{trecho:<20} {tempo_like:>11.2f} {tempo_fts:>10.2f} {tempo_like / tempo_fts:>6.1f}x "
+                      f"{encontrados_fts:>12}")
+                resultados.append({"reviews": total, "trecho": trecho, "ilike_ms": tempo_like, "fts5_ms": tempo_fts,
+                                   "encontrados_ilike": encontrados_like, "encontrados_fts5": encontrados_fts})
+            engine.dispose()
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+""" Compara vazão e latência de cauda dos workers síncronos do gunicorn com o modo ASGI (asgi.py).
+
+Uso:
+    python -m benchmarks.carga [--modos sync asgi] [--clientes 1 8 32] [--modelos pipeline-et]
+                               [--lote 1] [--leituras 0.2] [--workers 2] [--duracao 20] [--json carga.json]
+
+Cada modo é iniciado com o gunicorn.conf.py em uma porta local (`app:app` com workers sync ou
+`asgi:app` com o UvicornWorker) e, para cada quantidade de clientes simultâneos, os clientes
+enviam lotes de `lote` textos do conjunto de teste ao POST /review/batch e, na fração
+`leituras` das requisições, consultam GET /review?limit=20. Mostra requisições e textos por
+segundo, p50/p95/p99 e as requisições recusadas com 503 pelo controle de carga do modo ASGI.
+Os textos recebem um sufixo único, como no benchmarks.latencia, e os servidores usam a base
+temporária dos benchmarks (ver benchmarks/__init__.py), de onde os reviews gravados são removidos
+ao final.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.latencia import remove_reviews, url_X_teste
+from model.modelo import TipoModelo
+
+MODOS = {
+    "sync": ["app:app"],
+    "asgi": ["-k", "uvicorn.workers.UvicornWorker", "asgi:app"],
+}
+
+
+def requisicao(url: str, dados: dict = None, timeout: float = 120) -> dict:
+    corpo = json.dumps(dados).encode("utf-8") if dados is not None else None
+    pedido = urllib.request.Request(url, data=corpo, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(pedido, timeout=timeout) as resposta:
+        return json.loads(resposta.read())
+
+
+def inicia_servidor(porta: int, workers: int, modelos: list, diretorio_metricas: str, aplicacao: list = None,
+                    ambiente: dict = None) -> subprocess.Popen:
+    """ Inicia o gunicorn com o gunicorn.conf.py, os modelos aquecidos e as métricas em um diretório próprio. """
+    ambiente = dict(os.environ, GUNICORN_WORKERS=str(workers), CPU_WORKERS=str(workers),
+                    GUNICORN_BIND=f"127.0.0.1:{porta}", AQUECER_MODELOS=",".join(modelos),
+                    PROMETHEUS_MULTIPROC_DIR=diretorio_metricas, **(ambiente or {}))
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"] + (aplicacao or MODOS["sync"]),
+                            env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def aguarda_servidor(servidor: subprocess.Popen, url: str, limite: float = 300) -> dict:
+    """ Aguarda a aplicação responder; com o preload, os modelos já estão carregados nesse momento. """
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if servidor.poll() is not None:
+            raise RuntimeError(f"O gunicorn terminou com código {servidor.returncode}")
+        try:
+            return requisicao(f"{url}/estatisticas", timeout=5)
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            time.sleep(0.5)
+    raise RuntimeError(f"A aplicação não respondeu em {limite:.0f}s")
+
+
+def encerra_servidor(servidor: subprocess.Popen):
+    servidor.terminate()
+    try:
+        servidor.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        servidor.kill()
+        servidor.wait()
+
+
+def gera_carga(url: str, textos: list, modelos: list, lote: int, clientes: int, duracao: float,
+               semente: str, uids: list, leituras: float = 0.0) -> dict:
+    """ Envia requisições com `clientes` threads durante `duracao` segundos: lotes ao POST /review/batch,
+    alternando entre os modelos, e, na fração `leituras` das requisições, GET /review?limit=20.
+    """
+    tempos, erros = [], []
+    recusadas = 0
+    textos_analisados = 0
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+
+    def cliente(numero: int):
+        nonlocal recusadas, textos_analisados
+        aleatorio = random.Random(f"{semente}-{numero}")
+        requisicoes = 0
+        while time.monotonic() < fim:
+            leitura = aleatorio.random() < leituras
+            tipo_modelo = modelos[(numero + requisicoes) % len(modelos)]
+            requisicoes += 1
+            inicio = time.perf_counter()
+            try:
+                if leitura:
+                    dados = requisicao(f"{url}/review?limit=20")
+                else:
+                    unicos = [f"{aleatorio.choice(textos)} #carga-{time.time_ns()}-{numero}-{indice}" for indice in range(lote)]
+                    dados = requisicao(f"{url}/review/batch", {"modelo": tipo_modelo, "textos": unicos})
+            except urllib.error.HTTPError as erro:
+                with lock:
+                    if erro.code == 503:
+                        recusadas += 1
+                    else:
+                        erros.append(str(erro))
+                continue
+            except (urllib.error.URLError, ConnectionError, TimeoutError) as erro:
+                with lock:
+                    erros.append(str(erro))
+                continue
+            duracao_requisicao = time.perf_counter() - inicio
+            with lock:
+                if "error" in dados:
+                    erros.append(dados["error"])
+                    continue
+                tempos.append(duracao_requisicao)
+                if not leitura:
+                    uids.extend(resultado["review"]["id"] for resultado in dados["resultados"] if "review" in resultado)
+                    textos_analisados += lote
+
+    inicio = time.perf_counter()
+    linhas = [threading.Thread(target=cliente, args=(numero,)) for numero in range(clientes)]
+    for linha in linhas:
+        linha.start()
+    for linha in linhas:
+        linha.join()
+    decorrido = time.perf_counter() - inicio
+
+    tempos_ms = np.asarray(tempos) * 1000 if tempos else np.zeros(1)
+    p50, p95, p99 = np.percentile(tempos_ms, [50, 95, 99])
+    return {
+        "requisicoes": len(tempos),
+        "recusadas": recusadas,
+        "erros": len(erros),
+        "requisicoes_por_segundo": round(len(tempos) / decorrido, 2),
+        "textos_por_segundo": round(textos_analisados / decorrido, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara workers síncronos e o modo ASGI sob carga.")
+    parser.add_argument("--modos", nargs="+", default=list(MODOS), choices=list(MODOS))
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 8, 32], help="requisições simultâneas")
+    parser.add_argument("--modelos", nargs="+", default=[TipoModelo.PIPELINE_SCIKIT_LEARN], choices=TipoModelo.todos())
+    parser.add_argument("--lote", type=int, default=1, help="textos por requisição de escrita")
+    parser.add_argument("--leituras", type=float, default=0.2, help="fração das requisições que são GET /review")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duracao", type=float, default=20, help="segundos de medida por configuração")
+    parser.add_argument("--aquecimento", type=float, default=3, help="segundos de carga descartados por modo")
+    parser.add_argument("--porta", type=int, default=5091)
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    textos = pd.read_csv(url_X_teste)['content'].dropna().tolist()
+    url = f"http://127.0.0.1:{args.porta}"
+    resultados = []
+    uids = []
+
+    print(f"{args.workers} workers, lotes de {args.lote} textos, {args.leituras:.0%} de leituras, modelos: {', '.join(args.modelos)}")
+    print(f"{'modo':<5} {'clientes':>8} {'req/s':>8} {'textos/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'503':>5} {'erros':>6}")
+    try:
+        for modo in args.modos:
+            with tempfile.TemporaryDirectory(prefix="carga-metricas-") as diretorio_metricas:
+                servidor = inicia_servidor(args.porta, args.workers, args.modelos, diretorio_metricas, MODOS[modo])
+                try:
+                    aguarda_servidor(servidor, url)
+                    gera_carga(url, textos, args.modelos, args.lote, max(args.clientes), args.aquecimento,
+                               f"{args.semente}-{modo}-aquecimento", uids, args.leituras)
+                    for clientes in args.clientes:
+                        resultado = gera_carga(url, textos, args.modelos, args.lote, clientes, args.duracao,
+                                               f"{args.semente}-{modo}-{clientes}", uids, args.leituras)
+                        resultados.append({"modo": modo, "clientes": clientes, **resultado})
+                        print(f"{modo:<5} {clientes:>8} {resultado['requisicoes_por_segundo']:>8.1f} "
+                              f"{resultado['textos_por_segundo']:>9.1f} {resultado['p50_ms']:>9.2f} {resultado['p95_ms']:>9.2f} "
+                              f"{resultado['p99_ms']:>9.2f} {resultado['recusadas']:>5} {resultado['erros']:>6}")
+                finally:
+                    encerra_servidor(servidor)
+    finally:
+        remove_reviews(uids, args.modelos)
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump({"parametros": {"workers": args.workers, "lote": args.lote, "leituras": args.leituras,
+                                      "modelos": args.modelos, "duracao": args.duracao},
+                       "resultados": resultados}, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
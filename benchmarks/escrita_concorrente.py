@@ -0,0 +1,108 @@
+""" Mede a vazão de escritas concorrentes na tabela reviews, antes e depois dos índices e dos
+ajustes do SQLite (WAL, synchronous=NORMAL, busy_timeout).
+
+Uso:
+    python -m benchmarks.escrita_concorrente [--processos 4] [--escritas 500] [--existentes 50000]
+
+Cada processo simula o POST /review: consulta se o (texto, modelo) já existe, insere o
+review e faz o commit. Os processos fazem o papel dos workers do gunicorn.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from model.base import Base
+from model.banco import cria_engine
+from model.review import Review
+
+
+def cria_base(caminho: str, otimizada: bool, existentes: int):
+    """ Cria a base com `existentes` reviews, com ou sem os índices da tabela. """
+    engine = create_engine(f"sqlite:///{caminho}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conexao:
+        if not otimizada:
+            for indice in Review.__table__.indexes:
+                conexao.execute(text(f"DROP INDEX IF EXISTS {indice.name}"))
+        conexao.execute(insert(Review), [
+            {"uid": str(uuid.uuid4()), "texto": f"review existente {indice}", "sentimento": indice % 2,
+             "modelo": "pipeline-et", "data_criacao": datetime.now()}
+            for indice in range(existentes)
+        ])
+    engine.dispose()
+
+
+def escreve(caminho: str, otimizada: bool, processo: int, escritas: int, fila):
+    """ Executa as escritas de um processo e envia as latências e a quantidade de erros. """
+    url = f"sqlite:///{caminho}"
+    engine = cria_engine(url) if otimizada else create_engine(url, pool_size=10, max_overflow=20)
+    Session = sessionmaker(bind=engine)
+    latencias, erros = [], 0
+    for indice in range(escritas):
+        texto = f"review novo {processo}-{indice}"
+        inicio = time.perf_counter()
+        session = Session()
+        try:
+            if not session.query(Review.id).filter(Review.texto == texto, Review.modelo == "pipeline-et").first():
+                session.add(Review(texto=texto, sentimento=1, modelo="pipeline-et", data_criacao=datetime.now()))
+                session.commit()
+        except OperationalError:
+            session.rollback()
+            erros += 1
+        finally:
+            session.close()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    engine.dispose()
+    fila.put((latencias, erros))
+
+
+def executa(otimizada: bool, processos: int, escritas: int, existentes: int) -> dict:
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "reviews.sqlite3")
+        cria_base(caminho, otimizada, existentes)
+
+        fila = multiprocessing.Queue()
+        trabalhadores = [multiprocessing.Process(target=escreve, args=(caminho, otimizada, processo, escritas, fila))
+                         for processo in range(processos)]
+        inicio = time.perf_counter()
+        for trabalhador in trabalhadores:
+            trabalhador.start()
+        resultados = [fila.get() for _ in trabalhadores]
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        duracao = time.perf_counter() - inicio
+
+    latencias = sorted(latencia for parcial, _ in resultados for latencia in parcial)
+    return {
+        "escritas_por_segundo": len(latencias) / duracao,
+        "p50_ms": statistics.median(latencias),
+        "p95_ms": latencias[int(len(latencias) * 0.95) - 1],
+        "erros": sum(erros for _, erros in resultados),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a vazão de escritas concorrentes no SQLite.")
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--escritas", type=int, default=500, help="escritas por processo")
+    parser.add_argument("--existentes", type=int, default=50000, help="reviews já existentes na base")
+    args = parser.parse_args()
+
+    print(f"{'configuração':<14} {'escritas/s':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'erros':>6}")
+    for nome, otimizada in (("original", False), ("otimizada", True)):
+        resultado = executa(otimizada, args.processos, args.escritas, args.existentes)
+        print(f"{nome:<14} {resultado['escritas_por_segundo']:>11.1f} {resultado['p50_ms']:>9.2f} "
+              f"{resultado['p95_ms']:>9.2f} {resultado['erros']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+""" Compara a inferência dos modelos Extra Trees no scikit-learn e na floresta compilada.
+
+Uso:
+    python -m benchmarks.floresta [--lotes 1 8 32 128 1000] [--repeticoes 30] [--json resultados.json]
+
+Os textos do conjunto de teste são vetorizados uma única vez e, para cada artefato e
+tamanho de lote, são medidos o `predict` do scikit-learn e o da floresta compilada sobre
+as mesmas linhas, sorteadas com semente fixa. Mostra a mediana e o p95 de cada chamada,
+a vazão (textos/s) e o ganho da versão compilada. Gere antes as florestas compiladas com
+`python -m ferramentas.compila_floresta`.
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from model.floresta import FlorestaCompilada
+from model.modelo import caminho_artefato, caminho_compilado, carrega_artefato
+from model.preprocessador import PreProcessadorScikitLearn
+from ferramentas.compila_floresta import ARTEFATOS
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+
+
+def mede(modelo, X, lote: int, repeticoes: int) -> list:
+    """ Duração, em milissegundos, de cada predição de `lote` linhas sorteadas de X. """
+    aleatorio = random.Random(7)
+    tempos = []
+    for _ in range(repeticoes):
+        linhas = aleatorio.sample(range(X.shape[0]), min(lote, X.shape[0]))
+        X_lote = X[linhas]
+        inicio = time.perf_counter()
+        modelo.predict(X_lote)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o predict do scikit-learn com o da floresta compilada.")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 8, 32, 128, 1000])
+    parser.add_argument("--repeticoes", type=int, default=30)
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    textos = pd.read_csv(url_X_teste)['content'].tolist()
+    X_teste = PreProcessadorScikitLearn().preparar_textos(textos)
+    resultados = []
+
+    for path_pkl in ARTEFATOS:
+        modelos = {
+            "sklearn": carrega_artefato(caminho_artefato(path_pkl)),
+            "compilado": FlorestaCompilada.carrega(caminho_compilado(path_pkl)),
+        }
+        print(f"\n{path_pkl}")
+        print(f"{'lote':>6} {'backend':<10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'textos/s':>10} {'ganho':>7}")
+        for lote in args.lotes:
+            medianas = {}
+            for backend, modelo in modelos.items():
+                tempos = mede(modelo, X_teste, lote, args.repeticoes)
+                p50, p95 = np.percentile(tempos, [50, 95])
+                medianas[backend] = p50
+                resultados.append({"artefato": path_pkl, "backend": backend, "lote": lote, "p50_ms": p50,
+                                   "p95_ms": p95, "textos_por_segundo": lote / (p50 / 1000)})
+                ganho = f"{medianas['sklearn'] / p50:>6.1f}x" if backend == "compilado" else ""
+                print(f"{lote:>6} {backend:<10} {p50:>9.3f} {p95:>9.3f} {lote / (p50 / 1000):>10.0f} {ganho:>7}")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+""" Mede a latência e a vazão de cada tipo de modelo, por etapa, com amostras fixas do conjunto de teste.
+
+Uso:
+    python -m benchmarks.latencia [--modelos pipeline-et model-et model-distilbert] [--lotes 1 8 32 128]
+                                  [--repeticoes 30] [--json resultados.json]
+                                  [--baseline baseline.json --tolerancia 0.10]
+
+Para cada modelo são medidos o tempo de carga a frio do pré-processador e do modelo, em um
+novo interpretador (inclui a importação do spaCy, do transformers e do torch), e, para cada
+tamanho de lote e faixa de comprimento de texto (terços curto, medio e longo do conjunto
+de teste), o tempo de pré-processamento (spaCy/tokenizador), de inferência e de ponta a ponta
+pelo POST /review/batch com o test client do Flask. Cada etapa é resumida em p50/p95/p99 e
+vazão (textos/s).
+
+Os textos são sorteados com semente fixa e a memoização do spaCy fica desligada, para que o
+pré-processamento seja medido de fato; no HTTP, os textos recebem um sufixo único para não
+cair na checagem de duplicados nem no cache de predições. Os reviews são gravados em uma base
+temporária (ver benchmarks/__init__.py) e removidos ao final.
+Com --baseline, a mediana e o p95 de cada medida são comparados com os de uma execução
+anterior e o comando termina com código 1 se algum piorar mais que a tolerância.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from model import Session, Review, PredicaoCache, CachePredicoes, TipoModelo, RegistroModelos, RegistroPreProcessadores
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+MODELOS = [TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_SCIKIT_LEARN, TipoModelo.MODEL_TRANSFORMERS]
+COMPRIMENTOS = ["curto", "medio", "longo"]
+ETAPAS = ["preprocessamento", "inferencia", "http"]
+
+
+def faixas_comprimento(textos: list) -> dict:
+    """ Divide os textos, ordenados pelo número de caracteres, em três faixas de mesmo tamanho. """
+    ordenados = sorted(textos, key=len)
+    terco = len(ordenados) // 3
+    return {"curto": ordenados[:terco], "medio": ordenados[terco:2 * terco], "longo": ordenados[2 * terco:]}
+
+
+def resume(tempos: list, lote: int) -> dict:
+    """ Percentis, em milissegundos, e vazão de uma série de medidas de um lote. """
+    tempos_ms = np.asarray(tempos) * 1000
+    p50, p95, p99 = np.percentile(tempos_ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "media_ms": round(float(tempos_ms.mean()), 3),
+        "textos_por_segundo": round(lote / float(np.mean(tempos)), 2),
+    }
+
+
+# Carga do pré-processador e do modelo em um novo interpretador: as bibliotecas já importadas
+# por este processo (spaCy, torch) deixariam apenas a carga do primeiro modelo a frio
+CODIGO_CARGA = """
+import json, sys, time
+from model import RegistroModelos, RegistroPreProcessadores
+inicio = time.perf_counter()
+RegistroPreProcessadores.obtem_preprocessador(sys.argv[1])
+meio = time.perf_counter()
+RegistroModelos.obtem_modelo(sys.argv[1])
+fim = time.perf_counter()
+print(json.dumps({"preprocessador_s": round(meio - inicio, 4), "modelo_s": round(fim - meio, 4)}))
+"""
+
+
+def mede_carga(tipo_modelo: str) -> dict:
+    """ Tempo de carga a frio do pré-processador e do modelo, com as importações, em um novo interpretador. """
+    saida = subprocess.run([sys.executable, "-c", CODIGO_CARGA, tipo_modelo], capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def mede_configuracao(cliente, tipo_modelo: str, textos: list, lote: int, repeticoes: int,
+                      aquecimento: int, aleatorio: random.Random, uids: list) -> dict:
+    """ Mede as três etapas de um modelo para um tamanho de lote e uma faixa de comprimento. """
+    preprocessador = RegistroPreProcessadores.obtem_preprocessador(tipo_modelo)
+    model = RegistroModelos.obtem_modelo(tipo_modelo)
+    tempos = {etapa: [] for etapa in ETAPAS}
+
+    for repeticao in range(aquecimento + repeticoes):
+        amostra = [aleatorio.choice(textos) for _ in range(lote)]
+
+        inicio = time.perf_counter()
+        X_input = preprocessador.preparar_textos(amostra)
+        meio = time.perf_counter()
+        model.realizar_predicao(X_input)
+        fim = time.perf_counter()
+
+        unicos = [f"{texto} #bench-{time.time_ns()}-{indice}" for indice, texto in enumerate(amostra)]
+        inicio_http = time.perf_counter()
+        resposta = cliente.post("/review/batch", json={"modelo": tipo_modelo, "textos": unicos})
+        fim_http = time.perf_counter()
+        dados = resposta.get_json()
+        if "error" in dados:
+            raise RuntimeError(f"Erro no POST /review/batch: {dados['error']}")
+        uids.extend(resultado["review"]["id"] for resultado in dados["resultados"] if "review" in resultado)
+
+        if repeticao >= aquecimento:
+            tempos["preprocessamento"].append(meio - inicio)
+            tempos["inferencia"].append(fim - meio)
+            tempos["http"].append(fim_http - inicio_http)
+
+    return {etapa: resume(valores, lote) for etapa, valores in tempos.items()}
+
+
+def remove_reviews(uids: list, modelos: list):
+    """ Remove os reviews e as predições em cache gravados pelo benchmark. """
+    session = Session()
+    try:
+        for inicio in range(0, len(uids), 500):
+            bloco = uids[inicio:inicio + 500]
+            textos = [texto for (texto,) in session.query(Review.texto).filter(Review.uid.in_(bloco))]
+            chaves = [CachePredicoes.chave(texto) for texto in textos]
+            session.query(PredicaoCache).filter(PredicaoCache.hash.in_(chaves), PredicaoCache.modelo.in_(modelos)) \
+                .delete(synchronize_session=False)
+            session.query(Review).filter(Review.uid.in_(bloco)).delete(synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def chave(resultado: dict) -> tuple:
+    return resultado["modelo"], resultado["lote"], resultado["comprimento"], resultado["etapa"]
+
+
+def compara(resultados: list, baseline: dict, tolerancia: float) -> list:
+    """ Compara p50 e p95 com a baseline e retorna as medidas que pioraram além da tolerância. """
+    anteriores = {chave(resultado): resultado for resultado in baseline["resultados"]}
+    regressoes = []
+    print(f"\nComparação com a baseline (tolerância {tolerancia:.0%})")
+    print(f"{'modelo':<22} {'lote':>5} {'comprimento':<12} {'etapa':<17} {'p50':>8} {'p95':>8}")
+    for resultado in resultados:
+        anterior = anteriores.get(chave(resultado))
+        if anterior is None:
+            continue
+        razoes = {p: resultado[p] / anterior[p] if anterior[p] else 1.0 for p in ("p50_ms", "p95_ms")}
+        piorou = any(razao > 1 + tolerancia for razao in razoes.values())
+        print(f"{resultado['modelo']:<22} {resultado['lote']:>5} {resultado['comprimento']:<12} {resultado['etapa']:<17} "
+              f"{razoes['p50_ms']:>7.2f}x {razoes['p95_ms']:>7.2f}x{'  REGRESSÃO' if piorou else ''}")
+        if piorou:
+            regressoes.append(resultado)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede latência e vazão dos modelos por etapa.")
+    parser.add_argument("--modelos", nargs="+", default=MODELOS, choices=TipoModelo.todos())
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--comprimentos", nargs="+", default=COMPRIMENTOS, choices=COMPRIMENTOS)
+    parser.add_argument("--repeticoes", type=int, default=30)
+    parser.add_argument("--aquecimento", type=int, default=3, help="execuções descartadas antes das medidas")
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--baseline", help="arquivo JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="piora máxima aceita de p50/p95 em relação à baseline")
+    args = parser.parse_args()
+
+    # Importado aqui para que o aquecimento da aplicação não interfira nas medidas. Sem a
+    # memoização do spaCy, os textos sorteados mais de uma vez continuam passando pela limpeza
+    os.environ["AQUECER_MODELOS"] = ""
+    os.environ["SPACY_MEMO_TAMANHO"] = "0"
+    from app import app
+
+    faixas = faixas_comprimento(pd.read_csv(url_X_teste)['content'].dropna().tolist())
+    cliente = app.test_client()
+    carga = {}
+    resultados = []
+    uids = []
+
+    try:
+        for tipo_modelo in args.modelos:
+            carga[tipo_modelo] = mede_carga(tipo_modelo)
+            print(f"\n{tipo_modelo}: carga do pré-processador {carga[tipo_modelo]['preprocessador_s']:.2f}s, "
+                  f"do modelo {carga[tipo_modelo]['modelo_s']:.2f}s")
+            print(f"{'lote':>5} {'comprimento':<12} {'etapa':<17} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'textos/s':>10}")
+            for lote in args.lotes:
+                for comprimento in args.comprimentos:
+                    aleatorio = random.Random(f"{args.semente}-{tipo_modelo}-{lote}-{comprimento}")
+                    medidas = mede_configuracao(cliente, tipo_modelo, faixas[comprimento], lote, args.repeticoes,
+                                                args.aquecimento, aleatorio, uids)
+                    for etapa, resumo in medidas.items():
+                        print(f"{lote:>5} {comprimento:<12} {etapa:<17} {resumo['p50_ms']:>9.2f} {resumo['p95_ms']:>9.2f} "
+                              f"{resumo['p99_ms']:>9.2f} {resumo['textos_por_segundo']:>10.1f}")
+                        resultados.append({"modelo": tipo_modelo, "lote": lote, "comprimento": comprimento,
+                                           "etapa": etapa, **resumo})
+    finally:
+        remove_reviews(uids, args.modelos)
+
+    relatorio = {
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(),
+                     "processador": platform.processor(), "cpus": os.cpu_count()},
+        "parametros": {"repeticoes": args.repeticoes, "aquecimento": args.aquecimento, "semente": args.semente},
+        "carga": carga,
+        "resultados": resultados,
+    }
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as arquivo:
+            regressoes = compara(resultados, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} medidas pioraram além da tolerância")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
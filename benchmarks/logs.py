@@ -0,0 +1,150 @@
+""" Compara o custo dos logs com os handlers síncronos anteriores e com a fila (QueueHandler/QueueListener).
+
+Uso:
+    python -m benchmarks.logs [--threads 8] [--registros 2000] [--requisicoes 500]
+
+Mede, em cada configuração, o tempo de cada chamada ao logger emitida por várias threads
+com o texto completo de um review, e a latência do POST /review de um review duplicado
+(que registra um aviso) pelo test client do Flask. Mede também o custo de uma linha DEBUG
+suprimida montada com f-string e com formatação preguiçosa (%s).
+
+A configuração síncrona reproduz a anterior: console e dois RotatingFileHandler com
+maxBytes=10000 chamados na própria thread da requisição. Os logs vão para um diretório
+temporário e o console para /dev/null nas duas configurações.
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+import pandas as pd
+
+import logger as modulo_logger
+from logger import configura_logs, FORMATO_PADRAO
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+
+
+def configura_sincrono(diretorio: str, console) -> None:
+    """ Handlers da configuração anterior, escrevendo na thread que emite o registro. """
+    formatador = logging.Formatter(FORMATO_PADRAO + " - call_trace=%(pathname)s L%(lineno)-4d")
+    handlers = [logging.StreamHandler(console)]
+    for nome in ("gunicorn.error.log", "gunicorn.detailed.log"):
+        handlers.append(RotatingFileHandler(os.path.join(diretorio, nome), maxBytes=10000, backupCount=10, delay=True))
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    for handler in handlers:
+        handler.setFormatter(formatador)
+        raiz.addHandler(handler)
+    raiz.setLevel(logging.INFO)
+
+
+def mede_chamadas(texto: str, threads: int, registros: int) -> list:
+    """ Duração, em microssegundos, de cada chamada ao logger feita por `threads` threads simultâneas. """
+    log = logging.getLogger("benchmark")
+    tempos = []
+    lock = threading.Lock()
+
+    def emite():
+        locais = []
+        for indice in range(registros):
+            inicio = time.perf_counter()
+            log.warning("Erro ao adicionar review '%s', %s", texto, "Review já existente na base :/")
+            locais.append((time.perf_counter() - inicio) * 1e6)
+        with lock:
+            tempos.extend(locais)
+
+    executando = [threading.Thread(target=emite) for _ in range(threads)]
+    for thread in executando:
+        thread.start()
+    for thread in executando:
+        thread.join()
+    return tempos
+
+
+def mede_requisicoes(cliente, texto: str, requisicoes: int) -> list:
+    """ Latência, em milissegundos, do POST /review de um review duplicado. """
+    tempos = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        cliente.post("/review", data={"texto": texto, "modelo": "pipeline-et"})
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def mede_debug_suprimido(texto: str, repeticoes: int = 200000) -> tuple:
+    """ Custo médio, em nanossegundos, de uma linha DEBUG suprimida com f-string e com %s. """
+    log = logging.getLogger("benchmark")
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        log.debug(f"Adicionando review : '{texto}'")
+    meio = time.perf_counter()
+    for _ in range(repeticoes):
+        log.debug("Adicionando review : '%s'", texto)
+    fim = time.perf_counter()
+    return (meio - inicio) / repeticoes * 1e9, (fim - meio) / repeticoes * 1e9
+
+
+def resume(tempos: list) -> str:
+    p50, p95, p99 = np.percentile(tempos, [50, 95, 99])
+    return f"média {statistics.mean(tempos):8.2f}  p50 {p50:8.2f}  p95 {p95:8.2f}  p99 {p99:8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o custo dos logs síncronos e com fila.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--registros", type=int, default=2000, help="registros emitidos por thread")
+    parser.add_argument("--requisicoes", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ["AQUECER_MODELOS"] = ""
+    from app import app
+    from model import Session, Review
+
+    # O review mais longo do conjunto de teste, como nos avisos de duplicado
+    texto = max(pd.read_csv(url_X_teste)['content'].dropna().tolist(), key=len)
+    session = Session()
+    review = Review(texto=texto, sentimento=1, modelo="pipeline-et", data_criacao=datetime.now())
+    existente = session.query(Review).filter(Review.texto == texto, Review.modelo == "pipeline-et").first()
+    if existente is None:
+        session.add(review)
+        session.commit()
+    cliente = app.test_client()
+    modulo_logger.listener.stop()
+
+    try:
+        with tempfile.TemporaryDirectory() as diretorio, open(os.devnull, "w") as console:
+            configura_sincrono(diretorio, console)
+            chamadas_sincrono = mede_chamadas(texto, args.threads, args.registros)
+            requisicoes_sincrono = mede_requisicoes(cliente, texto, args.requisicoes)
+
+            listener = configura_logs(diretorio=diretorio, formato_json=False, nivel="INFO", console=console)
+            chamadas_fila = mede_chamadas(texto, args.threads, args.registros)
+            requisicoes_fila = mede_requisicoes(cliente, texto, args.requisicoes)
+            listener.stop()
+
+            debug_fstring, debug_preguicoso = mede_debug_suprimido(texto)
+    finally:
+        if existente is None:
+            session.delete(review)
+            session.commit()
+        session.close()
+
+    print(f"Chamada ao logger, {args.threads} threads (µs)")
+    print(f"  síncrono  {resume(chamadas_sincrono)}")
+    print(f"  fila      {resume(chamadas_fila)}")
+    print(f"POST /review de um review duplicado (ms)")
+    print(f"  síncrono  {resume(requisicoes_sincrono)}")
+    print(f"  fila      {resume(requisicoes_fila)}")
+    print(f"DEBUG suprimido: f-string {debug_fstring:.0f} ns, %s {debug_preguicoso:.0f} ns por chamada")
+
+
+if __name__ == "__main__":
+    main()
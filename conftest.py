@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+import pytest
+
+# Os testes usam uma base e um diretório de logs temporários, e não os da aplicação (database/ e
+# log/), e não aquecem modelos
+os.environ.setdefault("DB_DIRETORIO", tempfile.mkdtemp(prefix="teste-reviews-"))
+os.environ.setdefault("LOG_DIRETORIO", tempfile.mkdtemp(prefix="teste-logs-"))
+os.environ.setdefault("AQUECER_MODELOS", "")
+
+
+@pytest.fixture
+def cliente():
+    """ Test client do Flask da aplicação, com a base temporária. """
+    from app import app
+    return app.test_client()
@@ -0,0 +1,2 @@
+# Ferramentas de linha de comando para exportação de artefatos, avaliação e manutenção.
+# Execute a partir da raiz do projeto, ex.: python -m ferramentas.quantizar_modelo
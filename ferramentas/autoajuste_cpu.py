@@ -0,0 +1,129 @@
+""" Escolhe a divisão dos núcleos entre workers do gunicorn e threads por worker com a carga do benchmark.
+
+Uso:
+    python -m ferramentas.autoajuste_cpu [--modelos pipeline-et model-distilbert] [--lote 8]
+                                         [--clientes N] [--duracao 20] [--aquecimento 5]
+                                         [--candidatos 4x1 2x2 1x4] [--modo sync] [--p95-maximo 500]
+                                         [--json autoajuste.json]
+
+Para cada divisão candidata (workers x threads, por padrão todas as potências de 2 de workers
+com workers * threads igual aos núcleos disponíveis) a aplicação é iniciada com o gunicorn.conf.py
+em uma porta local, com GUNICORN_WORKERS e CPU_THREADS_POR_WORKER definidos (ver RecursosCPU).
+Após o aquecimento, `clientes` threads enviam lotes de `lote` textos do conjunto de teste ao
+POST /review/batch, alternando entre os modelos, durante `duracao` segundos. Como no
+benchmarks.latencia, os textos recebem um sufixo único para não cair na checagem de duplicados
+nem no cache de predições, e os servidores gravam na base temporária dos benchmarks (ver
+benchmarks/__init__.py), não na base da aplicação.
+
+A divisão sugerida é a de maior vazão entre as que atendem ao --p95-maximo (em ms), quando informado.
+"""
+import argparse
+import json
+import sys
+import tempfile
+
+import pandas as pd
+
+# Importado antes do pacote model: define a base temporária (DB_DIRETORIO) usada pelos servidores
+from benchmarks.carga import MODOS, inicia_servidor, aguarda_servidor, encerra_servidor, gera_carga
+from benchmarks.latencia import remove_reviews, url_X_teste
+from model.modelo import TipoModelo
+from model.recursos import RecursosCPU
+
+MODELOS = [TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_TRANSFORMERS]
+
+
+def candidatos_padrao(nucleos: int) -> list:
+    """ Divisões (workers, threads) com 1, 2, 4... workers até o número de núcleos, usando todos eles. """
+    candidatos = []
+    workers = 1
+    while workers <= nucleos:
+        candidatos.append((workers, nucleos // workers))
+        workers *= 2
+    if candidatos[-1][0] != nucleos:
+        candidatos.append((nucleos, 1))
+    return candidatos
+
+
+def le_candidato(valor: str) -> tuple:
+    """ Converte "WxT" em (workers, threads). """
+    try:
+        workers, threads = (int(parte) for parte in valor.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Candidato inválido: {valor} (use WORKERSxTHREADS, como 2x4)")
+    return workers, threads
+
+
+def mede_candidato(workers: int, threads: int, porta: int, args, textos: list, uids: list) -> dict:
+    url = f"http://127.0.0.1:{porta}"
+    with tempfile.TemporaryDirectory(prefix="autoajuste-metricas-") as diretorio_metricas:
+        servidor = inicia_servidor(porta, workers, args.modelos, diretorio_metricas, MODOS[args.modo],
+                                   ambiente={"CPU_THREADS_POR_WORKER": str(threads)})
+        try:
+            estatisticas = aguarda_servidor(servidor, url)
+            semente = f"{args.semente}-{workers}x{threads}"
+            gera_carga(url, textos, args.modelos, args.lote, args.clientes, args.aquecimento, semente + "-aquecimento", uids)
+            resultado = gera_carga(url, textos, args.modelos, args.lote, args.clientes, args.duracao, semente, uids)
+        finally:
+            encerra_servidor(servidor)
+    return {"workers": workers, "threads": threads, "cpu": estatisticas.get("cpu"), **resultado}
+
+
+def escolhe(resultados: list, p95_maximo: float = None):
+    """ Resultado de maior vazão, sem erros, entre os que atendem ao p95 máximo. """
+    aceitos = [resultado for resultado in resultados
+               if resultado["requisicoes"] and not resultado["erros"] and not resultado["recusadas"]
+               and (p95_maximo is None or resultado["p95_ms"] <= p95_maximo)]
+    return max(aceitos, key=lambda resultado: resultado["textos_por_segundo"]) if aceitos else None
+
+
+def main():
+    nucleos = RecursosCPU.nucleos_disponiveis()
+    parser = argparse.ArgumentParser(description="Escolhe a divisão de núcleos entre workers e threads pela vazão.")
+    parser.add_argument("--modelos", nargs="+", default=MODELOS, choices=TipoModelo.todos())
+    parser.add_argument("--lote", type=int, default=8, help="textos por requisição")
+    parser.add_argument("--clientes", type=int, default=2 * nucleos, help="requisições simultâneas")
+    parser.add_argument("--duracao", type=float, default=20, help="segundos de medida por candidato")
+    parser.add_argument("--aquecimento", type=float, default=5, help="segundos de carga descartados por candidato")
+    parser.add_argument("--candidatos", type=le_candidato, nargs="+", default=candidatos_padrao(nucleos),
+                        help="divisões WORKERSxTHREADS a medir")
+    parser.add_argument("--modo", default="sync", choices=list(MODOS), help="workers síncronos (app:app) ou asgi:app")
+    parser.add_argument("--p95-maximo", type=float, help="p95 máximo, em ms, da divisão sugerida")
+    parser.add_argument("--porta", type=int, default=5090, help="porta local usada pelos servidores de teste")
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args()
+
+    textos = pd.read_csv(url_X_teste)['content'].dropna().tolist()
+    resultados = []
+    uids = []
+
+    print(f"{nucleos} núcleos, {args.clientes} clientes, lotes de {args.lote} textos, modelos: {', '.join(args.modelos)}")
+    print(f"{'workers':>7} {'threads':>7} {'textos/s':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'erros':>6}")
+    try:
+        for workers, threads in args.candidatos:
+            resultado = mede_candidato(workers, threads, args.porta, args, textos, uids)
+            resultados.append(resultado)
+            print(f"{workers:>7} {threads:>7} {resultado['textos_por_segundo']:>10.1f} {resultado['p50_ms']:>9.2f} "
+                  f"{resultado['p95_ms']:>9.2f} {resultado['erros']:>6}")
+    finally:
+        remove_reviews(uids, args.modelos)
+
+    melhor = escolhe(resultados, args.p95_maximo)
+    if melhor:
+        print(f"Divisão sugerida: GUNICORN_WORKERS={melhor['workers']} CPU_THREADS_POR_WORKER={melhor['threads']} "
+              f"({melhor['textos_por_segundo']:.1f} textos/s, p95 {melhor['p95_ms']:.1f} ms)")
+    else:
+        print("Nenhuma divisão atendeu aos critérios")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump({"nucleos": nucleos, "parametros": {"modelos": args.modelos, "lote": args.lote,
+                                                          "clientes": args.clientes, "duracao": args.duracao},
+                       "resultados": resultados, "sugerido": melhor}, arquivo, indent=2)
+    if not melhor:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
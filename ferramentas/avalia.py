@@ -0,0 +1,47 @@
+""" Avalia os modelos no conjunto de teste com o pré-processamento em cache.
+
+Uso:
+    python -m ferramentas.avalia [--modelos pipeline-et model-et model-distilbert] [--dados arquivo.csv]
+                                 [--tamanho-lote 256] [--cache ./machine-learning/cache/]
+
+Sem --dados, usa os arquivos X_test/y_test do repositório. Com --dados, usa a divisão de
+teste estratificada do arquivo (20%, semente 7), a mesma do test_modelos.py. Os textos
+pré-processados ficam em cache em disco (ver model/cache_avaliacao.py), de forma que só a
+primeira execução paga a limpeza do spaCy e a tokenização. Mostra, para cada modelo, a
+acurácia, a vazão da inferência em lotes e o tempo de preparação da entrada.
+"""
+import argparse
+
+import pandas as pd
+
+from model import Avaliador, CacheAvaliacao, TipoModelo
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+url_y_teste = "./machine-learning/data/y_test_dataset_sentiment.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avalia os modelos com o pré-processamento em cache.")
+    parser.add_argument("--modelos", nargs="+",
+                        default=[TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_SCIKIT_LEARN, TipoModelo.MODEL_TRANSFORMERS])
+    parser.add_argument("--dados", help="CSV com as colunas content e score, dividido em treino e teste")
+    parser.add_argument("--tamanho-lote", type=int, default=256)
+    parser.add_argument("--cache", help="diretório do cache (padrão CACHE_AVALIACAO_DIR ou ./machine-learning/cache/)")
+    args = parser.parse_args()
+
+    cache = CacheAvaliacao(args.cache)
+    if args.dados:
+        textos, y = cache.separa_teste(args.dados)
+    else:
+        textos = pd.read_csv(url_X_teste)['content'].tolist()
+        y = pd.read_csv(url_y_teste)['sentiment'].to_numpy()
+
+    print(f"{'modelo':<22} {'acurácia':>9} {'textos/s':>10} {'inferência (s)':>15} {'preparação (s)':>15}")
+    for tipo_modelo in args.modelos:
+        resultado = Avaliador.avaliar_com_cache(tipo_modelo, textos, y, tamanho_lote=args.tamanho_lote, cache=cache)
+        print(f"{tipo_modelo:<22} {resultado['acuracia']:>9.4f} {resultado['textos_por_segundo']:>10.1f} "
+              f"{resultado['duracao_inferencia_s']:>15.2f} {resultado['duracao_preparacao_s']:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+""" Compila os modelos Extra Trees para arrays contíguos e confere as predições no conjunto de teste.
+
+Uso:
+    python -m ferramentas.compila_floresta
+
+Cada artefato scikit-learn (pipeline e modelo) é convertido para a floresta compilada de
+model/floresta.py e gravado no diretório `<artefato>_compilado/`, usado quando
+BACKEND_FLORESTA=compilado. Termina com código 1 se as classes ou as probabilidades da
+floresta compilada diferirem das do modelo original em algum texto do conjunto de teste.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from model.floresta import FlorestaCompilada
+from model.modelo import caminho_compilado, carrega_artefato
+from model.preprocessador import PreProcessadorScikitLearn
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+
+ARTEFATOS = [
+    './machine-learning/pipelines/et_sentiment_pipeline.pkl',
+    './machine-learning/models/et_sentiment_classifier.pkl',
+]
+
+
+def compila(path_pkl: str) -> tuple:
+    """ Compila e grava a floresta do artefato, retornando o modelo original e o compilado. """
+    original = carrega_artefato(path_pkl)
+    destino = caminho_compilado(path_pkl)
+    FlorestaCompilada.compila(original).salva(destino)
+    return original, FlorestaCompilada.carrega(destino)
+
+
+def cronometra(funcao, X) -> tuple:
+    """ Retorna o resultado e a duração, em segundos, da chamada. """
+    inicio = time.perf_counter()
+    resultado = funcao(X)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    textos = pd.read_csv(url_X_teste)['content'].tolist()
+    X_teste = PreProcessadorScikitLearn().preparar_textos(textos)
+
+    divergentes = False
+    for path_pkl in ARTEFATOS:
+        original, compilado = compila(path_pkl)
+        proba_original, tempo_original = cronometra(original.predict_proba, X_teste)
+        proba_compilado, tempo_compilado = cronometra(compilado.predict_proba, X_teste)
+        iguais = np.array_equal(original.predict(X_teste), compilado.predict(X_teste))
+        identicas = np.array_equal(proba_original, proba_compilado)
+
+        print(f"{path_pkl} -> {caminho_compilado(path_pkl)} ({compilado.n_arvores} árvores, "
+              f"{len(compilado.chaves)} nós internos, {len(compilado.valores)} folhas)")
+        print(f"  predições iguais: {iguais}, probabilidades idênticas: {identicas}, "
+              f"{len(textos)} textos em {tempo_original:.3f}s (scikit-learn) e {tempo_compilado:.3f}s (compilado)")
+        divergentes = divergentes or not (iguais and identicas)
+
+    if divergentes:
+        print("A floresta compilada diverge do modelo original", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+""" Converte os modelos scikit-learn de pickle para joblib sem compressão.
+
+Uso:
+    python -m ferramentas.exporta_artefatos
+
+No formato joblib os arrays NumPy ficam alinhados no arquivo e são carregados com
+mmap_mode='r', de forma que os workers do gunicorn leem as mesmas páginas do cache do
+sistema operacional. Os modelos passam a ser carregados da versão .joblib quando ela
+existe (ver caminho_artefato em model/modelo.py).
+"""
+import os
+
+import joblib
+
+from model.modelo import carrega_artefato
+
+ARTEFATOS = [
+    './machine-learning/pipelines/et_sentiment_pipeline.pkl',
+    './machine-learning/models/et_sentiment_classifier.pkl',
+]
+
+
+def exporta(path_pkl: str) -> str:
+    """ Grava a versão .joblib do artefato e retorna o caminho gerado. """
+    path_joblib = os.path.splitext(path_pkl)[0] + '.joblib'
+    # Sem compressão: arquivos comprimidos não podem ser mapeados em memória
+    joblib.dump(carrega_artefato(path_pkl), path_joblib, compress=0)
+    return path_joblib
+
+
+def main():
+    for path_pkl in ARTEFATOS:
+        path_joblib = exporta(path_pkl)
+        print(f"{path_pkl} ({os.path.getsize(path_pkl) / 2**20:.1f} MB) -> "
+              f"{path_joblib} ({os.path.getsize(path_joblib) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
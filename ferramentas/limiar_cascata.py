@@ -0,0 +1,104 @@
+""" Varre o limiar de confiança da cascata pipeline-et -> DistilBERT no conjunto de teste.
+
+Uso:
+    python -m ferramentas.limiar_cascata [--limiares 0.5 0.55 ... 1.0] [--tolerancia 0.005] [--json curva.json]
+
+Os dois modelos analisam todos os textos do conjunto de teste uma única vez: o pipeline-et
+com `predict_proba` e o DistilBERT com a predição normal. O custo médio de cada modelo por
+texto é medido nessas execuções. Para cada limiar, os textos com confiança do pipeline-et
+abaixo dele usam a predição do DistilBERT, o que dá a acurácia da cascata, a fração de textos
+enviados ao DistilBERT e o custo médio estimado por texto (pipeline-et em todos os textos
+mais o DistilBERT nos enviados).
+
+Sugere o menor limiar cuja acurácia fica a até `tolerancia` da acurácia do DistilBERT, a
+ser usado em LIMIAR_CASCATA.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from model import TipoModelo, RegistroModelos, RegistroPreProcessadores
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+url_y_teste = "./machine-learning/data/y_test_dataset_sentiment.csv"
+LIMIARES = [round(0.5 + 0.025 * passo, 3) for passo in range(21)]
+
+
+def executa(funcao, *argumentos) -> tuple:
+    """ Retorna o resultado e a duração, em segundos, da chamada. """
+    inicio = time.perf_counter()
+    resultado = funcao(*argumentos)
+    return resultado, time.perf_counter() - inicio
+
+
+def curva(confianca: np.ndarray, predicoes_et: np.ndarray, predicoes_tf: np.ndarray, y: np.ndarray,
+          custo_et: float, custo_tf: float, limiares: list) -> list:
+    """ Acurácia, fração enviada ao DistilBERT e custo médio por texto da cascata em cada limiar. """
+    pontos = []
+    for limiar in limiares:
+        incertos = confianca < limiar
+        predicoes = np.where(incertos, predicoes_tf, predicoes_et)
+        pontos.append({
+            "limiar": limiar,
+            "acuracia": float((predicoes == y).mean()),
+            "fracao_distilbert": float(incertos.mean()),
+            "custo_medio_ms": (custo_et + incertos.mean() * custo_tf) * 1000,
+        })
+    return pontos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curva de acurácia x custo do limiar da cascata.")
+    parser.add_argument("--limiares", type=float, nargs="+", default=LIMIARES)
+    parser.add_argument("--tolerancia", type=float, default=0.005,
+                        help="perda máxima de acurácia, em relação ao DistilBERT, do limiar sugerido")
+    parser.add_argument("--json", help="grava a curva neste arquivo JSON")
+    args = parser.parse_args()
+
+    textos = pd.read_csv(url_X_teste)['content'].tolist()
+    y = pd.read_csv(url_y_teste)['sentiment'].to_numpy()
+
+    pp_et = RegistroPreProcessadores.obtem_preprocessador(TipoModelo.PIPELINE_SCIKIT_LEARN)
+    model_et = RegistroModelos.obtem_modelo(TipoModelo.PIPELINE_SCIKIT_LEARN)
+    pp_tf = RegistroPreProcessadores.obtem_preprocessador(TipoModelo.MODEL_TRANSFORMERS)
+    model_tf = RegistroModelos.obtem_modelo(TipoModelo.MODEL_TRANSFORMERS)
+
+    # Custo por texto inclui o pré-processamento de cada modelo
+    probabilidades, tempo_et = executa(lambda: model_et.calcula_probabilidades(pp_et.preparar_textos(textos)))
+    predicoes_tf, tempo_tf = executa(lambda: model_tf.realizar_predicao(pp_tf.preparar_textos(textos)))
+    custo_et, custo_tf = tempo_et / len(textos), tempo_tf / len(textos)
+
+    confianca = probabilidades.max(axis=1)
+    predicoes_et = np.asarray(model_et.classes).take(np.argmax(probabilidades, axis=1))
+    acuracia_et = float((predicoes_et == y).mean())
+    acuracia_tf = float((predicoes_tf == y).mean())
+    pontos = curva(confianca, predicoes_et, np.asarray(predicoes_tf), y, custo_et, custo_tf, sorted(args.limiares))
+
+    print(f"{len(textos)} textos: pipeline-et {acuracia_et:.4f} ({custo_et * 1000:.2f} ms/texto), "
+          f"model-distilbert {acuracia_tf:.4f} ({custo_tf * 1000:.2f} ms/texto)")
+    print(f"{'limiar':>7} {'acurácia':>9} {'distilbert':>11} {'custo (ms/texto)':>17}")
+    for ponto in pontos:
+        print(f"{ponto['limiar']:>7.3f} {ponto['acuracia']:>9.4f} {ponto['fracao_distilbert']:>10.1%} "
+              f"{ponto['custo_medio_ms']:>17.2f}")
+
+    aceitos = [ponto for ponto in pontos if ponto["acuracia"] >= acuracia_tf - args.tolerancia]
+    if aceitos:
+        sugerido = aceitos[0]
+        print(f"Limiar sugerido: LIMIAR_CASCATA={sugerido['limiar']} (acurácia {sugerido['acuracia']:.4f}, "
+              f"{sugerido['fracao_distilbert']:.1%} dos textos no DistilBERT, "
+              f"{custo_tf / (sugerido['custo_medio_ms'] / 1000):.1f}x mais barato que o DistilBERT)")
+    else:
+        print(f"Nenhum limiar atinge a acurácia do DistilBERT com tolerância de {args.tolerancia}")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump({"acuracia_pipeline_et": acuracia_et, "acuracia_distilbert": acuracia_tf,
+                       "custo_pipeline_et_ms": custo_et * 1000, "custo_distilbert_ms": custo_tf * 1000,
+                       "curva": pontos}, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+""" Analisa o sentimento dos textos de um arquivo CSV de qualquer tamanho, fora da API.
+
+Uso:
+    python -m ferramentas.pontuar entrada.csv saida.csv [--modelo pipeline-et] [--coluna content]
+                                  [--tamanho-lote 2000] [--processos N]
+
+O arquivo é lido em blocos (Carregador.carregar_em_lotes) e os blocos são analisados por
+um pool de processos, cada um com a sua cópia do modelo. No máximo `2 * processos` blocos
+ficam em memória ao mesmo tempo, e as predições são gravadas na ordem da entrada assim que
+cada bloco termina. A saída é CSV, ou Parquet se terminar em .parquet (requer pyarrow).
+A vazão em linhas por segundo é mostrada durante a execução e ao final.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from model.carregador import Carregador
+from model.executor_jobs import pontuar_bloco
+from model.modelo import TipoModelo
+from model.recursos import RecursosCPU
+
+
+def pontua(textos: list, tipo_modelo: str) -> list:
+    """ Analisa os textos não vazios do bloco; textos vazios ficam sem sentimento. """
+    indices = [indice for indice, texto in enumerate(textos) if texto]
+    sentimentos = [None] * len(textos)
+    if indices:
+        for indice, sentimento in zip(indices, pontuar_bloco([textos[indice] for indice in indices], tipo_modelo)):
+            sentimentos[indice] = sentimento
+    return sentimentos
+
+
+class EscritorCSV:
+    """ Grava os blocos no CSV de saída à medida que ficam prontos. """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.cabecalho = True
+
+    def grava(self, dt: pd.DataFrame):
+        dt.to_csv(self.caminho, mode='w' if self.cabecalho else 'a', header=self.cabecalho, index=False)
+        self.cabecalho = False
+
+    def fecha(self):
+        pass
+
+
+class EscritorParquet:
+    """ Grava cada bloco como um row group do arquivo Parquet de saída. """
+
+    def __init__(self, caminho: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            sys.exit("A saída em Parquet requer o pacote pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.caminho = caminho
+        self.escritor = None
+        self.esquema = pyarrow.schema([("content", pyarrow.string()), ("sentiment", pyarrow.int64())])
+
+    def grava(self, dt: pd.DataFrame):
+        if self.escritor is None:
+            self.escritor = self.pa.parquet.ParquetWriter(self.caminho, self.esquema)
+        self.escritor.write_table(self.pa.Table.from_pandas(dt, schema=self.esquema, preserve_index=False))
+
+    def fecha(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analisa o sentimento dos textos de um CSV com um pool de processos.")
+    parser.add_argument("entrada", help="arquivo CSV com os textos")
+    parser.add_argument("saida", help="arquivo de saída, .csv ou .parquet")
+    parser.add_argument("--modelo", default=TipoModelo.PIPELINE_SCIKIT_LEARN, choices=TipoModelo.todos())
+    parser.add_argument("--coluna", default="content", help="coluna com os textos")
+    parser.add_argument("--tamanho-lote", type=int, default=2000, help="linhas lidas e analisadas por bloco")
+    parser.add_argument("--processos", type=int, default=RecursosCPU.nucleos_disponiveis())
+    args = parser.parse_args()
+
+    escritor = EscritorParquet(args.saida) if args.saida.endswith(".parquet") else EscritorCSV(args.saida)
+    # Cada processo limita o torch, o BLAS e o spaCy à sua parte dos núcleos, para que o pool não os dispute
+    pool = ProcessPoolExecutor(max_workers=args.processos, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=RecursosCPU.inicia_processo,
+                               initargs=(RecursosCPU.threads_por_processo(args.processos),))
+
+    inicio = time.perf_counter()
+    linhas = 0
+    pendentes = deque()
+
+    def grava_mais_antigo():
+        nonlocal linhas
+        dt, futuro = pendentes.popleft()
+        escritor.grava(pd.DataFrame({"content": dt[args.coluna].tolist(),
+                                     "sentiment": pd.array(futuro.result(), dtype="Int64")}))
+        linhas += len(dt)
+        print(f"\r{linhas} linhas, {linhas / (time.perf_counter() - inicio):.1f} linhas/s", end="", file=sys.stderr)
+
+    try:
+        for dt in Carregador.carregar_em_lotes(args.entrada, args.tamanho_lote, coluna=args.coluna, rotulado=False):
+            pendentes.append((dt, pool.submit(pontua, dt[args.coluna].tolist(), args.modelo)))
+            # Limita os blocos em memória, aguardando a gravação do mais antigo
+            if len(pendentes) >= 2 * args.processos:
+                grava_mais_antigo()
+        while pendentes:
+            grava_mais_antigo()
+    finally:
+        escritor.fecha()
+        pool.shutdown(cancel_futures=True)
+
+    duracao = time.perf_counter() - inicio
+    print(file=sys.stderr)
+    print(f"{linhas} linhas analisadas com {args.modelo} em {duracao:.1f}s "
+          f"({linhas / duracao if duracao else 0.0:.1f} linhas/s, {args.processos} processos) -> {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+""" Exporta a versão int8 do DistilBERT e confere a acurácia contra o modelo original.
+
+Uso:
+    python -m ferramentas.quantizar_modelo [--tolerancia 0.01] [--destino caminho]
+
+Termina com código 1 se a acurácia do modelo quantizado, no conjunto de teste, ficar
+mais de `tolerancia` abaixo da acurácia do modelo original.
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+import pandas as pd
+import torch
+
+from model import Avaliador, ModelTransformers, ModelTransformersQuantizado, PreProcessadorTransformers
+
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+url_y_teste = "./machine-learning/data/y_test_dataset_sentiment.csv"
+
+
+def exportar(model_fp32: ModelTransformers, destino: str) -> str:
+    """ Quantiza uma cópia do modelo original e grava os pesos int8 e a configuração em `destino`. """
+    model_int8 = ModelTransformersQuantizado.quantizar(copy.deepcopy(model_fp32.model).to("cpu"))
+    os.makedirs(destino, exist_ok=True)
+    arquivo_pesos = os.path.join(destino, ModelTransformersQuantizado.ARQUIVO_PESOS)
+    torch.save(model_int8.state_dict(), arquivo_pesos)
+    model_fp32.model.config.save_pretrained(destino)
+    return arquivo_pesos
+
+
+def avaliar(model, X_input, y) -> tuple:
+    """ Retorna a acurácia e o tempo de predição do modelo no conjunto de teste. """
+    inicio = time.perf_counter()
+    acuracia = Avaliador.avaliar(model, X_input, y)
+    return acuracia, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta o DistilBERT quantizado em int8 e confere a acurácia.")
+    parser.add_argument("--destino", default="./machine-learning/models/tf_sentiment_classifier_int8/")
+    parser.add_argument("--tolerancia", type=float, default=0.01,
+                        help="perda máxima de acurácia aceita em relação ao modelo original")
+    args = parser.parse_args()
+
+    model_fp32 = ModelTransformers()
+    arquivo_pesos = exportar(model_fp32, args.destino)
+    model_int8 = ModelTransformersQuantizado(args.destino)
+
+    textos = pd.read_csv(url_X_teste)['content'].tolist()
+    y = pd.read_csv(url_y_teste)['sentiment']
+    X_input = PreProcessadorTransformers().preparar_textos(textos)
+
+    acuracia_fp32, tempo_fp32 = avaliar(model_fp32, X_input, y)
+    acuracia_int8, tempo_int8 = avaliar(model_int8, X_input, y)
+    tamanho_fp32 = os.path.getsize(os.path.join(model_fp32.path, "model.safetensors"))
+    tamanho_int8 = os.path.getsize(arquivo_pesos)
+
+    print(f"Pesos int8 gravados em {arquivo_pesos}")
+    print(f"{'modelo':<8} {'acurácia':>9} {'tempo (s)':>10} {'tamanho (MB)':>13}")
+    print(f"{'fp32':<8} {acuracia_fp32:>9.4f} {tempo_fp32:>10.2f} {tamanho_fp32 / 2**20:>13.1f}")
+    print(f"{'int8':<8} {acuracia_int8:>9.4f} {tempo_int8:>10.2f} {tamanho_int8 / 2**20:>13.1f}")
+    print(f"Aceleração: {tempo_fp32 / tempo_int8:.2f}x, variação de acurácia: {acuracia_int8 - acuracia_fp32:+.4f}")
+
+    if acuracia_fp32 - acuracia_int8 > args.tolerancia:
+        print(f"Perda de acurácia acima da tolerância de {args.tolerancia}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+""" Relatório de memória (RSS e PSS) dos workers do gunicorn.
+
+Uso:
+    python -m ferramentas.relatorio_memoria <pid do processo principal do gunicorn> [--json arquivo]
+
+O RSS conta todas as páginas mapeadas pelo processo, inclusive as compartilhadas; o PSS
+divide cada página compartilhada pelo número de processos que a usam. A diferença entre a
+soma dos RSS e a soma dos PSS é a memória economizada pelo compartilhamento entre os
+workers (preload + copy-on-write + mmap). Requer Linux (/proc/<pid>/smaps_rollup).
+"""
+import argparse
+import json
+import os
+
+CAMPOS = ["Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"]
+
+
+def filhos(pid: int) -> list:
+    """ Processos filhos diretos do processo informado. """
+    pids = []
+    for tarefa in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{tarefa}/children") as arquivo:
+            pids.extend(int(filho) for filho in arquivo.read().split())
+    return pids
+
+
+def memoria(pid: int) -> dict:
+    """ Campos de memória, em MB, lidos de /proc/<pid>/smaps_rollup. """
+    valores = {}
+    with open(f"/proc/{pid}/smaps_rollup") as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if partes and partes[0].rstrip(":") in CAMPOS:
+                valores[partes[0].rstrip(":")] = int(partes[1]) / 1024
+    return valores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de RSS/PSS dos workers do gunicorn.")
+    parser.add_argument("pid", type=int, help="pid do processo principal do gunicorn")
+    parser.add_argument("--json", help="grava o relatório neste arquivo JSON")
+    args = parser.parse_args()
+
+    processos = {"principal": args.pid}
+    processos.update({f"worker {pid}": pid for pid in filhos(args.pid)})
+    relatorio = {nome: memoria(pid) for nome, pid in processos.items()}
+
+    print(f"{'processo':<16}" + "".join(f"{campo:>15}" for campo in CAMPOS))
+    for nome, valores in relatorio.items():
+        print(f"{nome:<16}" + "".join(f"{valores.get(campo, 0):>13.1f}MB" for campo in CAMPOS))
+
+    workers = [valores for nome, valores in relatorio.items() if nome != "principal"]
+    total_rss = sum(valores["Rss"] for valores in relatorio.values())
+    total_pss = sum(valores["Pss"] for valores in relatorio.values())
+    print(f"\n{len(workers)} workers, soma RSS: {total_rss:.1f} MB, soma PSS (memória real): {total_pss:.1f} MB")
+    print(f"Memória economizada pelo compartilhamento: {total_rss - total_pss:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump({"processos": relatorio, "soma_rss_mb": total_rss, "soma_pss_mb": total_pss}, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
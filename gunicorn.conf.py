@@ -0,0 +1,63 @@
+# Configuração do gunicorn: carrega os modelos no processo principal antes do fork, para que
+# os workers compartilhem as páginas de memória dos artefatos (copy-on-write).
+#
+# Uso: gunicorn -c gunicorn.conf.py app:app
+import gc
+import os
+import shutil
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+
+# Os núcleos são divididos entre os workers (ver RecursosCPU): cada worker limita o torch, o
+# BLAS, o scikit-learn e o spaCy à sua parcela. Sugestão de divisão: python -m ferramentas.autoajuste_cpu
+os.environ.setdefault("CPU_WORKERS", str(workers))
+
+# Com PRELOAD_MODELOS=0 cada worker importa a aplicação e carrega os seus próprios modelos
+preload_app = os.environ.get("PRELOAD_MODELOS", "1") != "0"
+
+if preload_app:
+    # Todos os modelos são carregados antes do fork, mas sem inferência de teste (ver Analisador.aquecer)
+    os.environ.setdefault("AQUECER_MODELOS", "todos")
+    os.environ["AQUECER_SEM_INFERENCIA"] = "1"
+
+# Cada worker grava as suas métricas neste diretório e a rota /metrics agrega todos eles.
+# Precisa existir antes de a aplicação importar o prometheus_client (e, com o preload, antes
+# da carga dos modelos no processo principal); as métricas de execuções anteriores são descartadas.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/sentimento-metricas")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def pre_fork(server, worker):
+    # Move os objetos já carregados para a geração permanente do coletor de lixo, que deixa de
+    # percorrê-los: sem isso a coleta nos workers escreve nos cabeçalhos dos objetos e
+    # duplica as páginas compartilhadas
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Sem o preload, a aplicação aplica os limites de CPU ao ser importada no worker
+    if not preload_app:
+        return
+
+    from model import engine, Analisador, RecursosCPU
+
+    # Com o preload, o torch e o BLAS foram configurados no processo principal, mas os pools de
+    # threads não sobrevivem ao fork: os limites são reaplicados no worker
+    RecursosCPU.aplica()
+
+    # As conexões abertas no processo principal não podem ser usadas pelos workers
+    engine.dispose(close=False)
+
+    # Inferência de teste já no worker, com os artefatos compartilhados
+    modelos = Analisador.modelos_para_aquecer()
+    if modelos is None or modelos:
+        Analisador.aquecer(modelos)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Remove os arquivos de métricas "live" do worker encerrado
+    multiprocess.mark_process_dead(worker.pid)
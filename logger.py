@@ -1,71 +1,166 @@
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from contextvars import ContextVar
+import atexit
+import json
 import logging
 import os
+import queue
+import sys
 
 
-log_path = "log/"
+# Os testes apontam LOG_DIRETORIO para um diretório temporário (ver conftest.py)
+log_path = os.environ.get("LOG_DIRETORIO", "log/")
 # Verifica se o diretorio para armexanar os logs não existe
 if not os.path.exists(log_path):
    # então cria o diretorio
    os.makedirs(log_path)
 
+FORMATO_PADRAO = "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s"
+FORMATO_DETALHADO = "[%(asctime)s] %(levelname)-4s [%(id_requisicao)s] %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d"
 
-dictConfig({
-    "version": 1,
-    "disable_existing_loggers": True,
-    "formatters": {
-        "default": {
-            "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s",
-        },
-        "detailed": {
-            "format": "[%(asctime)s] %(levelname)-4s %(funcName)s() L%(lineno)-4d %(message)s - call_trace=%(pathname)s L%(lineno)-4d",
+# Identificador da requisição em atendimento, incluído em cada registro (ver app.py)
+id_requisicao: ContextVar = ContextVar("id_requisicao", default="-")
+
+# Atributos padrão de um LogRecord; os demais vêm do `extra` e entram no JSON
+ATRIBUTOS_PADRAO = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "id_requisicao"}
+
+
+class FiltroRequisicao(logging.Filter):
+    """ Copia o id da requisição para o registro na thread que o emitiu, antes de ir para a fila. """
+
+    def filter(self, record):
+        record.id_requisicao = id_requisicao.get()
+        return True
+
+
+class FormatadorJSON(logging.Formatter):
+    """ Formata cada registro como um objeto JSON em uma linha, com o id da requisição e os
+    campos passados em `extra` (ex.: duração de cada etapa).
+    """
+
+    def format(self, record):
+        registro = {
+            "data": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "funcao": record.funcName,
+            "linha": record.lineno,
+            "id_requisicao": getattr(record, "id_requisicao", "-"),
+            "mensagem": record.getMessage(),
         }
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "default",
-            "stream": "ext://sys.stdout",
+        registro.update({chave: valor for chave, valor in record.__dict__.items() if chave not in ATRIBUTOS_PADRAO})
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+def cria_handlers(diretorio: str, formato_json: bool, tamanho_maximo_mb: float, arquivos: int, console=None) -> list:
+    """ Cria os handlers que escrevem de fato os registros, executados pela thread do QueueListener.
+    Os registros do gunicorn vão para o arquivo de erros e os da aplicação para o detalhado.
+    """
+    padrao = FormatadorJSON() if formato_json else logging.Formatter(FORMATO_PADRAO)
+    detalhado = FormatadorJSON() if formato_json else logging.Formatter(FORMATO_DETALHADO)
+
+    console_handler = logging.StreamHandler(console or sys.stdout)
+    console_handler.setFormatter(padrao)
+
+    error_file = RotatingFileHandler(os.path.join(diretorio, "gunicorn.error.log"), maxBytes=int(tamanho_maximo_mb * 2**20),
+                                     backupCount=arquivos, delay=True)
+    error_file.setFormatter(detalhado)
+    error_file.addFilter(logging.Filter("gunicorn.error"))
+
+    detailed_file = RotatingFileHandler(os.path.join(diretorio, "gunicorn.detailed.log"), maxBytes=int(tamanho_maximo_mb * 2**20),
+                                        backupCount=arquivos, delay=True)
+    detailed_file.setFormatter(detalhado)
+    detailed_file.addFilter(lambda record: not record.name.startswith("gunicorn.error"))
+
+    return [console_handler, error_file, detailed_file]
+
+
+# Listeners criados por configura_logs e os QueueHandler que os alimentam
+configuracoes = []
+ganchos_registrados = False
+
+
+def reinicia_no_filho():
+    """ A thread de escrita não sobrevive ao fork dos workers do gunicorn: em cada listener
+    ativo, o filho usa uma nova fila e inicia a sua própria thread.
+    """
+    for listener, handler_fila in configuracoes:
+        if listener._thread is not None:
+            listener.queue = handler_fila.queue = queue.Queue(-1)
+            listener._thread = None
+            listener.start()
+
+
+def encerra():
+    """ Escreve os registros ainda na fila ao encerrar o processo. """
+    for listener, _ in configuracoes:
+        if listener._thread is not None:
+            listener.stop()
+
+
+def registra_ganchos():
+    """ Registra uma única vez, mesmo com várias chamadas a configura_logs, os ganchos do fork e
+    do encerramento do processo.
+    """
+    global ganchos_registrados
+    if ganchos_registrados:
+        return
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=reinicia_no_filho)
+    atexit.register(encerra)
+    ganchos_registrados = True
+
+
+def configura_logs(diretorio: str = log_path, formato_json: bool = None, nivel: str = None,
+                   tamanho_maximo_mb: float = None, arquivos: int = None, console=None) -> QueueListener:
+    """ Configura os logs em duas partes: os loggers apenas colocam os registros em uma fila
+    (QueueHandler) e uma thread dedicada (QueueListener) os formata e escreve no console e
+    nos arquivos, de forma que as requisições não esperam pela escrita em disco.
+
+    Os parâmetros não informados vêm das variáveis de ambiente LOG_JSON, LOG_NIVEL,
+    LOG_TAMANHO_MAXIMO_MB e LOG_ARQUIVOS.
+    """
+    if formato_json is None:
+        formato_json = os.environ.get("LOG_JSON", "0") == "1"
+    nivel = nivel or os.environ.get("LOG_NIVEL", "INFO").upper()
+    tamanho_maximo_mb = tamanho_maximo_mb or float(os.environ.get("LOG_TAMANHO_MAXIMO_MB", 10))
+    arquivos = arquivos or int(os.environ.get("LOG_ARQUIVOS", 5))
+
+    fila = queue.Queue(-1)
+    handler_fila = QueueHandler(fila)
+    handler_fila.addFilter(FiltroRequisicao())
+
+    dictConfig({
+        "version": 1,
+        "disable_existing_loggers": True,
+        "handlers": {
+            "fila": {"()": lambda: handler_fila},
         },
-        # "email": {
-        #     "class": "logging.handlers.SMTPHandler",
-        #     "formatter": "default",
-        #     "level": "ERROR",
-        #     "mailhost": ("smtp.example.com", 587),
-        #     "fromaddr": "devops@example.com",
-        #     "toaddrs": ["receiver@example.com", "receiver2@example.com"],
-        #     "subject": "Error Logs",
-        #     "credentials": ("username", "password"),
-        # },
-        "error_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "detailed",
-            "filename": "log/gunicorn.error.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
-            "delay": "True",
+        "loggers": {
+            "gunicorn.error": {
+                "handlers": ["fila"],
+                "level": "INFO",
+                "propagate": False,
+            }
         },
-        "detailed_file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "detailed",
-            "filename": "log/gunicorn.detailed.log",
-            "maxBytes": 10000,
-            "backupCount": 10,
-            "delay": "True",
-        }
-    },
-    "loggers": {
-        "gunicorn.error": {
-            "handlers": ["console", "error_file"],  #, email],
-            "level": "INFO",
-            "propagate": False,
+        "root": {
+            "handlers": ["fila"],
+            "level": nivel,
         }
-    },
-    "root": {
-        "handlers": ["console", "detailed_file"],
-        "level": "INFO",
-    }
-})
+    })
+
+    listener = QueueListener(fila, *cria_handlers(diretorio, formato_json, tamanho_maximo_mb, arquivos, console),
+                             respect_handler_level=True)
+    listener.start()
+
+    # Configurações anteriores já encerradas deixam de ser acompanhadas pelos ganchos
+    configuracoes[:] = [(ativo, fila_ativa) for ativo, fila_ativa in configuracoes if ativo._thread is not None]
+    configuracoes.append((listener, handler_fila))
+    registra_ganchos()
+    return listener
+
 
+listener = configura_logs()
 
 logger = logging.getLogger(__name__)
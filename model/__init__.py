@@ -1,25 +1,44 @@
 from sqlalchemy_utils import database_exists, create_database
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 import os
 
 # importando os elementos definidos no modelo
 from model.base import Base
+from model.banco import cria_engine
 from model.review import Review
+from model.repositorio import RepositorioReview
+from model.predicao import PredicaoCache
+from model.job import Job
+from model.cache import CachePredicoes
+from model.busca import IndiceTextual
+from model.resumo import ResumoSentimentos
+from model.cache_respostas import CacheRespostas
+from model.migracao import Migracao
+from model.metricas import Metricas
+from model.recursos import RecursosCPU
 from model.modelo import Model
 from model.modelo import TipoModelo
 from model.modelo import ModelFactory
 from model.modelo import ModelSciKitLearn
 from model.modelo import ModelTransformers
+from model.modelo import ModelTransformersQuantizado
 from model.modelo import PipelineSciKitLearn
+from model.modelo import RegistroModelos
+from model.floresta import FlorestaCompilada
 from model.preprocessador import PreProcessador
 from model.preprocessador import PreProcessadorFactory
 from model.preprocessador import PreProcessadorScikitLearn
 from model.preprocessador import PreProcessadorTransformers
+from model.preprocessador import RegistroPreProcessadores
+from model.analisador import Analisador
 from model.avaliador import Avaliador
+from model.cache_avaliacao import CacheAvaliacao
 from model.carregador import Carregador
+from model.executor_jobs import ExecutorJobs
+from model.executor_inferencia import ExecutorInferencia, InferenciaSaturada
 
-db_path = "database/"
+# diretório da base, "database/" por padrão (os benchmarks e os testes usam um diretório temporário)
+db_path = os.environ.get("DB_DIRETORIO", "database/")
 # Verifica se o diretorio não existe
 if not os.path.exists(db_path):
    # então cria o diretorio
@@ -28,15 +47,8 @@ if not os.path.exists(db_path):
 # url de acesso ao banco (essa é uma url de acesso ao sqlite local)
 db_url = 'sqlite:///%s/reviews.sqlite3' % db_path
 
-# cria a engine de conexão com o banco
-engine = create_engine(
-    db_url, 
-    echo=False,
-    pool_size=10,  # tamanho do pool conforme necessário
-    max_overflow=20,  # número máximo de conexões extras
-    pool_timeout=30,  # Tempo limite para obter uma conexão do pool
-    pool_recycle=1800  # Tempo de reciclagem das conexões (em segundos)    
-)
+# cria a engine de conexão com o banco (WAL e pragmas de desempenho, ver model/banco.py)
+engine = cria_engine(db_url)
 
 # Instancia um criador de seção com o banco
 Session = sessionmaker(bind=engine)
@@ -46,4 +58,16 @@ if not database_exists(engine.url):
     create_database(engine.url) 
 
 # cria as tabelas do banco, caso não existam
-Base.metadata.create_all(engine)
\ No newline at end of file
+Base.metadata.create_all(engine)
+
+# aplica as migrações pendentes em bases criadas por versões anteriores
+Migracao.aplica(engine)
+
+# cria o índice de texto completo dos reviews, caso não exista
+IndiceTextual.cria(engine)
+
+# cria o resumo de sentimentos por modelo e dia, mantido por triggers, caso não exista
+ResumoSentimentos.cria(engine)
+
+# cria a versão da tabela reviews que valida o cache de respostas de GET /review, caso não exista
+CacheRespostas.cria(engine)
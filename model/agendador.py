@@ -0,0 +1,99 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class AgendadorLotes:
+    """ Agrupa textos enviados por requisições concorrentes em um único lote de inferência.
+
+    Cada chamada a `analisar` coloca seus textos na fila e aguarda o resultado. Uma thread
+    dedicada retira os textos da fila até atingir `tamanho_maximo_lote` ou até que
+    `espera_maxima_ms` se passe desde o primeiro texto do lote, executa uma única
+    predição e devolve a cada chamador apenas o seu resultado.
+    """
+
+    def __init__(self, processar, tamanho_maximo_lote: int = 16, espera_maxima_ms: float = 5.0):
+        self.processar = processar
+        self.tamanho_maximo_lote = max(1, tamanho_maximo_lote)
+        self.espera_maxima = max(0.0, espera_maxima_ms) / 1000.0
+        self.lock = threading.Lock()
+        self.lotes_processados = 0
+        self.textos_processados = 0
+        self.tamanhos_lote = {}
+        self.__pid = None
+        self.__fila = None
+        self.__thread = None
+
+    def __inicia(self):
+        """ Cria a fila e a thread de processamento. Refeito após um fork, pois a thread
+        do processo pai não existe no processo filho.
+        """
+        with self.lock:
+            if self.__pid == os.getpid() and self.__thread.is_alive():
+                return
+            self.__pid = os.getpid()
+            self.__fila = queue.Queue()
+            self.__thread = threading.Thread(target=self.__executa, name="agendador-lotes", daemon=True)
+            self.__thread.start()
+
+    def analisar(self, textos: list) -> list:
+        """ Envia os textos para o próximo lote e aguarda as predições, na mesma ordem. """
+        if self.__pid != os.getpid() or self.__thread is None or not self.__thread.is_alive():
+            self.__inicia()
+
+        futuros = []
+        for texto in textos:
+            futuro = Future()
+            self.__fila.put((texto, futuro))
+            futuros.append(futuro)
+        return [futuro.result() for futuro in futuros]
+
+    def __coleta_lote(self) -> list:
+        """ Bloqueia até o primeiro texto chegar e completa o lote até o limite de tamanho ou de espera. """
+        lote = [self.__fila.get()]
+        limite = time.monotonic() + self.espera_maxima
+        while len(lote) < self.tamanho_maximo_lote:
+            restante = limite - time.monotonic()
+            try:
+                if restante <= 0:
+                    lote.append(self.__fila.get_nowait())
+                else:
+                    lote.append(self.__fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def __executa(self):
+        while True:
+            lote = self.__coleta_lote()
+            textos = [texto for texto, _ in lote]
+            try:
+                predicoes = self.processar(textos)
+                # Sem esta checagem, os chamadores dos textos sem predição aguardariam para sempre
+                if len(predicoes) != len(lote):
+                    raise ValueError(f"{len(predicoes)} predições para um lote de {len(lote)} textos")
+                for (_, futuro), predicao in zip(lote, predicoes):
+                    futuro.set_result(predicao)
+            except Exception as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+
+            with self.lock:
+                self.lotes_processados += 1
+                self.textos_processados += len(lote)
+                self.tamanhos_lote[len(lote)] = self.tamanhos_lote.get(len(lote), 0) + 1
+
+    def estatisticas(self) -> dict:
+        """ Profundidade atual da fila e distribuição dos tamanhos de lote processados. """
+        with self.lock:
+            return {
+                "tamanho_maximo_lote": self.tamanho_maximo_lote,
+                "espera_maxima_ms": self.espera_maxima * 1000.0,
+                "profundidade_fila": self.__fila.qsize() if self.__fila is not None else 0,
+                "lotes_processados": self.lotes_processados,
+                "textos_processados": self.textos_processados,
+                "tamanho_medio_lote": round(self.textos_processados / self.lotes_processados, 2) if self.lotes_processados else 0.0,
+                "tamanhos_lote": {str(tamanho): total for tamanho, total in sorted(self.tamanhos_lote.items())},
+            }
@@ -0,0 +1,214 @@
+import os
+import threading
+import numpy as np
+
+from model.modelo import TipoModelo, RegistroModelos
+from model.preprocessador import RegistroPreProcessadores
+from model.agendador import AgendadorLotes
+from model.cache import CachePredicoes
+from model.metricas import Metricas
+
+
+class Analisador:
+    """ Classe que realiza a análise de sentimentos usando os modelos e
+    pré-processadores compartilhados do processo.
+    """
+
+    # Texto usado para a inferência de aquecimento
+    TEXTO_AQUECIMENTO = "O aplicativo é muito bom, a entrega chegou rápido."
+
+    # Confiança mínima do pipeline-et para que a cascata não envie o texto ao DistilBERT
+    # (ver `python -m ferramentas.limiar_cascata`)
+    LIMIAR_CASCATA = float(os.environ.get("LIMIAR_CASCATA", 0.8))
+
+    # Agendadores de lotes dinâmicos das versões do DistilBERT, criados no primeiro uso se habilitados
+    agendadores: dict = {}
+    __lock = threading.Lock()
+
+    @staticmethod
+    def analisar(textos, tipo_modelo: str):
+        """ Pré-processa os textos e realiza a predição do sentimento de cada um.
+        Requisições pequenas ao DistilBERT passam pelo agendador de lotes, se habilitado.
+        """
+        if tipo_modelo == TipoModelo.CASCATA:
+            return Analisador.analisar_cascata(textos)[0]
+
+        if tipo_modelo in TipoModelo.transformers():
+            agendador = Analisador.obtem_agendador(tipo_modelo)
+            if agendador is not None:
+                lista = [textos] if isinstance(textos, str) else list(textos)
+                if len(lista) < agendador.tamanho_maximo_lote:
+                    return np.asarray(agendador.analisar(lista))
+
+        return Analisador.analisar_direto(textos, tipo_modelo)
+
+    @staticmethod
+    def analisar_direto(textos, tipo_modelo: str):
+        """ Pré-processa os textos e realiza a predição em uma única chamada ao modelo.
+        As etapas são medidas nas métricas com o tipo de modelo informado.
+        """
+        if tipo_modelo == TipoModelo.CASCATA:
+            return Analisador.analisar_cascata(textos)[0]
+
+        with Metricas.modelo(tipo_modelo):
+            preprocessador = RegistroPreProcessadores.obtem_preprocessador(tipo_modelo)
+            model = RegistroModelos.obtem_modelo(tipo_modelo)
+
+            X_input = preprocessador.preparar_textos(textos)
+            predicoes = model.realizar_predicao(X_input)
+
+        Metricas.TEXTOS.labels(tipo_modelo).inc(len(predicoes))
+        return predicoes
+
+    @staticmethod
+    def analisar_cascata(textos, limiar: float = None) -> tuple:
+        """ Analisa os textos com o pipeline-et e envia ao DistilBERT apenas aqueles em que a
+        probabilidade da classe prevista fica abaixo do limiar (LIMIAR_CASCATA por padrão).
+        Retorna as predições e, para cada texto, o estágio que decidiu o sentimento.
+        """
+        limiar = Analisador.LIMIAR_CASCATA if limiar is None else limiar
+        lista = [textos] if isinstance(textos, str) else list(textos)
+
+        with Metricas.modelo(TipoModelo.CASCATA):
+            preprocessador = RegistroPreProcessadores.obtem_preprocessador(TipoModelo.PIPELINE_SCIKIT_LEARN)
+            model = RegistroModelos.obtem_modelo(TipoModelo.PIPELINE_SCIKIT_LEARN)
+
+            probabilidades = model.calcula_probabilidades(preprocessador.preparar_textos(lista))
+            predicoes = np.asarray(model.classes).take(np.argmax(probabilidades, axis=1))
+            incertos = np.flatnonzero(probabilidades.max(axis=1) < limiar)
+
+        estagios = np.full(len(lista), TipoModelo.PIPELINE_SCIKIT_LEARN, dtype=object)
+        if len(incertos):
+            predicoes[incertos] = Analisador.analisar([lista[indice] for indice in incertos], TipoModelo.MODEL_TRANSFORMERS)
+            estagios[incertos] = TipoModelo.MODEL_TRANSFORMERS
+
+        Metricas.TEXTOS.labels(TipoModelo.CASCATA).inc(len(lista))
+        Metricas.CASCATA.labels(TipoModelo.PIPELINE_SCIKIT_LEARN).inc(len(lista) - len(incertos))
+        Metricas.CASCATA.labels(TipoModelo.MODEL_TRANSFORMERS).inc(len(incertos))
+        return predicoes, estagios.tolist()
+
+    @staticmethod
+    def analisar_com_estagio(textos: list, tipo_modelo: str) -> tuple:
+        """ Retorna as predições e o estágio que decidiu cada uma, vazio fora da cascata. """
+        if tipo_modelo == TipoModelo.CASCATA:
+            return Analisador.analisar_cascata(textos)
+        return Analisador.analisar(textos, tipo_modelo), [None] * len(textos)
+
+    @staticmethod
+    def versao_cache(tipo_modelo: str) -> str:
+        """ Versão das predições do tipo de modelo no cache (ver CachePredicoes.versao). Na cascata,
+        inclui o limiar, que decide quais textos vão ao distilbert e, portanto, a predição.
+        """
+        if tipo_modelo == TipoModelo.CASCATA:
+            return CachePredicoes.versao(tipo_modelo, limiar=Analisador.LIMIAR_CASCATA)
+        return CachePredicoes.versao(tipo_modelo)
+
+    @staticmethod
+    def analisar_com_cache(session, textos: list, tipo_modelo: str) -> list:
+        """ Retorna o sentimento e o estágio (ver analisar_cascata) de cada texto, realizando a
+        predição apenas dos textos que ainda não estão no cache de predições. As novas
+        predições são gravadas no cache dentro da transação da sessão informada.
+        """
+        chaves = [CachePredicoes.chave(texto) for texto in textos]
+        versao = Analisador.versao_cache(tipo_modelo)
+        with Metricas.mede("cache_predicoes", tipo_modelo):
+            sentimentos = CachePredicoes.busca(session, chaves, tipo_modelo, versao)
+
+        # Textos ausentes do cache, uma única vez por chave
+        faltantes = {}
+        for chave, texto in zip(chaves, textos):
+            if chave not in sentimentos and chave not in faltantes:
+                faltantes[chave] = texto
+
+        if faltantes:
+            predicoes, estagios = Analisador.analisar_com_estagio(list(faltantes.values()), tipo_modelo)
+            novos = {chave: (int(predicao), estagio) for chave, predicao, estagio in zip(faltantes.keys(), predicoes, estagios)}
+            CachePredicoes.grava(session, novos, tipo_modelo, versao)
+            sentimentos.update(novos)
+
+        return [sentimentos[chave] for chave in chaves]
+
+    @staticmethod
+    async def analisar_com_cache_async(session, textos: list, tipo_modelo: str, executor) -> list:
+        """ Versão de analisar_com_cache para uma AsyncSession: as consultas e a gravação do cache
+        são feitas pela sessão assíncrona e a predição dos textos ausentes do cache pelo executor
+        de inferência (ver ExecutorInferencia), sem bloquear o loop de eventos.
+        """
+        chaves = [CachePredicoes.chave(texto) for texto in textos]
+        versao = Analisador.versao_cache(tipo_modelo)
+        with Metricas.mede("cache_predicoes", tipo_modelo):
+            sentimentos = await session.run_sync(CachePredicoes.busca, chaves, tipo_modelo, versao)
+
+        faltantes = {}
+        for chave, texto in zip(chaves, textos):
+            if chave not in sentimentos and chave not in faltantes:
+                faltantes[chave] = texto
+
+        if faltantes:
+            predicoes, estagios = await executor.executa(Analisador.analisar_com_estagio, list(faltantes.values()), tipo_modelo)
+            novos = {chave: (int(predicao), estagio) for chave, predicao, estagio in zip(faltantes.keys(), predicoes, estagios)}
+            await session.run_sync(CachePredicoes.grava, novos, tipo_modelo, versao)
+            sentimentos.update(novos)
+
+        return [sentimentos[chave] for chave in chaves]
+
+    @staticmethod
+    def obtem_agendador(tipo_modelo: str) -> AgendadorLotes:
+        """ Retorna o agendador de lotes do modelo transformer informado, configurado pelas variáveis
+        de ambiente LOTE_DINAMICO (habilita), LOTE_DINAMICO_TAMANHO_MAXIMO e LOTE_DINAMICO_ESPERA_MS.
+        """
+        agendador = Analisador.agendadores.get(tipo_modelo)
+        if agendador is None:
+            if os.environ.get("LOTE_DINAMICO", "0").lower() not in ("1", "true", "sim"):
+                return None
+            with Analisador.__lock:
+                agendador = Analisador.agendadores.get(tipo_modelo)
+                if agendador is None:
+                    agendador = AgendadorLotes(
+                        lambda lote: Analisador.analisar_direto(lote, tipo_modelo),
+                        tamanho_maximo_lote=int(os.environ.get("LOTE_DINAMICO_TAMANHO_MAXIMO", 16)),
+                        espera_maxima_ms=float(os.environ.get("LOTE_DINAMICO_ESPERA_MS", 5)),
+                    )
+                    Analisador.agendadores[tipo_modelo] = agendador
+        return agendador
+
+    @staticmethod
+    def aquecer(tipos_modelo: list = None, inferencia: bool = True) -> dict:
+        """ Carrega os modelos informados e executa uma inferência de teste em cada
+        um, para que a primeira requisição não pague o custo de carga.
+        Retorna as estatísticas de carga dos modelos. Sem lista explícita, modelos cujo
+        artefato ainda não foi gerado (ex.: o quantizado) são ignorados.
+
+        Com `inferencia=False` os artefatos são apenas carregados, o que é usado no processo
+        principal do gunicorn antes do fork: os pools de threads do torch/OpenMP não
+        sobrevivem ao fork e só devem ser iniciados nos workers.
+        """
+        explicito = tipos_modelo is not None
+        if tipos_modelo is None:
+            tipos_modelo = TipoModelo.todos()
+
+        for tipo_modelo in tipos_modelo:
+            try:
+                if inferencia:
+                    Analisador.analisar([Analisador.TEXTO_AQUECIMENTO], tipo_modelo)
+                else:
+                    for estagio in TipoModelo.estagios(tipo_modelo):
+                        RegistroPreProcessadores.obtem_preprocessador(estagio)
+                        RegistroModelos.obtem_modelo(estagio)
+            except FileNotFoundError:
+                if explicito:
+                    raise
+
+        return RegistroModelos.estatisticas()
+
+    @staticmethod
+    def modelos_para_aquecer() -> list:
+        """ Lê a variável de ambiente AQUECER_MODELOS, que pode conter "todos" (retorna None,
+        todos os modelos disponíveis) ou uma lista de tipos de modelo separados por vírgula.
+        """
+        valor = os.environ.get("AQUECER_MODELOS", "").strip()
+        if not valor:
+            return []
+        if valor.lower() == "todos":
+            return None
+        return [tipo.strip() for tipo in valor.split(",") if tipo.strip()]
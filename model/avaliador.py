@@ -1,4 +1,7 @@
-from sklearn.metrics import accuracy_score
+import time
+
+import numpy as np
+
 
 class Avaliador:
     """ Classe que avalia um modelo de Machine Learning
@@ -9,7 +12,55 @@ class Avaliador:
         """ Faz uma predição e avalia o modelo. Poderia parametrizar o tipo de
         avaliação, entre outros.
         """
+        from sklearn.metrics import accuracy_score
+
         sentimentos = model.realizar_predicao(X_test)
-        
+
         return accuracy_score(y_test, sentimentos)
-                
+
+    @staticmethod
+    def avaliar_em_lotes(model, lotes, y_test) -> dict:
+        """ Avalia o modelo lote a lote, com `lotes` gerando (índices dos textos, entrada do
+        modelo), de forma que apenas um lote fica em memória por vez. Retorna a acurácia e
+        a vazão da inferência.
+        """
+        from sklearn.metrics import accuracy_score
+
+        y_test = np.asarray(y_test)
+        sentimentos = np.empty(len(y_test), dtype=y_test.dtype)
+        duracao = 0.0
+        quantidade_lotes = 0
+        for indices, X_input in lotes:
+            inicio = time.perf_counter()
+            sentimentos[indices] = model.realizar_predicao(X_input)
+            duracao += time.perf_counter() - inicio
+            quantidade_lotes += 1
+
+        return {
+            "acuracia": accuracy_score(y_test, sentimentos),
+            "textos": len(y_test),
+            "lotes": quantidade_lotes,
+            "duracao_inferencia_s": round(duracao, 4),
+            "textos_por_segundo": round(len(y_test) / duracao, 1) if duracao else 0.0,
+        }
+
+    @staticmethod
+    def avaliar_com_cache(tipo_modelo: str, textos: list, y_test, tamanho_lote: int = 256, cache=None) -> dict:
+        """ Avalia o modelo do tipo informado com o pré-processamento dos textos vindo do cache
+        em disco (ver CacheAvaliacao), calculado apenas na primeira execução. Além da acurácia e
+        da vazão da inferência, informa o tempo de preparação da entrada (leitura do cache ou
+        pré-processamento).
+        """
+        from model.cache_avaliacao import CacheAvaliacao
+        from model.modelo import RegistroModelos
+
+        cache = cache or CacheAvaliacao()
+        model = RegistroModelos.obtem_modelo(tipo_modelo)
+
+        inicio = time.perf_counter()
+        resultado = Avaliador.avaliar_em_lotes(model, cache.lotes(tipo_modelo, textos, tamanho_lote), y_test)
+        duracao_total = time.perf_counter() - inicio
+
+        resultado["duracao_preparacao_s"] = round(duracao_total - resultado["duracao_inferencia_s"], 4)
+        resultado["modelo"] = tipo_modelo
+        return resultado
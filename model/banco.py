@@ -0,0 +1,60 @@
+import os
+
+from sqlalchemy import create_engine, event
+
+# Ajustes aplicados a cada nova conexão com o SQLite
+PRAGMAS_SQLITE = [
+    # WAL permite leituras concorrentes com uma escrita e reduz o custo de cada commit
+    "PRAGMA journal_mode=WAL",
+    # Com WAL, NORMAL só sincroniza o disco nos checkpoints, sem risco de corromper a base
+    "PRAGMA synchronous=NORMAL",
+    # Cache de páginas de ~20 MB por conexão
+    "PRAGMA cache_size=-20000",
+    # Espera até 5s pelo lock de escrita em vez de falhar com "database is locked"
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    # Leitura da base via mmap (até 256 MB)
+    "PRAGMA mmap_size=268435456",
+]
+
+
+def configura_conexao_sqlite(dbapi_connection, connection_record):
+    """ Aplica os PRAGMAS_SQLITE a uma nova conexão. """
+    cursor = dbapi_connection.cursor()
+    for pragma in PRAGMAS_SQLITE:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def cria_engine(db_url: str, **kwargs):
+    """ Cria a engine do SQLite com os pragmas de desempenho e um pool pequeno: o SQLite aceita
+    apenas uma escrita por vez, então muitas conexões por worker só multiplicam o cache de páginas.
+    """
+    opcoes = {
+        "echo": False,
+        "pool_size": int(os.environ.get("DB_POOL_TAMANHO", 5)),  # tamanho do pool conforme necessário
+        "max_overflow": int(os.environ.get("DB_POOL_EXTRA", 5)),  # número máximo de conexões extras
+        "pool_timeout": 30,  # Tempo limite para obter uma conexão do pool
+    }
+    opcoes.update(kwargs)
+    engine = create_engine(db_url, **opcoes)
+    event.listen(engine, "connect", configura_conexao_sqlite)
+    return engine
+
+
+def cria_engine_async(db_url: str, **kwargs):
+    """ Versão assíncrona de cria_engine, com o driver aiosqlite, usada pelo modo ASGI (asgi.py).
+    Os pragmas são os mesmos, aplicados a cada nova conexão da engine síncrona subjacente.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    opcoes = {
+        "echo": False,
+        "pool_size": int(os.environ.get("DB_POOL_TAMANHO", 5)),
+        "max_overflow": int(os.environ.get("DB_POOL_EXTRA", 5)),
+        "pool_timeout": 30,
+    }
+    opcoes.update(kwargs)
+    engine = create_async_engine(db_url.replace("sqlite://", "sqlite+aiosqlite://", 1), **opcoes)
+    event.listen(engine.sync_engine, "connect", configura_conexao_sqlite)
+    return engine
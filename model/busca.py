@@ -0,0 +1,80 @@
+from sqlalchemy import select, text, literal_column, table
+from sqlalchemy.exc import OperationalError
+
+from model.review import Review
+
+
+class IndiceTextual:
+    """ Índice de texto completo (SQLite FTS5 com tokenizador trigram) sobre reviews.texto.
+
+    O tokenizador trigram permite buscar qualquer trecho com 3 ou mais caracteres, como o
+    ILIKE '%trecho%', mas sem percorrer a tabela inteira. Triggers mantêm o índice
+    sincronizado com as inserções, alterações e remoções em reviews. Se o SQLite não tiver
+    suporte a FTS5, a busca continua usando ILIKE.
+
+    Os resultados diferem do ILIKE em maiúsculas acentuadas: o trigram ignora a caixa de
+    qualquer letra Unicode ("ÓTIMO" encontra "ótimo"), enquanto o lower() do SQLite usado
+    pelo ILIKE só converte as letras ASCII. Nenhum dos dois ignora os acentos ("otimo" não
+    encontra "ótimo").
+    """
+
+    # Tamanho mínimo do trecho buscado pelo índice trigram
+    TAMANHO_MINIMO = 3
+
+    disponivel = False
+
+    DDL = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5("
+        "texto, content='reviews', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_ai AFTER INSERT ON reviews BEGIN "
+        "INSERT INTO reviews_fts(rowid, texto) VALUES (new.id, new.texto); END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_ad AFTER DELETE ON reviews BEGIN "
+        "INSERT INTO reviews_fts(reviews_fts, rowid, texto) VALUES ('delete', old.id, old.texto); END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_fts_au AFTER UPDATE OF texto ON reviews BEGIN "
+        "INSERT INTO reviews_fts(reviews_fts, rowid, texto) VALUES ('delete', old.id, old.texto); "
+        "INSERT INTO reviews_fts(rowid, texto) VALUES (new.id, new.texto); END",
+    ]
+
+    @staticmethod
+    def cria(engine) -> bool:
+        """ Cria o índice e os triggers, se ainda não existirem. Um índice recém-criado é
+        preenchido com os reviews já existentes. Retorna se o índice está disponível.
+        """
+        try:
+            with engine.begin() as conexao:
+                existia = conexao.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reviews_fts'")
+                ).first() is not None
+                for comando in IndiceTextual.DDL:
+                    conexao.execute(text(comando))
+                if not existia:
+                    conexao.execute(text("INSERT INTO reviews_fts(reviews_fts) VALUES ('rebuild')"))
+            IndiceTextual.disponivel = True
+        except OperationalError:
+            # SQLite compilado sem FTS5 ou sem o tokenizador trigram (versões anteriores à 3.34)
+            IndiceTextual.disponivel = False
+        return IndiceTextual.disponivel
+
+    @staticmethod
+    def reconstroi(engine) -> int:
+        """ Recria o conteúdo do índice a partir da tabela reviews. Retorna a quantidade de reviews indexados. """
+        with engine.begin() as conexao:
+            for comando in IndiceTextual.DDL:
+                conexao.execute(text(comando))
+            conexao.execute(text("INSERT INTO reviews_fts(reviews_fts) VALUES ('rebuild')"))
+            return conexao.execute(text("SELECT count(*) FROM reviews")).scalar()
+
+    @staticmethod
+    def filtro(trecho: str):
+        """ Filtro dos reviews cujo texto contém o trecho informado. Trechos curtos usam o ILIKE,
+        que diferencia a caixa das letras acentuadas (ver a documentação da classe).
+        """
+        if not IndiceTextual.disponivel or len(trecho) < IndiceTextual.TAMANHO_MINIMO:
+            return Review.texto.ilike(f'%{trecho}%')
+
+        # O trecho vai entre aspas para ser tratado como uma frase literal pelo FTS5
+        frase = '"' + trecho.replace('"', '""') + '"'
+        reviews_fts = table("reviews_fts")
+        ids = select(literal_column("rowid")).select_from(reviews_fts) \
+            .where(literal_column("reviews_fts").op("MATCH")(frase))
+        return Review.id.in_(ids)
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import insert, text
+
+from model.modelo import ModelFactory, TipoModelo
+from model.predicao import PredicaoCache
+from model.preprocessador import PreProcessadorFactory
+
+
+class CachePredicoes:
+    """ Cache das predições por (hash do texto normalizado, modelo, versão).
+
+    A primeira camada é um LRU em memória, limitado a CACHE_PREDICOES_TAMANHO entradas
+    por worker. A segunda é a tabela predicoes_cache, compartilhada entre os workers
+    e persistente entre reinícios, limitada a CACHE_PREDICOES_MAXIMO_BANCO linhas.
+
+    A versão (ver `versao`) identifica os artefatos e as configurações que produziram a
+    predição: depois que um artefato é substituído ou uma configuração muda, as predições
+    antigas deixam de ser encontradas e são substituídas à medida que os textos reaparecem.
+    """
+
+    tamanho_maximo = int(os.environ.get("CACHE_PREDICOES_TAMANHO", 10000))
+    maximo_banco = int(os.environ.get("CACHE_PREDICOES_MAXIMO_BANCO", 1000000))
+    # Predições gravadas pelo processo entre duas verificações do tamanho da tabela
+    INTERVALO_PODA = 10000
+    __memoria = OrderedDict()
+    __versoes = {}
+    __gravadas = 0
+    __lock = threading.Lock()
+    __contadores = {"acertos_memoria": 0, "acertos_banco": 0, "faltas": 0, "podadas": 0}
+
+    @staticmethod
+    def normaliza(texto: str) -> str:
+        """ Remove espaços das extremidades e colapsa espaços internos, o que não altera a predição. """
+        return " ".join(str(texto).split())
+
+    @staticmethod
+    def chave(texto: str) -> str:
+        """ Hash SHA-256 do texto normalizado. """
+        return hashlib.sha256(CachePredicoes.normaliza(texto).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def impressao(caminho: str) -> list:
+        """ Caminho, tamanho e data de modificação do arquivo, ou de cada arquivo do diretório. """
+        if os.path.isfile(caminho):
+            arquivos = [caminho]
+        elif os.path.isdir(caminho):
+            arquivos = sorted(os.path.join(raiz, nome) for raiz, _, nomes in os.walk(caminho) for nome in nomes)
+        else:
+            return [caminho, "ausente"]
+        return [[arquivo, os.stat(arquivo).st_size, os.stat(arquivo).st_mtime_ns] for arquivo in arquivos]
+
+    @staticmethod
+    def versao(tipo_modelo: str, **configuracao) -> str:
+        """ Hash dos artefatos do modelo e do pré-processador de cada estágio do tipo de modelo (ver
+        ModelFactory.artefatos, que considera BACKEND_FLORESTA e ARTEFATOS_MMAP) e da configuração
+        informada. Calculada uma vez por processo: artefatos substituídos passam a valer, como os
+        próprios modelos, quando os workers são reiniciados.
+        """
+        identificacao = (tipo_modelo, tuple(sorted(configuracao.items())))
+        versao = CachePredicoes.__versoes.get(identificacao)
+        if versao is None:
+            artefatos = [CachePredicoes.impressao(caminho) for estagio in TipoModelo.estagios(tipo_modelo)
+                         for caminho in ModelFactory.artefatos(estagio) + PreProcessadorFactory.artefatos(estagio)]
+            conteudo = json.dumps([tipo_modelo, artefatos, configuracao], sort_keys=True, default=str)
+            versao = hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:16]
+            CachePredicoes.__versoes[identificacao] = versao
+        return versao
+
+    @staticmethod
+    def busca(session, chaves: list, modelo: str, versao: str) -> dict:
+        """ Retorna as predições conhecidas para as chaves, como (sentimento, estagio), consultando
+        a memória e, para as que faltarem, a base com uma única consulta. Apenas predições da
+        versão informada são consideradas.
+        """
+        encontrados = {}
+        with CachePredicoes.__lock:
+            for chave in chaves:
+                predicao = CachePredicoes.__memoria.get((chave, modelo, versao))
+                if predicao is not None:
+                    CachePredicoes.__memoria.move_to_end((chave, modelo, versao))
+                    encontrados[chave] = predicao
+            CachePredicoes.__contadores["acertos_memoria"] += len(encontrados)
+
+        faltantes = {chave for chave in chaves if chave not in encontrados}
+        if faltantes:
+            consulta = session.query(PredicaoCache.hash, PredicaoCache.sentimento, PredicaoCache.estagio) \
+                .filter(PredicaoCache.modelo == modelo, PredicaoCache.versao == versao, PredicaoCache.hash.in_(faltantes))
+            do_banco = {chave: (sentimento, estagio) for chave, sentimento, estagio in consulta}
+            CachePredicoes.__guarda_em_memoria(do_banco, modelo, versao)
+            encontrados.update(do_banco)
+
+            with CachePredicoes.__lock:
+                CachePredicoes.__contadores["acertos_banco"] += len(do_banco)
+                CachePredicoes.__contadores["faltas"] += len(faltantes) - len(do_banco)
+
+        return encontrados
+
+    @staticmethod
+    def grava(session, predicoes: dict, modelo: str, versao: str):
+        """ Guarda as novas predições, como (sentimento, estagio), em memória e na base, substituindo
+        as de outras versões. A gravação na base faz parte da transação da sessão informada e, a
+        cada INTERVALO_PODA predições gravadas pelo processo, a tabela é podada (ver `poda`).
+        """
+        if not predicoes:
+            return
+        CachePredicoes.__guarda_em_memoria(predicoes, modelo, versao)
+        data_criacao = datetime.now()
+        session.execute(
+            insert(PredicaoCache).prefix_with("OR REPLACE"),
+            [{"hash": chave, "modelo": modelo, "versao": versao, "sentimento": sentimento, "estagio": estagio,
+              "data_criacao": data_criacao}
+             for chave, (sentimento, estagio) in predicoes.items()]
+        )
+
+        with CachePredicoes.__lock:
+            CachePredicoes.__gravadas += len(predicoes)
+            podar = CachePredicoes.__gravadas >= CachePredicoes.INTERVALO_PODA
+            if podar:
+                CachePredicoes.__gravadas = 0
+        if podar:
+            CachePredicoes.poda(session)
+
+    @staticmethod
+    def poda(session) -> int:
+        """ Remove as predições mais antigas (de versões anteriores, em geral) que excedem
+        maximo_banco linhas na tabela. Retorna a quantidade removida.
+        """
+        if CachePredicoes.maximo_banco <= 0:
+            return 0
+        excesso = session.execute(text("SELECT count(*) FROM predicoes_cache")).scalar() - CachePredicoes.maximo_banco
+        if excesso <= 0:
+            return 0
+        session.execute(text("DELETE FROM predicoes_cache WHERE rowid IN "
+                             "(SELECT rowid FROM predicoes_cache ORDER BY data_criacao LIMIT :excesso)"),
+                        {"excesso": excesso})
+        with CachePredicoes.__lock:
+            CachePredicoes.__contadores["podadas"] += excesso
+        return excesso
+
+    @staticmethod
+    def __guarda_em_memoria(predicoes: dict, modelo: str, versao: str):
+        if CachePredicoes.tamanho_maximo <= 0:
+            return
+        with CachePredicoes.__lock:
+            for chave, predicao in predicoes.items():
+                CachePredicoes.__memoria[(chave, modelo, versao)] = predicao
+                CachePredicoes.__memoria.move_to_end((chave, modelo, versao))
+            while len(CachePredicoes.__memoria) > CachePredicoes.tamanho_maximo:
+                CachePredicoes.__memoria.popitem(last=False)
+
+    @staticmethod
+    def estatisticas() -> dict:
+        """ Contadores de acertos e faltas do cache neste worker. """
+        with CachePredicoes.__lock:
+            contadores = dict(CachePredicoes.__contadores)
+            contadores["entradas_memoria"] = len(CachePredicoes.__memoria)
+        consultas = contadores["acertos_memoria"] + contadores["acertos_banco"] + contadores["faltas"]
+        contadores["taxa_acerto"] = round((contadores["acertos_memoria"] + contadores["acertos_banco"]) / consultas, 4) if consultas else 0.0
+        contadores["tamanho_maximo"] = CachePredicoes.tamanho_maximo
+        contadores["maximo_banco"] = CachePredicoes.maximo_banco
+        return contadores
@@ -0,0 +1,158 @@
+import hashlib
+import os
+from importlib import metadata
+
+import numpy as np
+
+from model.modelo import TipoModelo
+from model.preprocessador import PreProcessadorScikitLearn, PreProcessadorTransformers, RegistroPreProcessadores
+
+
+class CacheAvaliacao:
+    """ Cache em disco dos dados de avaliação dos modelos.
+
+    Guarda a divisão em teste do conjunto de dados e o resultado do pré-processamento dos
+    textos de teste: a matriz esparsa do vetorizador (.npz) para os modelos scikit-learn e os
+    ids dos tokens, sem padding, para o DistilBERT. Cada arquivo é identificado pelo hash dos
+    dados e dos artefatos de pré-processamento (vetorizador, versão do modelo do spaCy,
+    tokenizer) e pela versão do código de pré-processamento (VERSAO_PREPROCESSAMENTO), de
+    forma que uma mudança em qualquer um deles gera um novo arquivo em vez de reaproveitar
+    um resultado desatualizado.
+    """
+
+    DIRETORIO_PADRAO = os.environ.get("CACHE_AVALIACAO_DIR", "./machine-learning/cache/")
+
+    # Arquivos do tokenizer do DistilBERT que influenciam os ids gerados
+    ARQUIVOS_TOKENIZER = ["tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "vocab.txt"]
+
+    def __init__(self, diretorio: str = None):
+        self.diretorio = diretorio or self.DIRETORIO_PADRAO
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    @staticmethod
+    def __hash_arquivo(caminho: str, hash_=None):
+        hash_ = hash_ or hashlib.sha256()
+        with open(caminho, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(2**20), b""):
+                hash_.update(bloco)
+        return hash_
+
+    @staticmethod
+    def __hash_textos(textos: list, hash_) -> None:
+        for texto in textos:
+            hash_.update(str(texto).encode("utf-8"))
+            hash_.update(b"\0")
+
+    def __caminho(self, prefixo: str, hash_, extensao: str) -> str:
+        return os.path.join(self.diretorio, f"{prefixo}_{hash_.hexdigest()[:24]}.{extensao}")
+
+    def separa_teste(self, url: str, percentual_teste: float = 0.2, seed: int = 7) -> tuple:
+        """ Retorna os textos e os sentimentos da divisão de teste estratificada do arquivo, como
+        em PreProcessador.separa_teste_treino. A divisão só é refeita se o arquivo mudar.
+        """
+        import pandas as pd
+
+        hash_ = self.__hash_arquivo(url)
+        hash_.update(f"{percentual_teste}|{seed}".encode("utf-8"))
+        caminho = self.__caminho("teste", hash_, "csv")
+
+        if not os.path.exists(caminho):
+            from model.carregador import Carregador
+            from model.preprocessador import PreProcessador
+
+            dataset = Carregador.carregar_dados(url)
+            _, X_test, _, y_test = PreProcessador.separa_teste_treino(dataset['content'], dataset['sentiment'],
+                                                                     percentual_teste=percentual_teste, seed=seed)
+            pd.DataFrame({"content": X_test, "sentiment": y_test}).to_csv(caminho + ".tmp", index=False)
+            os.replace(caminho + ".tmp", caminho)
+
+        teste = pd.read_csv(caminho)
+        return teste['content'].tolist(), teste['sentiment'].to_numpy()
+
+    def __hash_preprocessamento(self, tipo_modelo: str, textos: list):
+        hash_ = hashlib.sha256()
+        if tipo_modelo in TipoModelo.transformers():
+            hash_.update(f"transformers|{PreProcessadorTransformers.VERSAO_PREPROCESSAMENTO}|"
+                         f"{PreProcessadorTransformers.max_length}".encode("utf-8"))
+            caminho_tokenizer = PreProcessadorTransformers.CAMINHO_TOKENIZER
+            for nome in self.ARQUIVOS_TOKENIZER:
+                if os.path.exists(os.path.join(caminho_tokenizer, nome)):
+                    self.__hash_arquivo(os.path.join(caminho_tokenizer, nome), hash_)
+        elif tipo_modelo in (TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_SCIKIT_LEARN):
+            try:
+                versao_spacy = metadata.version("pt_core_news_sm")
+            except metadata.PackageNotFoundError:
+                versao_spacy = "desconhecida"
+            hash_.update(f"scikit-learn|{PreProcessadorScikitLearn.VERSAO_PREPROCESSAMENTO}|{versao_spacy}".encode("utf-8"))
+            self.__hash_arquivo(PreProcessadorScikitLearn.CAMINHO_VETORIZADOR, hash_)
+        else:
+            raise ValueError(f"Tipo de modelo sem avaliação em cache: {tipo_modelo}")
+        self.__hash_textos(textos, hash_)
+        return hash_
+
+    def features_scikit_learn(self, tipo_modelo: str, textos: list, tamanho_lote: int = 1000):
+        """ Matriz esparsa dos textos vetorizados, pré-processados em blocos de `tamanho_lote` textos. """
+        import scipy.sparse as sp
+
+        caminho = self.__caminho("scikit_learn", self.__hash_preprocessamento(tipo_modelo, textos), "npz")
+        if os.path.exists(caminho):
+            return sp.load_npz(caminho)
+
+        preprocessador = RegistroPreProcessadores.obtem_preprocessador(tipo_modelo)
+        X = sp.vstack([preprocessador.preparar_textos(textos[inicio:inicio + tamanho_lote])
+                       for inicio in range(0, len(textos), tamanho_lote)], format="csr")
+        sp.save_npz(caminho + ".tmp.npz", X)
+        os.replace(caminho + ".tmp.npz", caminho)
+        return X
+
+    def tokens_transformers(self, tipo_modelo: str, textos: list, tamanho_lote: int = 1000) -> dict:
+        """ Ids dos tokens de todos os textos concatenados, o início de cada texto em `posicoes`
+        e o id de padding do tokenizer.
+        """
+        caminho = self.__caminho("transformers", self.__hash_preprocessamento(tipo_modelo, textos), "npz")
+        if os.path.exists(caminho):
+            with np.load(caminho) as arquivo:
+                return {chave: arquivo[chave] for chave in arquivo.files}
+
+        preprocessador = RegistroPreProcessadores.obtem_preprocessador(tipo_modelo)
+        ids = []
+        for inicio in range(0, len(textos), tamanho_lote):
+            with preprocessador.lock:
+                codificados = preprocessador.tokenizer(textos[inicio:inicio + tamanho_lote], max_length=preprocessador.max_length,
+                                                       add_special_tokens=True, truncation=True)
+            ids.extend(codificados['input_ids'])
+
+        tokens = {
+            "ids": np.concatenate([np.asarray(ids_texto, dtype=np.int32) for ids_texto in ids]) if ids else np.empty(0, dtype=np.int32),
+            "posicoes": np.concatenate([[0], np.cumsum([len(ids_texto) for ids_texto in ids])]).astype(np.int64),
+            "id_padding": np.asarray(preprocessador.tokenizer.pad_token_id, dtype=np.int32),
+        }
+        np.savez(caminho + ".tmp.npz", **tokens)
+        os.replace(caminho + ".tmp.npz", caminho)
+        return tokens
+
+    def lotes(self, tipo_modelo: str, textos: list, tamanho_lote: int = 256):
+        """ Gera a entrada do modelo em lotes de até `tamanho_lote` textos, como (índices dos textos, entrada).
+        Para o DistilBERT os textos são agrupados por número de tokens e cada lote é completado
+        apenas até o seu maior texto, o que não altera as predições.
+        """
+        if tipo_modelo in TipoModelo.transformers():
+            import torch
+
+            tokens = self.tokens_transformers(tipo_modelo, textos)
+            posicoes = tokens["posicoes"]
+            comprimentos = np.diff(posicoes)
+            ordem = np.argsort(comprimentos, kind="stable")
+            for inicio in range(0, len(ordem), tamanho_lote):
+                indices = ordem[inicio:inicio + tamanho_lote]
+                maior = int(comprimentos[indices].max())
+                input_ids = np.full((len(indices), maior), int(tokens["id_padding"]), dtype=np.int64)
+                attention_mask = np.zeros((len(indices), maior), dtype=np.int64)
+                for linha, indice in enumerate(indices):
+                    input_ids[linha, :comprimentos[indice]] = tokens["ids"][posicoes[indice]:posicoes[indice + 1]]
+                    attention_mask[linha, :comprimentos[indice]] = 1
+                yield indices, {"input_ids": torch.from_numpy(input_ids), "attention_mask": torch.from_numpy(attention_mask)}
+        else:
+            X = self.features_scikit_learn(tipo_modelo, textos)
+            for inicio in range(0, X.shape[0], tamanho_lote):
+                yield np.arange(inicio, min(inicio + tamanho_lote, X.shape[0])), X[inicio:inicio + tamanho_lote]
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from model.metricas import Metricas
+
+
+class CacheRespostas:
+    """ Cache das respostas de GET /review por parâmetros de busca, validado pela versão da tabela reviews.
+
+    A versão fica na tabela reviews_versao e é incrementada por triggers a cada inserção,
+    alteração ou remoção de reviews, na mesma transação da escrita: todos os caminhos (POST
+    /review, lotes, importação, remoções e jobs) invalidam o cache sem mudanças no código que
+    os executa, e a versão é a mesma para todos os workers. Cada worker mantém um LRU das
+    respostas já serializadas, limitado a CACHE_RESPOSTAS_TAMANHO entradas e CACHE_RESPOSTAS_MB
+    megabytes, e uma entrada só é usada se foi gerada na versão atual. A versão também compõe
+    o ETag, de forma que clientes com a resposta atual recebem 304 sem consulta aos reviews.
+    """
+
+    tamanho_maximo = int(os.environ.get("CACHE_RESPOSTAS_TAMANHO", 256))
+    bytes_maximo = int(float(os.environ.get("CACHE_RESPOSTAS_MB", 64)) * 2**20)
+
+    DDL = [
+        # Uma única linha; a geração distingue bases recriadas, em que a versão recomeça
+        "CREATE TABLE IF NOT EXISTS reviews_versao ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), geracao VARCHAR NOT NULL, versao INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO reviews_versao(id, geracao, versao) VALUES (1, lower(hex(randomblob(4))), 0)",
+        "CREATE TRIGGER IF NOT EXISTS reviews_versao_ai AFTER INSERT ON reviews BEGIN "
+        "UPDATE reviews_versao SET versao = versao + 1 WHERE id = 1; END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_versao_ad AFTER DELETE ON reviews BEGIN "
+        "UPDATE reviews_versao SET versao = versao + 1 WHERE id = 1; END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_versao_au AFTER UPDATE ON reviews BEGIN "
+        "UPDATE reviews_versao SET versao = versao + 1 WHERE id = 1; END",
+    ]
+
+    __memoria = OrderedDict()
+    __bytes = 0
+    __lock = threading.Lock()
+    __contadores = {"acertos": 0, "nao_modificados": 0, "faltas": 0}
+
+    @staticmethod
+    def cria(engine):
+        """ Cria a tabela de versão e os triggers, se ainda não existirem. """
+        with engine.begin() as conexao:
+            for comando in CacheRespostas.DDL:
+                conexao.execute(text(comando))
+
+    @staticmethod
+    def versao(session) -> str:
+        """ Versão atual da tabela reviews, lida da base para valer entre os workers. """
+        geracao, versao = session.execute(text("SELECT geracao, versao FROM reviews_versao WHERE id = 1")).one()
+        return f"{geracao}-{versao}"
+
+    @staticmethod
+    def chave(parametros: dict) -> str:
+        """ Hash dos parâmetros de busca informados (os vazios são ignorados). """
+        informados = {nome: valor for nome, valor in parametros.items() if valor not in (None, "", False)}
+        return hashlib.sha256(json.dumps(informados, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def etag(chave: str, versao: str) -> str:
+        return f'"{versao}-{chave[:16]}"'
+
+    @staticmethod
+    def nao_modificado(if_none_match: str, etag: str) -> bool:
+        """ Indica se o cabeçalho If-None-Match do cliente contém o ETag atual. Registra o 304 nas estatísticas. """
+        if not if_none_match:
+            return False
+        candidatos = {candidato.strip().removeprefix("W/") for candidato in if_none_match.split(",")}
+        if etag not in candidatos and "*" not in candidatos:
+            return False
+        CacheRespostas.__conta("nao_modificados")
+        return True
+
+    @staticmethod
+    def busca(chave: str, versao: str):
+        """ Retorna o corpo e os cabeçalhos guardados para a chave, se gerados na versão informada. """
+        with CacheRespostas.__lock:
+            entrada = CacheRespostas.__memoria.get(chave)
+            if entrada is not None and entrada[0] == versao:
+                CacheRespostas.__memoria.move_to_end(chave)
+            else:
+                entrada = None
+        CacheRespostas.__conta("acertos" if entrada else "faltas")
+        return entrada[1:] if entrada else None
+
+    @staticmethod
+    def grava(chave: str, versao: str, corpo: bytes, cabecalhos: dict):
+        """ Guarda a resposta serializada da chave, substituindo a de versões anteriores. """
+        if CacheRespostas.tamanho_maximo <= 0 or len(corpo) > CacheRespostas.bytes_maximo:
+            return
+        with CacheRespostas.__lock:
+            anterior = CacheRespostas.__memoria.pop(chave, None)
+            if anterior is not None:
+                CacheRespostas.__bytes -= len(anterior[1])
+            CacheRespostas.__memoria[chave] = (versao, corpo, dict(cabecalhos))
+            CacheRespostas.__bytes += len(corpo)
+            while len(CacheRespostas.__memoria) > CacheRespostas.tamanho_maximo or CacheRespostas.__bytes > CacheRespostas.bytes_maximo:
+                _, (_, removido, _) = CacheRespostas.__memoria.popitem(last=False)
+                CacheRespostas.__bytes -= len(removido)
+
+    @staticmethod
+    def __conta(resultado: str):
+        with CacheRespostas.__lock:
+            CacheRespostas.__contadores[resultado] += 1
+        # Agregado entre os workers em /metrics
+        Metricas.CACHE_RESPOSTAS.labels(resultado).inc()
+
+    @staticmethod
+    def estatisticas() -> dict:
+        """ Respostas servidas do cache, 304 e faltas neste worker. """
+        with CacheRespostas.__lock:
+            contadores = dict(CacheRespostas.__contadores)
+            contadores["entradas"] = len(CacheRespostas.__memoria)
+            contadores["bytes"] = CacheRespostas.__bytes
+        consultas = contadores["acertos"] + contadores["nao_modificados"] + contadores["faltas"]
+        contadores["taxa_acerto"] = round((contadores["acertos"] + contadores["nao_modificados"]) / consultas, 4) if consultas else 0.0
+        contadores["tamanho_maximo"] = CacheRespostas.tamanho_maximo
+        return contadores
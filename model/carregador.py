@@ -1,24 +1,52 @@
-import pandas as pd
+from typing import TYPE_CHECKING
+
+# O pandas só é importado ao carregar dados (treino, testes e ferramentas), fora do caminho das requisições
+if TYPE_CHECKING:
+    import pandas as pd
 
 class Carregador:
 
-    def __to_sentiment(rating) -> int:
-        rating = int(rating)
-        if rating <= 2:
-            return 0
-        elif rating > 3:
-            return 1    
+    @staticmethod
+    def __to_sentiment(dt: "pd.DataFrame") -> "pd.DataFrame":
+        """ Despreza os comentários com score 3 (neutro) ou sem score e mapeia, de forma
+        vetorizada, score <= 2 para 0 (negativo) e score > 3 para 1 (positivo).
+        """
+        import numpy as np
+
+        # Sem score não há rótulo: o NaN seria mapeado para 0 (negativo) pela comparação
+        dt = dt[dt['score'].notna() & (dt['score'] != 3)]
+        return dt.assign(sentiment=np.where(dt['score'] > 3, 1, 0))
 
     @staticmethod
-    def carregar_dados(url: str) -> pd.DataFrame:
-        """ Carrega e retorna um DataFrame. Há diversos parâmetros 
-        no read_csv que poderiam ser utilizados para dar opções 
+    def carregar_dados(url: str) -> "pd.DataFrame":
+        """ Carrega e retorna um DataFrame. Há diversos parâmetros
+        no read_csv que poderiam ser utilizados para dar opções
         adicionais.
         """
+        import pandas as pd
+
         # Carregando os dados
         dt = pd.read_csv(url, delimiter=',', encoding='utf-8')
-        # Desprezando os comentários com score 3 (neutro)
-        dt = dt[dt['score'] != 3]
-        dt['sentiment'] = dt['score'].apply(Carregador.__to_sentiment)
+        dt = Carregador.__to_sentiment(dt)
+
+        return dt[['content', 'sentiment']]
+
+    @staticmethod
+    def carregar_em_lotes(url: str, tamanho_lote: int = 10000, coluna: str = 'content', rotulado: bool = True):
+        """ Lê o CSV em blocos de `tamanho_lote` linhas e gera um DataFrame por bloco, sem
+        carregar o arquivo inteiro em memória. Apenas as colunas usadas são lidas.
+
+        Com `rotulado=True` gera as colunas content e sentiment, como em carregar_dados.
+        Com `rotulado=False` (arquivos sem score) gera apenas a coluna de textos informada,
+        com os valores ausentes trocados por texto vazio.
+        """
+        import pandas as pd
 
-        return dt[['content', 'sentiment']]
\ No newline at end of file
+        colunas = [coluna, 'score'] if rotulado else [coluna]
+        for dt in pd.read_csv(url, delimiter=',', encoding='utf-8', usecols=colunas,
+                              dtype={coluna: str}, chunksize=tamanho_lote):
+            if rotulado:
+                dt = Carregador.__to_sentiment(dt)
+                yield dt[[coluna, 'sentiment']].rename(columns={coluna: 'content'})
+            else:
+                yield dt[[coluna]].fillna('')
@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenciaSaturada(Exception):
+    """ O executor de inferência já tem o máximo de chamadas em execução e na fila. """
+
+
+class ExecutorInferencia:
+    """ Executa o pré-processamento e a inferência, que usam a CPU, fora do loop de eventos do
+    modo ASGI (ver asgi.py), em um pool de threads limitado.
+
+    No máximo `threads` chamadas executam ao mesmo tempo e outras `fila_maxima` aguardam; além
+    disso `executa` lança InferenciaSaturada em vez de enfileirar, e a requisição é recusada
+    com 503. O torch, o scikit-learn e a maior parte do spaCy liberam o GIL, de forma que o
+    loop continua atendendo o banco e novas requisições durante a inferência.
+    """
+
+    # Executor do worker, exposto em GET /estatisticas quando o modo ASGI está em uso
+    atual = None
+
+    def __init__(self, threads: int = None, fila_maxima: int = None):
+        self.threads = threads or int(os.environ.get("ASGI_INFERENCIA_THREADS", 2))
+        self.fila_maxima = fila_maxima if fila_maxima is not None else int(os.environ.get("ASGI_FILA_MAXIMA", 32))
+        self.__pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="inferencia")
+        self.__lock = threading.Lock()
+        self.__contadores = {"em_andamento": 0, "executadas": 0, "recusadas": 0, "maximo_em_andamento": 0}
+        ExecutorInferencia.atual = self
+
+    @property
+    def capacidade(self) -> int:
+        return self.threads + self.fila_maxima
+
+    async def executa(self, funcao, *args):
+        """ Executa a função em uma thread do pool, com as variáveis de contexto da requisição
+        (id nos logs e etapas medidas). Lança InferenciaSaturada se o pool estiver cheio.
+        """
+        with self.__lock:
+            if self.__contadores["em_andamento"] >= self.capacidade:
+                self.__contadores["recusadas"] += 1
+                raise InferenciaSaturada(f"{self.__contadores['em_andamento']} chamadas em andamento")
+            self.__contadores["em_andamento"] += 1
+            self.__contadores["maximo_em_andamento"] = max(self.__contadores["maximo_em_andamento"],
+                                                           self.__contadores["em_andamento"])
+        try:
+            contexto = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self.__pool, functools.partial(contexto.run, funcao, *args))
+        finally:
+            with self.__lock:
+                self.__contadores["em_andamento"] -= 1
+                self.__contadores["executadas"] += 1
+
+    def estatisticas(self) -> dict:
+        """ Threads, capacidade e contadores de chamadas executadas e recusadas. """
+        with self.__lock:
+            return {"threads": self.threads, "capacidade": self.capacidade, **self.__contadores}
+
+    def encerra(self):
+        self.__pool.shutdown(wait=False, cancel_futures=True)
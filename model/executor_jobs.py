@@ -0,0 +1,252 @@
+import csv
+import multiprocessing
+import os
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from model.analisador import Analisador
+from model.job import Job
+from model.recursos import RecursosCPU
+from model.repositorio import RepositorioReview
+from model.review import Review
+
+
+def pontuar_bloco(textos: list, tipo_modelo: str) -> list:
+    """ Pré-processa e analisa um bloco de textos. Executado nos processos do pool, onde cada
+    modelo é carregado uma única vez pelo registro do processo.
+    """
+    return [int(sentimento) for sentimento in Analisador.analisar_direto(textos, tipo_modelo)]
+
+
+def pontuar_bloco_com_estagio(textos: list, tipo_modelo: str) -> list:
+    """ Como pontuar_bloco, com o estágio que decidiu cada sentimento (ver Analisador.analisar_cascata). """
+    predicoes, estagios = Analisador.analisar_com_estagio(textos, tipo_modelo)
+    return [(int(sentimento), estagio) for sentimento, estagio in zip(predicoes, estagios)]
+
+
+def processo_ativo(pid: int) -> bool:
+    """ Indica se existe um processo com o pid informado nesta máquina. """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ExecutorJobs:
+    """ Executa jobs de análise em lote em segundo plano.
+
+    Cada job é conduzido por uma thread do worker, que lê a entrada em blocos, descarta os
+    textos já analisados, envia os demais a um pool de processos (sem broker externo) e grava
+    cada bloco em uma única transação: reviews novos, progresso do job e linhas do arquivo
+    de resultado. O estado fica na tabela jobs, visível a todos os workers.
+
+    Se o worker termina (reciclado, por timeout ou com erro), a thread do job termina junto.
+    Cada job guarda o processo que o conduz e a data do último bloco gravado, e um job
+    pendente ou em execução cujo processo não existe mais, ou sem progresso há mais de
+    JOBS_TEMPO_ORFAO segundos, é marcado com erro (ver `orfao` e `recupera_orfaos`).
+    """
+
+    def __init__(self, Session, diretorio: str = "database/jobs", processos: int = None,
+                 tamanho_bloco: int = None, blocos_em_andamento: int = None, tempo_orfao: float = None):
+        self.Session = Session
+        self.diretorio = diretorio
+        # Tempo sem progresso após o qual o job é considerado interrompido; deve superar o tempo de um bloco
+        self.tempo_orfao = tempo_orfao or float(os.environ.get("JOBS_TEMPO_ORFAO", 600))
+        # Por padrão metade da parcela de núcleos do worker (ver RecursosCPU), dividida entre os processos
+        self.processos = processos or int(os.environ.get("JOBS_PROCESSOS", max(1, RecursosCPU.configuracao()["threads"] // 2)))
+        self.tamanho_bloco = tamanho_bloco or int(os.environ.get("JOBS_TAMANHO_BLOCO", 500))
+        # Blocos enviados ao pool antes de aguardar a gravação do mais antigo
+        self.blocos_em_andamento = blocos_em_andamento or self.processos * 2
+        self.__pool = None
+        self.__pid = None
+        self.__lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def __obtem_pool(self) -> ProcessPoolExecutor:
+        """ Pool de processos do worker. Os processos são criados com spawn: o torch e o OpenMP
+        já carregados no worker não sobrevivem a um fork.
+        """
+        with self.__lock:
+            if self.__pool is None or self.__pid != os.getpid():
+                self.__pool = ProcessPoolExecutor(max_workers=self.processos,
+                                                  mp_context=multiprocessing.get_context("spawn"),
+                                                  initializer=RecursosCPU.inicia_processo,
+                                                  initargs=(RecursosCPU.threads_por_processo(self.processos),))
+                self.__pid = os.getpid()
+            return self.__pool
+
+    def caminho_entrada(self, job: Job) -> str:
+        return os.path.join(self.diretorio, f"{job.uid}.entrada.csv")
+
+    def caminho_resultado(self, job: Job) -> str:
+        return os.path.join(self.diretorio, f"{job.uid}.csv")
+
+    def submete_textos(self, textos: list, tipo_modelo: str) -> Job:
+        """ Cria um job para a lista de textos e inicia a execução em segundo plano. """
+        job = Job(modelo=tipo_modelo, total=len(textos))
+        with open(self.caminho_entrada(job), "w", newline="", encoding="utf-8") as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(["content"])
+            escritor.writerows([texto] for texto in textos)
+        return self.__inicia(job, "content")
+
+    def submete_arquivo(self, arquivo, tipo_modelo: str, coluna: str = "content") -> Job:
+        """ Cria um job para um arquivo CSV enviado, analisando os textos da coluna informada. """
+        job = Job(modelo=tipo_modelo)
+        arquivo.save(self.caminho_entrada(job))
+        with open(self.caminho_entrada(job), newline="", encoding="utf-8") as entrada:
+            leitor = csv.DictReader(entrada)
+            if coluna not in (leitor.fieldnames or []):
+                os.remove(self.caminho_entrada(job))
+                raise ValueError(f"Coluna '{coluna}' não encontrada no arquivo")
+            job.total = sum(1 for _ in leitor)
+        return self.__inicia(job, coluna)
+
+    @staticmethod
+    def identificacao_processo() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def orfao(self, job: Job) -> bool:
+        """ Indica se o job, pendente ou em execução, foi interrompido: o processo que o conduzia,
+        nesta máquina, não existe mais, ou o job não grava progresso há mais de tempo_orfao segundos.
+        """
+        if job.status not in (Job.PENDENTE, Job.EXECUTANDO):
+            return False
+        atualizacao = job.data_atualizacao or job.data_inicio or job.data_criacao
+        if datetime.now() - atualizacao > timedelta(seconds=self.tempo_orfao):
+            return True
+        maquina, _, pid = (job.processo or "").rpartition(":")
+        if maquina == socket.gethostname() and pid.isdigit():
+            return not processo_ativo(int(pid))
+        return False
+
+    def marca_orfao(self, job: Job):
+        """ Marca o job interrompido com erro; a gravação fica a cargo da sessão do job. """
+        job.status = Job.ERRO
+        job.erro = f"Job interrompido: o processo {job.processo} deixou de executá-lo"
+        job.data_fim = datetime.now()
+        if os.path.exists(self.caminho_entrada(job)):
+            os.remove(self.caminho_entrada(job))
+
+    def recupera_orfaos(self) -> int:
+        """ Marca com erro os jobs interrompidos, por exemplo após o reinício da aplicação.
+        Retorna a quantidade de jobs marcados.
+        """
+        session = self.Session()
+        try:
+            jobs = session.query(Job).filter(Job.status.in_([Job.PENDENTE, Job.EXECUTANDO])).all()
+            orfaos = [job for job in jobs if self.orfao(job)]
+            for job in orfaos:
+                self.marca_orfao(job)
+            session.commit()
+            return len(orfaos)
+        finally:
+            session.close()
+
+    def __inicia(self, job: Job, coluna: str) -> Job:
+        job.arquivo_resultado = self.caminho_resultado(job)
+        job.processo = self.identificacao_processo()
+        job.data_atualizacao = datetime.now()
+        session = self.Session()
+        try:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            session.expunge(job)
+        finally:
+            session.close()
+
+        threading.Thread(target=self.__executa, args=(job.id, coluna), name=f"job-{job.uid}", daemon=True).start()
+        return job
+
+    def __le_blocos(self, caminho: str, coluna: str):
+        """ Lê o arquivo de entrada em blocos de tamanho_bloco textos. """
+        with open(caminho, newline="", encoding="utf-8") as entrada:
+            bloco = []
+            for linha in csv.DictReader(entrada):
+                bloco.append(linha.get(coluna) or "")
+                if len(bloco) == self.tamanho_bloco:
+                    yield bloco
+                    bloco = []
+            if bloco:
+                yield bloco
+
+    def __executa(self, job_id: int, coluna: str):
+        session = self.Session()
+        job = session.get(Job, job_id)
+        entrada = self.caminho_entrada(job)
+        job.status = Job.EXECUTANDO
+        job.data_inicio = job.data_atualizacao = datetime.now()
+        session.commit()
+
+        try:
+            pool = self.__obtem_pool()
+            pendentes = deque()
+            with open(job.arquivo_resultado, "w", newline="", encoding="utf-8") as saida:
+                escritor = csv.writer(saida)
+                escritor.writerow(["texto", "sentimento", "situacao"])
+
+                for bloco in self.__le_blocos(entrada, coluna):
+                    # Textos já analisados pelo modelo não são enviados ao pool
+                    existentes = RepositorioReview.busca_sentimentos_existentes(session, [texto for texto in bloco if texto], job.modelo)
+                    novos = list(dict.fromkeys(texto for texto in bloco if texto and texto not in existentes))
+                    futuro = pool.submit(pontuar_bloco_com_estagio, novos, job.modelo) if novos else None
+                    pendentes.append((bloco, novos, futuro))
+
+                    if len(pendentes) >= self.blocos_em_andamento:
+                        self.__grava_bloco(session, job, escritor, *pendentes.popleft())
+
+                while pendentes:
+                    self.__grava_bloco(session, job, escritor, *pendentes.popleft())
+
+            job.status = Job.CONCLUIDO
+        except Exception as e:
+            session.rollback()
+            job.status = Job.ERRO
+            job.erro = str(e)
+        finally:
+            job.data_fim = datetime.now()
+            session.commit()
+            session.close()
+            if os.path.exists(entrada):
+                os.remove(entrada)
+
+    def __grava_bloco(self, session, job: Job, escritor, bloco: list, novos: list, futuro):
+        """ Insere os reviews novos do bloco e atualiza o progresso do job em uma única transação. """
+        sentimentos = dict(zip(novos, futuro.result())) if futuro is not None else {}
+
+        # Nova checagem na gravação: outro bloco ou requisição pode ter inserido o mesmo texto
+        existentes = RepositorioReview.busca_sentimentos_existentes(session, [texto for texto in bloco if texto], job.modelo)
+
+        # Textos existentes no envio ao pool e removidos da base antes da gravação (DELETE /review
+        # ou /review/batch) ainda não têm sentimento: são analisados agora e gravados como novos
+        removidos = [texto for texto in dict.fromkeys(bloco) if texto and texto not in existentes and texto not in sentimentos]
+        if removidos:
+            sentimentos.update(zip(removidos, self.__obtem_pool().submit(pontuar_bloco_com_estagio, removidos, job.modelo).result()))
+
+        data_criacao = datetime.now()
+        reviews = [Review(texto=texto, sentimento=sentimento, modelo=job.modelo, data_criacao=data_criacao, estagio=estagio)
+                   for texto, (sentimento, estagio) in sentimentos.items() if texto not in existentes]
+        RepositorioReview.insere_lote(session, reviews)
+
+        linhas = []
+        for texto in bloco:
+            if not texto:
+                linhas.append([texto, "", "vazio"])
+            elif texto in existentes:
+                linhas.append([texto, existentes[texto], "existente"])
+            else:
+                linhas.append([texto, sentimentos[texto][0], "novo"])
+
+        job.processados += len(bloco)
+        job.inseridos += len(reviews)
+        job.existentes += sum(1 for linha in linhas if linha[2] == "existente")
+        job.data_atualizacao = datetime.now()
+        session.commit()
+        escritor.writerows(linhas)
@@ -0,0 +1,231 @@
+import json
+import os
+
+import numpy as np
+
+
+class FlorestaCompilada:
+    """ ExtraTrees do scikit-learn achatado em arrays contíguos, avaliado com NumPy sobre
+    matrizes esparsas (CSR), sem a validação da entrada e o despacho por árvore do `predict`.
+
+    As árvores de texto são profundas, e percorrê-las nível a nível exigiria centenas de
+    iterações. Em vez disso, a travessia usa a formulação do QuickScorer: as folhas de cada
+    árvore são numeradas da esquerda para a direita, cada nó interno cuja condição
+    `x[atributo] <= limiar` é falsa elimina o intervalo de folhas da sua subárvore esquerda,
+    e a folha de saída é a primeira folha não eliminada da árvore. Como os atributos e os
+    limiares não são negativos (contagens de palavras, escaladas pelo MaxAbsScaler), só os
+    atributos presentes no texto tornam condições falsas: os nós de cada atributo ficam
+    ordenados pelo limiar e bastam uma busca binária por valor não nulo e operações
+    vetorizadas sobre os intervalos eliminados.
+
+    As predições são idênticas às do modelo original: a entrada é convertida para float32
+    como no scikit-learn, as probabilidades das folhas são normalizadas da mesma forma e
+    acumuladas árvore a árvore em float64.
+    """
+
+    ARRAYS = ["chaves", "inicio_eliminado", "fim_eliminado", "inicio_atributo", "limiares",
+              "inicio_arvore", "valores", "classes"]
+
+    def __init__(self, chaves, inicio_eliminado, fim_eliminado, inicio_atributo, limiares,
+                 inicio_arvore, valores, classes, escala=None):
+        # Nós internos ordenados por (atributo, limiar), com a chave atributo * (len(limiares) + 1) + posto do limiar
+        self.chaves = chaves
+        # Intervalo [inicio, fim) de folhas da subárvore esquerda de cada nó, eliminado quando a condição é falsa
+        self.inicio_eliminado = inicio_eliminado
+        self.fim_eliminado = fim_eliminado
+        # Posição do primeiro nó de cada atributo em `chaves`
+        self.inicio_atributo = inicio_atributo
+        # Limiares distintos de todos os nós, ordenados
+        self.limiares = limiares
+        # Número da primeira folha de cada árvore (e o total de folhas no fim)
+        self.inicio_arvore = inicio_arvore
+        # Probabilidades normalizadas de cada folha
+        self.valores = valores
+        self.classes = classes
+        self.escala = escala
+
+    @property
+    def n_atributos(self) -> int:
+        return len(self.inicio_atributo) - 1
+
+    @property
+    def n_arvores(self) -> int:
+        return len(self.inicio_arvore) - 1
+
+    @staticmethod
+    def __numera_folhas(esquerda: np.ndarray, direita: np.ndarray) -> np.ndarray:
+        """ Número, na ordem da esquerda para a direita, da primeira folha da subárvore de cada nó. """
+        ordem = []
+        pilha = [0]
+        while pilha:
+            no = pilha.pop()
+            ordem.append(no)
+            if esquerda[no] != -1:
+                pilha.append(direita[no])
+                pilha.append(esquerda[no])
+
+        folhas = np.ones(len(esquerda), dtype=np.int64)
+        for no in reversed(ordem):
+            if esquerda[no] != -1:
+                folhas[no] = folhas[esquerda[no]] + folhas[direita[no]]
+
+        primeira = np.zeros(len(esquerda), dtype=np.int64)
+        for no in ordem:
+            if esquerda[no] != -1:
+                primeira[esquerda[no]] = primeira[no]
+                primeira[direita[no]] = primeira[no] + folhas[esquerda[no]]
+        return primeira
+
+    @staticmethod
+    def compila(estimador) -> "FlorestaCompilada":
+        """ Converte um ExtraTreesClassifier (ou RandomForestClassifier), ou um Pipeline
+        [MaxAbsScaler, floresta], para os arrays da floresta compilada.
+        """
+        escala = None
+        if hasattr(estimador, "steps"):
+            *transformadores, (_, floresta) = estimador.steps
+            if len(transformadores) > 1 or any(type(t).__name__ != "MaxAbsScaler" for _, t in transformadores):
+                raise ValueError("Apenas pipelines [MaxAbsScaler, floresta] são suportados")
+            if transformadores:
+                escala = 1.0 / transformadores[0][1].scale_
+            estimador = floresta
+
+        if getattr(estimador, "n_outputs_", 1) != 1:
+            raise ValueError("Apenas florestas de classificação com uma saída são suportadas")
+
+        atributos, limiares, inicios, fins, valores, inicio_arvore = [], [], [], [], [], [0]
+        for arvore in estimador.estimators_:
+            tree = arvore.tree_
+            interno = tree.children_left != -1
+            primeira = FlorestaCompilada.__numera_folhas(tree.children_left, tree.children_right) + inicio_arvore[-1]
+
+            atributos.append(tree.feature[interno])
+            limiares.append(tree.threshold[interno])
+            inicios.append(primeira[tree.children_left[interno]])
+            fins.append(primeira[tree.children_right[interno]])
+
+            # Mesma normalização de DecisionTreeClassifier.predict_proba, na ordem das folhas
+            proba = tree.value[:, 0, :arvore.n_classes_].astype(np.float64)
+            normalizador = proba.sum(axis=1)[:, np.newaxis]
+            normalizador[normalizador == 0.0] = 1.0
+            folhas = np.flatnonzero(~interno)
+            valores.append((proba / normalizador)[folhas[np.argsort(primeira[folhas])]])
+            inicio_arvore.append(inicio_arvore[-1] + len(folhas))
+
+        atributo = np.concatenate(atributos)
+        limiar = np.concatenate(limiares)
+        if (limiar < 0).any():
+            raise ValueError("A floresta compilada requer atributos não negativos (limiares >= 0)")
+
+        limiares_unicos = np.unique(limiar)
+        chaves = atributo.astype(np.int64) * (len(limiares_unicos) + 1) + np.searchsorted(limiares_unicos, limiar)
+        ordem = np.argsort(chaves, kind="stable")
+        n_atributos = int(estimador.n_features_in_)
+
+        return FlorestaCompilada(
+            chaves=chaves[ordem],
+            inicio_eliminado=np.concatenate(inicios)[ordem].astype(np.int32),
+            fim_eliminado=np.concatenate(fins)[ordem].astype(np.int32),
+            inicio_atributo=np.searchsorted(atributo[ordem], np.arange(n_atributos + 1)).astype(np.int64),
+            limiares=limiares_unicos,
+            inicio_arvore=np.asarray(inicio_arvore, dtype=np.int64),
+            valores=np.concatenate(valores),
+            classes=np.asarray(estimador.classes_),
+            escala=escala,
+        )
+
+    def salva(self, diretorio: str):
+        """ Grava cada array em um .npy, que pode ser carregado mapeado em memória. """
+        os.makedirs(diretorio, exist_ok=True)
+        for nome in self.ARRAYS:
+            np.save(os.path.join(diretorio, f"{nome}.npy"), getattr(self, nome))
+        if self.escala is not None:
+            np.save(os.path.join(diretorio, "escala.npy"), self.escala)
+        with open(os.path.join(diretorio, "metadados.json"), "w") as arquivo:
+            json.dump({"n_atributos": self.n_atributos, "n_arvores": self.n_arvores,
+                       "n_nos_internos": len(self.chaves), "n_folhas": len(self.valores)}, arquivo)
+
+    @staticmethod
+    def carrega(diretorio: str) -> "FlorestaCompilada":
+        """ Carrega os arrays com mmap_mode='r', compartilhando as páginas entre os workers. """
+        if not os.path.exists(os.path.join(diretorio, "metadados.json")):
+            raise FileNotFoundError(f"Floresta compilada não encontrada em {diretorio}, execute python -m ferramentas.compila_floresta")
+
+        arrays = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode="r") for nome in FlorestaCompilada.ARRAYS}
+        caminho_escala = os.path.join(diretorio, "escala.npy")
+        escala = np.load(caminho_escala, mmap_mode="r") if os.path.exists(caminho_escala) else None
+        return FlorestaCompilada(**arrays, escala=escala)
+
+    def __entrada(self, X):
+        """ Entrada como CSR com valores float32, já escalados, como o scikit-learn os compara. """
+        import scipy.sparse as sp
+
+        X = sp.csr_matrix(X)
+        X.sum_duplicates()
+        linhas = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        dados = X.data.astype(np.float64)
+        if self.escala is not None:
+            dados = dados * self.escala[X.indices]
+        dados = dados.astype(np.float32)
+        if (dados < 0).any():
+            raise ValueError("A floresta compilada requer atributos não negativos")
+
+        # Zeros explícitos não tornam nenhuma condição falsa
+        presentes = dados > 0
+        return X.shape[0], linhas[presentes], X.indices[presentes], dados[presentes]
+
+    def folhas(self, X) -> np.ndarray:
+        """ Número da folha de saída de cada linha em cada árvore, shape (linhas, árvores). """
+        total, linhas, atributos, valores = self.__entrada(X)
+        n_folhas = self.inicio_arvore[-1]
+
+        # Nós falsos de cada valor não nulo: os do atributo com limiar < valor (float32 comparado em float64)
+        posto = np.searchsorted(self.limiares, valores.astype(np.float64), side="left")
+        inicio = self.inicio_atributo[atributos]
+        fim = np.searchsorted(self.chaves, atributos.astype(np.int64) * (len(self.limiares) + 1) + posto, side="left")
+        quantidade = fim - inicio
+        deslocamento = np.cumsum(quantidade) - quantidade
+        nos = np.repeat(inicio - deslocamento, quantidade) + np.arange(quantidade.sum())
+        linha_no = np.repeat(linhas, quantidade)
+
+        # Intervalos eliminados, com as folhas numeradas por linha, ordenados pelo início
+        base = linha_no.astype(np.int64) * n_folhas
+        inicio_eliminado = base + self.inicio_eliminado[nos]
+        fim_eliminado = base + self.fim_eliminado[nos]
+        ordem = np.argsort(inicio_eliminado, kind="stable")
+        inicio_eliminado = inicio_eliminado[ordem]
+        maior_fim = np.maximum.accumulate(fim_eliminado[ordem]) if len(ordem) else fim_eliminado
+
+        # A folha de saída é a primeira folha da árvore ou o fim de algum intervalo eliminado
+        arvores = np.arange(self.n_arvores)
+        candidatos = np.concatenate([
+            (np.arange(total, dtype=np.int64)[:, np.newaxis] * n_folhas + self.inicio_arvore[:-1]).ravel(),
+            fim_eliminado,
+        ])
+        grupos = np.concatenate([
+            (np.arange(total)[:, np.newaxis] * self.n_arvores + arvores).ravel(),
+            linha_no.astype(np.int64) * self.n_arvores + np.searchsorted(self.inicio_arvore, self.fim_eliminado[nos], side="right") - 1,
+        ])
+        # Um candidato está eliminado se algum intervalo iniciado antes dele termina depois dele
+        anterior = np.searchsorted(inicio_eliminado, candidatos, side="right") - 1
+        eliminado = np.zeros(len(candidatos), dtype=bool)
+        valido = anterior >= 0
+        eliminado[valido] = maior_fim[anterior[valido]] > candidatos[valido]
+
+        # Menor candidato não eliminado de cada (linha, árvore)
+        candidatos, grupos = candidatos[~eliminado], grupos[~eliminado]
+        ordem = np.lexsort((candidatos, grupos))
+        primeiros = ordem[np.r_[True, grupos[ordem][1:] != grupos[ordem][:-1]]]
+        saida = np.empty(total * self.n_arvores, dtype=np.int64)
+        saida[grupos[primeiros]] = candidatos[primeiros] - (grupos[primeiros] // self.n_arvores) * n_folhas
+        return saida.reshape(total, self.n_arvores)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """ Probabilidade média de cada classe entre as árvores, como no scikit-learn. """
+        # A soma acumulada é sequencial, árvore a árvore, como a acumulação em float64 do scikit-learn
+        proba = np.cumsum(self.valores[self.folhas(X)], axis=1)[:, -1]
+        proba /= self.n_arvores
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
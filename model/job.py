@@ -0,0 +1,63 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text
+from datetime import datetime
+import uuid
+
+from  model import Base
+
+
+class Job(Base):
+    """ Job de análise em lote executado em segundo plano. """
+    __tablename__ = 'jobs'
+
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    ERRO = "erro"
+
+    id = Column(Integer, primary_key=True)
+    uid = Column(String, nullable=False, unique=True, default=lambda: str(uuid.uuid4()))
+    modelo = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=PENDENTE)
+    total = Column(Integer, nullable=False, default=0)
+    processados = Column(Integer, nullable=False, default=0)
+    inseridos = Column(Integer, nullable=False, default=0)
+    existentes = Column(Integer, nullable=False, default=0)
+    erro = Column(Text, nullable=True)
+    arquivo_resultado = Column(String, nullable=True)
+    # Processo que conduz o job ("host:pid") e último progresso gravado (ver ExecutorJobs.orfao)
+    processo = Column(String, nullable=True)
+    data_atualizacao = Column(DateTime, nullable=True)
+    data_criacao = Column(DateTime, default=datetime.now, nullable=False)
+    data_inicio = Column(DateTime, nullable=True)
+    data_fim = Column(DateTime, nullable=True)
+
+    def __init__(self, modelo: str, total: int = 0):
+        """
+        Cria um Job
+
+        Arguments:
+        modelo: tipo de modelo usado na análise
+        total: quantidade de textos a analisar
+        """
+        self.uid = str(uuid.uuid4())
+        self.modelo = modelo
+        self.status = Job.PENDENTE
+        self.total = total
+        self.processados = 0
+        self.inseridos = 0
+        self.existentes = 0
+        self.data_criacao = datetime.now()
+
+    def textos_por_segundo(self) -> float:
+        """ Vazão média desde o início da execução. """
+        if not self.data_inicio or not self.processados:
+            return 0.0
+        duracao = ((self.data_fim or datetime.now()) - self.data_inicio).total_seconds()
+        return self.processados / duracao if duracao > 0 else 0.0
+
+    def eta_segundos(self):
+        """ Estimativa do tempo restante, com base na vazão média. """
+        if self.status != Job.EXECUTANDO:
+            return 0.0 if self.status == Job.CONCLUIDO else None
+        vazao = self.textos_por_segundo()
+        return (self.total - self.processados) / vazao if vazao else None
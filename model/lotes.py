@@ -0,0 +1,20 @@
+class LotesTokenizados:
+    """ Entrada do modelo transformer dividida em lotes de textos de tamanho parecido.
+
+    Cada lote guarda as posições originais dos seus textos, o que permite devolver
+    as predições na ordem em que os textos foram recebidos.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.lotes = []
+
+    def adiciona(self, indices: list, X_input):
+        """ Adiciona um lote tokenizado com as posições originais dos seus textos. """
+        self.lotes.append((indices, X_input))
+
+    def __iter__(self):
+        return iter(self.lotes)
+
+    def __len__(self):
+        return self.total
@@ -0,0 +1,101 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+
+# Faixas, em segundos, dos histogramas de latência: de 1 ms (limpeza memoizada) a 1 minuto (carga do modelo)
+FAIXAS_LATENCIA = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metricas:
+    """ Métricas da aplicação no formato do Prometheus.
+
+    Com o gunicorn, cada worker grava as suas métricas em arquivos no diretório da variável
+    PROMETHEUS_MULTIPROC_DIR (definida em gunicorn.conf.py) e a rota /metrics agrega os
+    arquivos de todos os workers. Sem a variável, as métricas ficam apenas no processo.
+
+    O modelo de cada etapa vem do contexto aberto por `Metricas.modelo` (ver
+    Analisador.analisar_direto), de forma que o pré-processador e o modelo, compartilhados
+    entre tipos de modelo, são medidos com o tipo que originou a chamada.
+    """
+
+    DURACAO_ETAPA = Histogram("sentimento_etapa_duracao_segundos",
+                              "Duração de cada etapa do atendimento (carga, limpeza, tokenização, inferência, banco)",
+                              ["etapa", "modelo"], buckets=FAIXAS_LATENCIA)
+    DURACAO_REQUISICAO = Histogram("sentimento_requisicao_duracao_segundos", "Duração das requisições HTTP por rota",
+                                   ["metodo", "rota"], buckets=FAIXAS_LATENCIA)
+    REQUISICOES = Counter("sentimento_requisicoes", "Requisições HTTP atendidas", ["metodo", "rota", "status"])
+    TEXTOS = Counter("sentimento_textos_analisados", "Textos enviados ao modelo", ["modelo"])
+    DUPLICADOS = Counter("sentimento_reviews_duplicados", "Reviews recusados por já existirem na base", ["modelo"])
+    ERROS = Counter("sentimento_erros", "Erros retornados pela API", ["rota", "modelo"])
+    CASCATA = Counter("sentimento_cascata_textos", "Textos decididos por cada estágio do modelo em cascata", ["estagio"])
+    CACHE_RESPOSTAS = Counter("sentimento_cache_respostas", "Consultas ao cache de respostas de GET /review por resultado",
+                              ["resultado"])
+
+    __modelo_atual: ContextVar = ContextVar("modelo_atual", default="")
+    # Duração acumulada de cada etapa na requisição em atendimento, para o log da requisição
+    __etapas_requisicao: ContextVar = ContextVar("etapas_requisicao", default=None)
+
+    @staticmethod
+    @contextmanager
+    def modelo(tipo_modelo: str):
+        """ Associa as etapas medidas dentro do bloco ao tipo de modelo informado. """
+        token = Metricas.__modelo_atual.set(tipo_modelo)
+        try:
+            yield
+        finally:
+            Metricas.__modelo_atual.reset(token)
+
+    @staticmethod
+    @contextmanager
+    def mede(etapa: str, tipo_modelo: str = None):
+        """ Registra a duração do bloco no histograma da etapa. """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            modelo = tipo_modelo or Metricas.__modelo_atual.get()
+            Metricas.DURACAO_ETAPA.labels(etapa, modelo).observe(duracao)
+            etapas = Metricas.__etapas_requisicao.get()
+            if etapas is not None:
+                etapas[etapa] = etapas.get(etapa, 0.0) + duracao
+
+    @staticmethod
+    def inicia_requisicao():
+        """ Passa a acumular a duração das etapas medidas na thread da requisição. """
+        return Metricas.__etapas_requisicao.set({})
+
+    @staticmethod
+    def finaliza_requisicao(token) -> dict:
+        """ Retorna a duração, em segundos, de cada etapa medida na requisição. """
+        etapas = Metricas.__etapas_requisicao.get() or {}
+        Metricas.__etapas_requisicao.reset(token)
+        return etapas
+
+    @staticmethod
+    def etapa(nome: str):
+        """ Decorador que mede cada chamada do método como a etapa informada. """
+        def decorador(metodo):
+            @functools.wraps(metodo)
+            def medido(*args, **kwargs):
+                with Metricas.mede(nome):
+                    return metodo(*args, **kwargs)
+            return medido
+        return decorador
+
+    @staticmethod
+    def exporta() -> tuple:
+        """ Retorna as métricas no formato texto do Prometheus e o content type correspondente,
+        agregando todos os workers quando em modo multiprocesso.
+        """
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registro = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registro)
+        else:
+            registro = REGISTRY
+        return generate_latest(registro), CONTENT_TYPE_LATEST
@@ -0,0 +1,92 @@
+from sqlalchemy import text
+
+from model.predicao import PredicaoCache
+from model.review import Review
+
+
+def _cria_indices_reviews(conexao):
+    """ Cria na tabela reviews os índices declarados no modelo: uid único e os índices de listagem
+    ordenada por (data_criacao, id). O índice único (modelo, texto) é criado por _unifica_modelo_texto,
+    após a remoção dos reviews repetidos.
+    """
+    for indice in Review.__table__.indexes:
+        if indice.name != "ix_reviews_modelo_texto":
+            indice.create(conexao, checkfirst=True)
+
+
+def _adiciona_estagio(conexao):
+    """ Adiciona a coluna estagio, preenchida pelo modelo em cascata, aos reviews e ao cache de predições. """
+    for tabela in ("reviews", "predicoes_cache"):
+        colunas = {linha[1] for linha in conexao.execute(text(f"PRAGMA table_info({tabela})"))}
+        if "estagio" not in colunas:
+            conexao.execute(text(f"ALTER TABLE {tabela} ADD COLUMN estagio VARCHAR"))
+
+
+def _adiciona_versao_predicoes(conexao):
+    """ Adiciona ao cache de predições a versão dos artefatos e o índice usado na poda. As
+    predições já gravadas ficam sem versão e deixam de ser usadas.
+    """
+    colunas = {linha[1] for linha in conexao.execute(text("PRAGMA table_info(predicoes_cache)"))}
+    if "versao" not in colunas:
+        conexao.execute(text("ALTER TABLE predicoes_cache ADD COLUMN versao VARCHAR(16)"))
+    for indice in PredicaoCache.__table__.indexes:
+        indice.create(conexao, checkfirst=True)
+
+
+def _adiciona_processo_jobs(conexao):
+    """ Adiciona aos jobs o processo que os conduz e a data do último progresso, usados para
+    identificar jobs interrompidos. Bases sem a tabela jobs a recebem do create_all.
+    """
+    colunas = {linha[1] for linha in conexao.execute(text("PRAGMA table_info(jobs)"))}
+    if not colunas:
+        return
+    for coluna, tipo in (("processo", "VARCHAR"), ("data_atualizacao", "DATETIME")):
+        if coluna not in colunas:
+            conexao.execute(text(f"ALTER TABLE jobs ADD COLUMN {coluna} {tipo}"))
+
+
+def _unifica_modelo_texto(conexao):
+    """ Torna único o índice (modelo, texto), usado pelo INSERT ... ON CONFLICT da importação. Os
+    reviews repetidos, gravados por requisições simultâneas antes do índice, são removidos,
+    mantendo o mais antigo de cada texto.
+    """
+    unicos = {linha[1]: linha[2] for linha in conexao.execute(text("PRAGMA index_list(reviews)"))}
+    if unicos.get("ix_reviews_modelo_texto") == 1:
+        return
+    conexao.execute(text("DELETE FROM reviews WHERE id NOT IN (SELECT MIN(id) FROM reviews GROUP BY modelo, texto)"))
+    conexao.execute(text("DROP INDEX IF EXISTS ix_reviews_modelo_texto"))
+    for indice in Review.__table__.indexes:
+        if indice.name == "ix_reviews_modelo_texto":
+            indice.create(conexao)
+
+
+class Migracao:
+    """ Aplica, em ordem, as migrações ainda não aplicadas à base.
+
+    A versão do esquema fica guardada no PRAGMA user_version do SQLite. Bases novas são
+    criadas já no esquema atual pelo create_all, e as migrações só ajustam bases antigas,
+    por isso cada migração deve ser idempotente.
+    """
+
+    MIGRACOES = [
+        _cria_indices_reviews,
+        _adiciona_estagio,
+        _adiciona_versao_predicoes,
+        _adiciona_processo_jobs,
+        _unifica_modelo_texto,
+    ]
+
+    @staticmethod
+    def versao(conexao) -> int:
+        return conexao.execute(text("PRAGMA user_version")).scalar()
+
+    @staticmethod
+    def aplica(engine) -> int:
+        """ Aplica as migrações pendentes e retorna a versão final do esquema. """
+        with engine.begin() as conexao:
+            versao = Migracao.versao(conexao)
+            for numero, migracao in enumerate(Migracao.MIGRACOES, start=1):
+                if numero > versao:
+                    migracao(conexao)
+                    conexao.execute(text(f"PRAGMA user_version = {numero}"))
+            return Migracao.versao(conexao)
@@ -1,13 +1,42 @@
+import os
 import pickle
+import threading
+import time
+import resource
 import numpy as np
-from abc import abstractmethod
-from transformers import AutoModelForSequenceClassification
-import torch
+from abc import ABC, abstractmethod
+
+# torch, transformers e joblib são importados no primeiro uso de cada modelo, para que
+# workers e ferramentas que não usam o DistilBERT não paguem o custo dessas importações
+from model.lotes import LotesTokenizados
+from model.metricas import Metricas
+from model.recursos import RecursosCPU
 
 class TipoModelo:
     PIPELINE_SCIKIT_LEARN = "pipeline-et"
     MODEL_SCIKIT_LEARN = "model-et"
     MODEL_TRANSFORMERS = "model-distilbert"
+    MODEL_TRANSFORMERS_QUANTIZADO = "model-distilbert-int8"
+    # Pipeline Extra Trees e, apenas nos textos em que ele tem baixa confiança, o DistilBERT
+    CASCATA = "cascata-et-distilbert"
+
+    @staticmethod
+    def todos() -> list:
+        """ Lista os tipos de modelo suportados pela API. """
+        return [TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_SCIKIT_LEARN, TipoModelo.MODEL_TRANSFORMERS,
+                TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO, TipoModelo.CASCATA]
+
+    @staticmethod
+    def estagios(tipo_modelo: str) -> list:
+        """ Lista os modelos usados pelo tipo de modelo, em ordem: os estágios da cascata ou o próprio tipo. """
+        if tipo_modelo == TipoModelo.CASCATA:
+            return [TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_TRANSFORMERS]
+        return [tipo_modelo]
+
+    @staticmethod
+    def transformers() -> list:
+        """ Lista os tipos de modelo que usam o tokenizer do DistilBERT. """
+        return [TipoModelo.MODEL_TRANSFORMERS, TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO]
 
 class Model:
     path: str = None
@@ -31,50 +60,123 @@ class ModelFactory:
             return ModelSciKitLearn()
         elif tipo_modelo == TipoModelo.MODEL_TRANSFORMERS:
             return ModelTransformers()
+        elif tipo_modelo == TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO:
+            return ModelTransformersQuantizado()
         elif tipo_modelo == TipoModelo.PIPELINE_SCIKIT_LEARN:
             return PipelineSciKitLearn()
         else:
             raise ValueError(f"Tipo de modelo desconhecido: {tipo_modelo}")
+
+    @staticmethod
+    def artefatos(tipo_modelo: str) -> list:
+        """ Caminhos dos artefatos que o modelo do tipo informado carrega, sem carregá-lo. """
+        if tipo_modelo == TipoModelo.MODEL_SCIKIT_LEARN:
+            return [caminho_floresta(ModelSciKitLearn.CAMINHO)]
+        elif tipo_modelo == TipoModelo.PIPELINE_SCIKIT_LEARN:
+            return [caminho_floresta(PipelineSciKitLearn.CAMINHO)]
+        elif tipo_modelo == TipoModelo.MODEL_TRANSFORMERS:
+            return [ModelTransformers.CAMINHO]
+        elif tipo_modelo == TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO:
+            return [ModelTransformersQuantizado.CAMINHO]
+        else:
+            raise ValueError(f"Tipo de modelo desconhecido: {tipo_modelo}")
         
+def caminho_artefato(path_pkl: str) -> str:
+    """Prefere a versão .joblib do artefato, gerada por `python -m ferramentas.exporta_artefatos`,
+    quando ela existe, a menos que ARTEFATOS_MMAP=0.
+    """
+    path_joblib = os.path.splitext(path_pkl)[0] + '.joblib'
+    if os.environ.get("ARTEFATOS_MMAP", "1") != "0" and os.path.exists(path_joblib):
+        return path_joblib
+    return path_pkl
+
+
+def carrega_artefato(path: str):
+    """Carrega um artefato .pkl com pickle ou um .joblib com os arrays NumPy mapeados em memória
+    (somente leitura), de forma que as páginas são compartilhadas entre os workers.
+    """
+    if path.endswith('.pkl'):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    elif path.endswith('.joblib'):
+        import joblib
+        return joblib.load(path, mmap_mode='r')
+    else:
+        raise Exception('Formato de arquivo não suportado')
+
+
+def caminho_compilado(path: str) -> str:
+    """Diretório da floresta compilada de um artefato scikit-learn, gerada por
+    `python -m ferramentas.compila_floresta`.
+    """
+    return os.path.splitext(path)[0] + '_compilado/'
+
+
+def caminho_floresta(path_pkl: str) -> str:
+    """Artefato scikit-learn efetivamente usado: a floresta compilada, com BACKEND_FLORESTA=compilado,
+    ou o .pkl/.joblib escolhido por caminho_artefato.
+    """
+    if os.environ.get("BACKEND_FLORESTA", "sklearn") == "compilado":
+        return caminho_compilado(path_pkl)
+    return caminho_artefato(path_pkl)
+
+
+def carrega_floresta(path: str):
+    """Carrega o artefato scikit-learn ou, com BACKEND_FLORESTA=compilado, a sua versão
+    compilada em arrays (ver model/floresta.py), que produz as mesmas predições.
+    """
+    if os.environ.get("BACKEND_FLORESTA", "sklearn") == "compilado":
+        from model.floresta import FlorestaCompilada
+        return FlorestaCompilada.carrega(caminho_compilado(path))
+    return carrega_artefato(path)
+
+
 class PipelineSciKitLearn(Model):
+    CAMINHO = './machine-learning/pipelines/et_sentiment_pipeline.pkl'
+
     def __init__(self):
-        super().__init__('./machine-learning/pipelines/et_sentiment_pipeline.pkl')
+        super().__init__(caminho_artefato(self.CAMINHO))
 
     def carrega_modelo(self):
         """Carregamos o pipeline construindo durante a fase de treinamento
         """
         model = None
         if self.model is None:        
-            if self.path.endswith('.pkl'):
-                with open(self.path, 'rb') as file:
-                    model = pickle.load(file)
-            else:
-                raise Exception('Formato de arquivo não suportado')
+            model = RecursosCPU.configura_estimador(carrega_floresta(self.path))
         return model
     
+    @Metricas.etapa("inferencia")
     def realizar_predicao(self, X_input):
         """Realiza a análise de sentimento com base no modelo treinado
         """
         sentimento = self.model.predict(X_input)
         return sentimento
+
+    @Metricas.etapa("inferencia")
+    def calcula_probabilidades(self, X_input):
+        """Retorna a probabilidade de cada classe, na ordem de `classes`, usada como confiança na cascata
+        """
+        return self.model.predict_proba(X_input)
+
+    @property
+    def classes(self):
+        return self.model.classes_ if hasattr(self.model, "classes_") else self.model.classes
         
 class ModelSciKitLearn(Model):
+    CAMINHO = './machine-learning/models/et_sentiment_classifier.pkl'
 
     def __init__(self):
-        super().__init__('./machine-learning/models/et_sentiment_classifier.pkl')
+        super().__init__(caminho_artefato(self.CAMINHO))
     
     def carrega_modelo(self):
         """Dependendo se o final for .pkl ou .joblib, carregamos de uma forma ou de outra
         """
         model = None
         if self.model is None:        
-            if self.path.endswith('.pkl'):
-                with open(self.path, 'rb') as file:
-                    model = pickle.load(file)
-            else:
-                raise Exception('Formato de arquivo não suportado')
+            model = RecursosCPU.configura_estimador(carrega_floresta(self.path))
         return model
     
+    @Metricas.etapa("inferencia")
     def realizar_predicao(self, X_input):
         """Realiza a análise de sentimento com base no modelo treinado
         """
@@ -82,26 +184,51 @@ class ModelSciKitLearn(Model):
         return sentimento
     
 class ModelTransformers(Model):
+    CAMINHO = './machine-learning/models/tf_sentiment_classifier/'
     device:str = None
     def __init__(self):
-        super().__init__('./machine-learning/models/tf_sentiment_classifier/')
+        import torch
+        RecursosCPU.configura_torch()
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu") 
+        super().__init__(self.CAMINHO)
     
     def carrega_modelo(self):
-        """Carrega o modelo pré-treinado"""
+        """Carrega o modelo pré-treinado e o deixa pronto para inferência no dispositivo"""
+        from transformers import AutoModelForSequenceClassification
+
         if self.model is None:
             self.model = AutoModelForSequenceClassification.from_pretrained(self.path)
         else:
             raise ValueError(f"Não foi possível carregar o modelo do caminho {self.path}")
         
+        # Move o modelo para o dispositivo (GPU/CPU) e o coloca em modo de avaliação uma única vez,
+        # já que a mesma instância é compartilhada entre as requisições
+        self.model.to(self.device)
+        self.model.eval()
         return self.model
     
+    @Metricas.etapa("inferencia")
     def realizar_predicao(self, X_input):
         """Realiza a análise de sentimento com base no modelo treinado"""
 
+        # Entrada dividida em lotes por tamanho: as predições voltam para a ordem original
+        if isinstance(X_input, LotesTokenizados):
+            predictions = np.empty(len(X_input), dtype=np.int64)
+            for indices, lote in X_input:
+                predictions[indices] = np.argmax(self.calcula_logits(lote), axis=-1)
+            return predictions
+
+        # Realizando a predição
+        predictions = np.argmax(self.calcula_logits(X_input), axis=-1)
+
+        return predictions
+
+    def calcula_logits(self, X_input):
+        """Executa o modelo sobre um lote tokenizado e retorna os logits como array NumPy"""
+
+        import torch
+
         # Mover os tensores de entrada para o dispositivo (GPU/CPU)
-        self.model.to(self.device)
-        self.model.eval()        
         inputs = {key: value.to(self.device) for key, value in X_input.items()}
         
         # Desabilitar o cálculo de gradientes, pois estamos apenas fazendo predições
@@ -110,9 +237,144 @@ class ModelTransformers(Model):
             outputs = self.model(**inputs)
 
         # Movendo os logits para a CPU antes de convertê-los para NumPy
-        logits_cpu = outputs.logits.detach().cpu().numpy()
-        
-        # Realizando a predição
-        predictions = np.argmax(logits_cpu, axis=-1)
+        return outputs.logits.detach().cpu().numpy()
+
+
+class ModelTransformersQuantizado(ModelTransformers):
+    """Versão do DistilBERT com as camadas lineares quantizadas dinamicamente para int8,
+    para servir em nós apenas com CPU. O artefato é gerado por `python -m ferramentas.quantizar_modelo`.
+    """
+    CAMINHO = './machine-learning/models/tf_sentiment_classifier_int8/'
+    ARQUIVO_PESOS = 'modelo_int8.pt'
+
+    def __init__(self, path: str = None):
+        import torch
+        RecursosCPU.configura_torch()
+
+        # Operações quantizadas dinamicamente só existem na CPU
+        self.device = torch.device("cpu")
+        Model.__init__(self, path or self.CAMINHO)
+
+    @staticmethod
+    def quantizar(model):
+        """Substitui as camadas lineares do modelo por versões int8 com quantização dinâmica"""
+        import torch
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def carrega_modelo(self):
+        """Monta a arquitetura a partir da configuração, quantiza e carrega os pesos int8 exportados"""
+        arquivo_pesos = os.path.join(self.path, self.ARQUIVO_PESOS)
+        if not os.path.exists(arquivo_pesos):
+            raise FileNotFoundError(f"Modelo quantizado não encontrado em {arquivo_pesos}, execute python -m ferramentas.quantizar_modelo")
+
+        import torch
+        from transformers import AutoConfig, AutoModelForSequenceClassification
+
+        config = AutoConfig.from_pretrained(self.path)
+        model = self.quantizar(AutoModelForSequenceClassification.from_config(config))
+        model.load_state_dict(torch.load(arquivo_pesos, map_location=self.device))
+        model.eval()
+        return model
+
+
+def memoria_rss() -> int:
+    """Retorna a memória residente (RSS) atual do processo em bytes.
+    Usa /proc quando disponível e, nos demais sistemas, o pico informado por getrusage.
+    """
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Registro(ABC):
+    """Mantém uma única instância compartilhada de cada artefato por processo (worker).
+
+    O artefato é criado na primeira solicitação, sob um lock por chave, de forma que
+    requisições concorrentes aguardam a mesma carga em vez de repeti-la. O tempo de
+    carga e o acréscimo de memória residente de cada artefato ficam registrados.
+    """
+    _instancias: dict = None
+    _estatisticas: dict = None
+    _locks: dict = None
+    _lock: threading.Lock = None
+    # Etapa sob a qual o tempo de carga é registrado nas métricas
+    ETAPA_CARGA = "carga"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Cada registro concreto tem o seu próprio estado
+        cls._instancias = {}
+        cls._estatisticas = {}
+        cls._locks = {}
+        cls._lock = threading.Lock()
+
+    @staticmethod
+    @abstractmethod
+    def _cria(tipo_modelo: str):
+        """ Cria uma nova instância do artefato. """
+        pass
+
+    @classmethod
+    def _chave(cls, tipo_modelo: str) -> str:
+        """ Chave de compartilhamento da instância, permite que tipos diferentes usem o mesmo artefato. """
+        return tipo_modelo
+
+    @classmethod
+    def obter(cls, tipo_modelo: str):
+        """ Retorna a instância compartilhada, carregando-a se for o primeiro uso no processo. """
+        chave = cls._chave(tipo_modelo)
+        instancia = cls._instancias.get(chave)
+        if instancia is not None:
+            return instancia
+
+        with cls._lock:
+            lock = cls._locks.setdefault(chave, threading.Lock())
+
+        with lock:
+            instancia = cls._instancias.get(chave)
+            if instancia is None:
+                memoria_inicial = memoria_rss()
+                inicio = time.perf_counter()
+                with Metricas.mede(cls.ETAPA_CARGA, tipo_modelo):
+                    instancia = cls._cria(tipo_modelo)
+                cls._estatisticas[chave] = {
+                    "classe": type(instancia).__name__,
+                    "tempo_carga_s": round(time.perf_counter() - inicio, 4),
+                    "memoria_mb": round(max(memoria_rss() - memoria_inicial, 0) / (1024 * 1024), 2),
+                }
+                cls._instancias[chave] = instancia
+        return instancia
+
+    @classmethod
+    def carregados(cls) -> list:
+        """ Lista as chaves dos artefatos já carregados neste processo. """
+        return list(cls._instancias.keys())
+
+    @classmethod
+    def estatisticas(cls) -> dict:
+        """ Tempo de carga e memória ocupada por cada artefato carregado neste processo. """
+        return {chave: dict(valores) for chave, valores in cls._estatisticas.items()}
+
+    @classmethod
+    def limpar(cls):
+        """ Descarta as instâncias carregadas (útil em testes). """
+        with cls._lock:
+            cls._instancias.clear()
+            cls._estatisticas.clear()
+            cls._locks.clear()
+
+
+class RegistroModelos(Registro):
+    """ Registro dos modelos carregados, um por TipoModelo. """
+    ETAPA_CARGA = "carga_modelo"
+
+    @staticmethod
+    def _cria(tipo_modelo: str) -> Model:
+        return ModelFactory.cria_modelo(tipo_modelo)
 
-        return predictions
\ No newline at end of file
+    @classmethod
+    def obtem_modelo(cls, tipo_modelo: str) -> Model:
+        """ Retorna o modelo compartilhado do tipo informado. """
+        return cls.obter(tipo_modelo)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from datetime import datetime
+
+from  model import Base
+
+
+class PredicaoCache(Base):
+    """ Predição já realizada para um texto normalizado, identificado pelo seu hash, e um modelo. """
+    __tablename__ = 'predicoes_cache'
+    __table_args__ = (
+        # poda das predições mais antigas (ver CachePredicoes.poda)
+        Index('ix_predicoes_cache_data_criacao', 'data_criacao'),
+    )
+
+    hash = Column(String(64), primary_key=True)
+    modelo = Column(String, primary_key=True)
+    # Artefatos e configurações que produziram a predição (ver CachePredicoes.versao)
+    versao = Column(String(16), nullable=True)
+    sentimento = Column(Integer, nullable=False)
+    # Estágio da cascata que decidiu o sentimento (ver Review.estagio)
+    estagio = Column(String, nullable=True)
+    data_criacao = Column(DateTime, default=datetime.now, nullable=False)
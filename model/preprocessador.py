@@ -1,13 +1,18 @@
-from sklearn.model_selection import train_test_split
-from transformers import AutoTokenizer
 import pickle
-import spacy
 import re
+import os
+import threading
+from collections import OrderedDict
 from abc import abstractmethod
 import numpy as np
-import pandas as pd
 
-from model.modelo import TipoModelo
+# spaCy, transformers e scikit-learn são importados apenas quando o pré-processador
+# correspondente é criado, no primeiro uso ou no aquecimento do seu TipoModelo
+
+from model.modelo import TipoModelo, Registro
+from model.lotes import LotesTokenizados
+from model.metricas import Metricas
+from model.recursos import RecursosCPU
 
 class PreProcessador:
     """ Classe para cuidar do pré-processamento dos dados. """
@@ -33,6 +38,8 @@ class PreProcessador:
     @abstractmethod
     def separa_teste_treino(X, y, percentual_teste, seed=7):
         """ Separa os dados em treino e teste. """
+        from sklearn.model_selection import train_test_split
+
         # divisão em treino e teste
         return train_test_split(X, y, test_size=percentual_teste, shuffle=True, random_state=seed, stratify=y)  # holdout com estratificação
     
@@ -42,16 +49,45 @@ class PreProcessadorFactory:
     def cria_preprocessador(tipo_modelo: str) -> PreProcessador:
         if tipo_modelo == TipoModelo.MODEL_SCIKIT_LEARN or tipo_modelo == TipoModelo.PIPELINE_SCIKIT_LEARN:
             return PreProcessadorScikitLearn()
-        elif tipo_modelo == TipoModelo.MODEL_TRANSFORMERS:
+        elif tipo_modelo in TipoModelo.transformers():
             return PreProcessadorTransformers()
         else:
             raise ValueError(f"Tipo de modelo desconhecido: {tipo_modelo}")
+
+    @staticmethod
+    def artefatos(tipo_modelo: str) -> list:
+        """ Caminhos dos artefatos que o pré-processador do tipo informado carrega, sem carregá-lo. """
+        if tipo_modelo == TipoModelo.MODEL_SCIKIT_LEARN or tipo_modelo == TipoModelo.PIPELINE_SCIKIT_LEARN:
+            return [PreProcessadorScikitLearn.CAMINHO_VETORIZADOR, PreProcessadorScikitLearn.CAMINHO_SCALER]
+        elif tipo_modelo in TipoModelo.transformers():
+            return [PreProcessadorTransformers.CAMINHO_TOKENIZER]
+        else:
+            raise ValueError(f"Tipo de modelo desconhecido: {tipo_modelo}")
         
 class PreProcessadorTransformers(PreProcessador):
-    """ Classe para cuidar do pré-processamento dos dados. """
-    def __init__(self):
+    """ Classe para cuidar do pré-processamento dos dados.
+
+    Com o padding dinâmico (padrão), cada lote é completado apenas até o tamanho do seu
+    maior texto em vez de sempre até max_length. Listas maiores que `tamanho_lote` são
+    ordenadas pelo número de tokens e divididas em lotes de textos de tamanho parecido;
+    o modelo devolve as predições na ordem original.
+    """
+    CAMINHO_TOKENIZER = './machine-learning/models/tf_sentiment_classifier/'
+    max_length = 40
+    # Versão da preparação dos textos: incrementar ao alterar o código que gera os tokens, para
+    # que os resultados guardados em disco (ver CacheAvaliacao) sejam refeitos
+    VERSAO_PREPROCESSAMENTO = 1
+
+    def __init__(self, padding_dinamico: bool = None, tamanho_lote: int = None):
 
-        super().__init__('./machine-learning/models/tf_sentiment_classifier/', None)
+        super().__init__(self.CAMINHO_TOKENIZER, None)
+
+        if padding_dinamico is None:
+            padding_dinamico = os.environ.get("PADDING_DINAMICO", "1").lower() in ("1", "true", "sim")
+        self.padding_dinamico = padding_dinamico
+        self.tamanho_lote = tamanho_lote if tamanho_lote is not None else int(os.environ.get("TAMANHO_LOTE_TRANSFORMERS", 64))
+
+        from transformers import AutoTokenizer
 
         # Carrega o tokenizer
         self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_path)
@@ -59,28 +95,104 @@ class PreProcessadorTransformers(PreProcessador):
         if self.tokenizer is None:
             raise Exception('Vetorizador não encontrado')          
 
+        # O tokenizer "fast" não aceita chamadas concorrentes na mesma instância
+        self.lock = threading.Lock()
+        self.tokens_reais = 0
+        self.tokens_padding = 0
+
+    @Metricas.etapa("tokenizacao")
     def preparar_textos(self, textos):
         """ Prepara os dados recebidos do front para serem usados no modelo. """
 
-        if isinstance(textos, pd.Series):
-            textos = textos.tolist()
-        elif isinstance(textos, str):
+        if isinstance(textos, str):
             textos = [textos]
         elif not isinstance(textos, list):
-            raise ValueError('Tipo de dado inválido. Esperado str, list ou pd.Series.')
-                
-        X_input = self.tokenizer(textos, max_length=40, add_special_tokens=True, truncation=True, padding='max_length', return_attention_mask=True, return_tensors='pt')
-        return  X_input
+            # pd.Series, sem importar o pandas no caminho das requisições
+            if type(textos).__name__ != 'Series':
+                raise ValueError('Tipo de dado inválido. Esperado str, list ou pd.Series.')
+            textos = textos.tolist()
+
+        if not self.padding_dinamico:
+            with self.lock:
+                X_input = self.tokenizer(textos, max_length=self.max_length, add_special_tokens=True, truncation=True, padding='max_length', return_attention_mask=True, return_tensors='pt')
+                self.__contabiliza(X_input)
+            return  X_input
+
+        if len(textos) <= self.tamanho_lote:
+            with self.lock:
+                X_input = self.tokenizer(textos, max_length=self.max_length, add_special_tokens=True, truncation=True, padding='longest', return_attention_mask=True, return_tensors='pt')
+                self.__contabiliza(X_input)
+            return X_input
+
+        return self.__prepara_em_lotes(textos)
+
+    def __prepara_em_lotes(self, textos: list) -> LotesTokenizados:
+        """ Tokeniza sem padding, agrupa os textos por número de tokens e completa cada lote
+        apenas até o seu maior texto.
+        """
+        with self.lock:
+            codificados = self.tokenizer(textos, max_length=self.max_length, add_special_tokens=True, truncation=True, return_attention_mask=True)
+
+            ordem = sorted(range(len(textos)), key=lambda indice: len(codificados['input_ids'][indice]))
+            lotes = LotesTokenizados(len(textos))
+            for inicio in range(0, len(ordem), self.tamanho_lote):
+                indices = ordem[inicio:inicio + self.tamanho_lote]
+                lote = {chave: [valores[indice] for indice in indices] for chave, valores in codificados.items()}
+                X_input = self.tokenizer.pad(lote, padding='longest', return_attention_mask=True, return_tensors='pt')
+                self.__contabiliza(X_input)
+                lotes.adiciona(indices, X_input)
+        return lotes
+
+    def __contabiliza(self, X_input):
+        mascara = X_input['attention_mask']
+        reais = int(mascara.sum())
+        self.tokens_reais += reais
+        self.tokens_padding += int(mascara.numel()) - reais
+
+    def estatisticas(self) -> dict:
+        """ Tokens efetivamente processados e tokens de padding gerados por este pré-processador. """
+        total = self.tokens_reais + self.tokens_padding
+        return {
+            "padding_dinamico": self.padding_dinamico,
+            "tokens_reais": self.tokens_reais,
+            "tokens_padding": self.tokens_padding,
+            "proporcao_padding": round(self.tokens_padding / total, 4) if total else 0.0,
+        }
 
     def scaler(self, X_train):
         return False
 
 class PreProcessadorScikitLearn(PreProcessador):
-    """ Classe para cuidar do pré-processamento dos dados. """
+    """ Classe para cuidar do pré-processamento dos dados.
+
+    No modo enxuto (padrão) o spaCy é carregado sem os componentes que não influenciam
+    o lema nem as stop words (parser e NER), e listas de textos são processadas em
+    lote com `nlp.pipe`. O texto limpo é o mesmo do pipeline completo, de forma que o
+    vetorizador treinado continua válido.
+    """
     npl = None
-    def __init__(self):
+    CAMINHO_VETORIZADOR = './machine-learning/vectorizer/count_vectorizer.pkl'
+    CAMINHO_SCALER = './machine-learning/scalers/maxabs_scaler_sentiment.pkl'
+    # Versão da limpeza dos textos: incrementar ao alterar o código da limpeza (lematização, stop
+    # words, pontuação), para que os resultados guardados em disco (ver CacheAvaliacao) sejam refeitos
+    VERSAO_PREPROCESSAMENTO = 1
+    # Componentes do pt_core_news_sm que não são usados na limpeza dos textos
+    COMPONENTES_DESNECESSARIOS = ["parser", "ner", "senter"]
+    # Limite a partir do qual uma lista é processada com n_process processos
+    LIMITE_MULTIPROCESSO = 2000
+
+    def __init__(self, enxuto: bool = True, n_process: int = None, tamanho_lote: int = 256, tamanho_memo: int = None):
+        self.enxuto = enxuto
+        # Número de processos usados pelo spaCy em listas com mais de LIMITE_MULTIPROCESSO textos,
+        # por padrão SPACY_N_PROCESS limitado às threads do worker (ver RecursosCPU)
+        self.n_process = n_process if n_process is not None else RecursosCPU.processos_spacy()
+        self.tamanho_lote = tamanho_lote
+        # Memoização dos textos já limpos, limitada a tamanho_memo entradas
+        self.tamanho_memo = tamanho_memo if tamanho_memo is not None else int(os.environ.get("SPACY_MEMO_TAMANHO", 10000))
+        self.__memo = OrderedDict()
+        self.__lock_memo = threading.Lock()
 
-        super().__init__('./machine-learning/vectorizer/count_vectorizer.pkl', './machine-learning/scalers/maxabs_scaler_sentiment.pkl')
+        super().__init__(self.CAMINHO_VETORIZADOR, self.CAMINHO_SCALER)
 
         # Carrega o vetorizador
         with open(self.tokenizer_path, 'rb') as file:
@@ -102,8 +214,10 @@ class PreProcessadorScikitLearn(PreProcessador):
         # Stop words em português
         novas_stop_words = [ 'a', 'à', 'adeus', 'agora', 'aí', 'ainda', 'além', 'algo', 'alguém', 'algum', 'alguma', 'algumas', 'alguns', 'ali', 'ampla', 'amplas', 'amplo', 'amplos', 'ano', 'anos', 'ante', 'antes', 'ao', 'aos', 'apenas', 'apoio', 'após', 'aquela', 'aquelas', 'aquele', 'aqueles', 'aqui', 'aquilo', 'área', 'as', 'às', 'assim', 'até', 'atrás', 'através', 'baixo', 'bastante', 'bem', 'boa', 'boas', 'bom', 'bons', 'breve', 'cá', 'cada', 'catorze', 'cedo', 'cento', 'certamente', 'certeza', 'cima', 'cinco', 'coisa', 'coisas', 'com', 'como', 'conselho', 'contra', 'contudo', 'custa', 'da', 'dá', 'dão', 'daquela', 'daquelas', 'daquele', 'daqueles', 'dar', 'das', 'de', 'debaixo', 'dela', 'delas', 'dele', 'deles', 'demais', 'dentro', 'depois', 'desde', 'dessa', 'dessas', 'desse', 'desses', 'desta', 'destas', 'deste', 'destes', 'deve', 'devem', 'devendo', 'dever', 'deverá', 'deverão', 'deveria', 'deveriam', 'devia', 'deviam', 'dez', 'dezanove', 'dezasseis', 'dezassete', 'dezoito', 'dia', 'diante', 'disse', 'disso', 'disto', 'dito', 'diz', 'dizem', 'dizer', 'do', 'dois', 'dos', 'doze', 'duas', 'dúvida', 'e', 'é', 'ela', 'elas', 'ele', 'eles', 'em', 'embora', 'enquanto', 'entre', 'era', 'eram', 'éramos', 'és', 'essa', 'essas', 'esse', 'esses', 'esta', 'está', 'estamos', 'estão', 'estar', 'estas', 'estás', 'estava', 'estavam', 'estávamos', 'este', 'esteja', 'estejam', 'estejamos', 'estes', 'esteve', 'estive', 'estivemos', 'estiver', 'estivera', 'estiveram', 'estivéramos', 'estiverem', 'estivermos', 'estivesse', 'estivessem', 'estivéssemos', 'estiveste', 'estivestes', 'estou', 'etc', 'eu', 'exemplo', 'faço', 'falta', 'favor', 'faz', 'fazeis', 'fazem', 'fazemos', 'fazendo', 'fazer', 'fazes', 'feita', 'feitas', 'feito', 'feitos', 'fez', 'fim', 'final', 'foi', 'fomos', 'for', 'fora', 'foram', 'fôramos', 'forem', 'forma', 'formos', 'fosse', 'fossem', 'fôssemos', 'foste', 'fostes', 'fui', 'geral', 'grande', 'grandes', 'grupo', 'há', 'haja', 'hajam', 'hajamos', 'hão', 'havemos', 'havia', 'hei', 'hoje', 'hora', 'horas', 'houve', 'houvemos', 'houver', 'houvera', 'houverá', 'houveram', 'houvéramos', 'houverão', 'houverei', 'houverem', 'houveremos', 'houveria', 'houveriam', 'houveríamos', 'houvermos', 'houvesse', 'houvessem', 'houvéssemos', 'isso', 'isto', 'já', 'la', 'lá', 'lado', 'lhe', 'lhes', 'lo', 'local', 'logo', 'longe', 'lugar', 'maior', 'maioria', 'mais', 'mal', 'mas', 'máximo', 'me', 'meio', 'menor', 'menos', 'mês', 'meses', 'mesma', 'mesmas', 'mesmo', 'mesmos', 'meu', 'meus', 'mil', 'minha', 'minhas', 'momento', 'muita', 'muitas', 'muito', 'muitos', 'na', 'nada', 'não', 'naquela', 'naquelas', 'naquele', 'naqueles', 'nas', 'nem', 'nenhum', 'nenhuma', 'nessa', 'nessas', 'nesse', 'nesses', 'nesta', 'nestas', 'neste', 'nestes', 'ninguém', 'nível', 'no', 'noite', 'nome', 'nos', 'nós', 'nossa', 'nossas', 'nosso', 'nossos', 'nova', 'novas', 'nove', 'novo', 'novos', 'num', 'numa', 'número', 'nunca', 'o', 'obra', 'obrigada', 'obrigado', 'oitava', 'oitavo', 'oito', 'onde', 'ontem', 'onze', 'os', 'ou', 'outra', 'outras', 'outro', 'outros', 'para', 'parece', 'parte', 'partir', 'paucas', 'pela', 'pelas', 'pelo', 'pelos', 'pequena', 'pequenas', 'pequeno', 'pequenos', 'per', 'perante', 'perto', 'pode', 'pude', 'pôde', 'podem', 'podendo', 'poder', 'poderia', 'poderiam', 'podia', 'podiam', 'põe', 'põem', 'pois', 'ponto', 'pontos', 'por', 'porém', 'porque', 'porquê', 'posição', 'possível', 'possivelmente', 'posso', 'pouca', 'poucas', 'pouco', 'poucos', 'primeira', 'primeiras', 'primeiro', 'primeiros', 'própria', 'próprias', 'próprio', 'próprios', 'próxima', 'próximas', 'próximo', 'próximos', 'pude', 'puderam', 'quais', 'quáis', 'qual', 'quando', 'quanto', 'quantos', 'quarta', 'quarto', 'quatro', 'que', 'quê', 'quem', 'quer', 'quereis', 'querem', 'queremas', 'queres', 'quero', 'questão', 'quinta', 'quinto', 'quinze', 'relação', 'sabe', 'sabem', 'são', 'se', 'segunda', 'segundo', 'sei', 'seis', 'seja', 'sejam', 'sejamos', 'sem', 'sempre', 'sendo', 'ser', 'será', 'serão', 'serei', 'seremos', 'seria', 'seriam', 'seríamos', 'sete', 'sétima', 'sétimo', 'seu', 'seus', 'sexta', 'sexto', 'si', 'sido', 'sim', 'sistema', 'só', 'sob', 'sobre', 'sois', 'somos', 'sou', 'sua', 'suas', 'tal', 'talvez', 'também', 'tampouco', 'tanta', 'tantas', 'tanto', 'tão', 'tarde', 'te', 'tem', 'tém', 'têm', 'temos', 'tendes', 'tendo', 'tenha', 'tenham', 'tenhamos', 'tenho', 'tens', 'ter', 'terá', 'terão', 'terceira', 'terceiro', 'terei', 'teremos', 'teria', 'teriam', 'teríamos', 'teu', 'teus', 'teve', 'ti', 'tido', 'tinha', 'tinham', 'tínhamos', 'tive', 'tivemos', 'tiver', 'tivera', 'tiveram', 'tivéramos', 'tiverem', 'tivermos', 'tivesse', 'tivessem', 'tivéssemos', 'tiveste', 'tivestes', 'toda', 'todas', 'todavia', 'todo', 'todos', 'trabalho', 'três', 'treze', 'tu', 'tua', 'tuas', 'tudo', 'última', 'últimas', 'último', 'últimos', 'um', 'uma', 'umas', 'uns', 'vai', 'vais', 'vão', 'vários', 'vem', 'vêm', 'vendo', 'vens', 'ver', 'vez', 'vezes', 'viagem', 'vindo', 'vinte', 'vir', 'você', 'vocês', 'vos', 'vós', 'vossa', 'vossas', 'vosso', 'vossos', 'zero', '1', '2', '3', '4', '5', '6', '7', '8', '9', '0', '_' ]
 
-        # Carrega stop words em português
-        self.nlp = spacy.load("pt_core_news_sm")
+        import spacy
+
+        # Carrega o modelo em português, sem os componentes desnecessários no modo enxuto
+        self.nlp = spacy.load("pt_core_news_sm", exclude=self.COMPONENTES_DESNECESSARIOS if self.enxuto else [])
 
         # Adiciona cada palavra da lista às stop words do spaCy
         for word in novas_stop_words:
@@ -112,33 +226,86 @@ class PreProcessadorScikitLearn(PreProcessador):
             self.nlp.vocab[word].is_stop = True
 
 
-    def __clean_text(self, text):
+    def __normaliza_texto(self, text):
         # Converte o texto para string
         text = str(text)
         # Remove caracteres especiais
         text = re.sub(r'[^\w\s]', '', text)  
         # Converte para minúsculas
-        text = text.lower()             
-        # Processa o texto com spaCy
-        doc = self.nlp(text)        
-       # Remove stopwords, pontuação e lematiza o texto
-        cleaned_text = ' '.join([token.lemma_ for token in doc if not token.is_stop and not token.is_punct])
-        return cleaned_text   
+        return text.lower()
+
+    def __limpa_doc(self, doc):
+        # Remove stopwords, pontuação e lematiza o texto
+        return ' '.join([token.lemma_ for token in doc if not token.is_stop and not token.is_punct])
+
+    @Metricas.etapa("limpeza_spacy")
+    def limpar_textos(self, textos) -> list:
+        """ Limpa e lematiza uma lista de textos. Textos já vistos vêm da memoização e
+        os demais são processados em lote pelo spaCy.
+        """
+        normalizados = [self.__normaliza_texto(texto) for texto in textos]
+        limpos = {}
+        with self.__lock_memo:
+            for texto in normalizados:
+                if texto in self.__memo:
+                    self.__memo.move_to_end(texto)
+                    limpos[texto] = self.__memo[texto]
+
+        faltantes = list(dict.fromkeys(texto for texto in normalizados if texto not in limpos))
+        if faltantes:
+            n_process = self.n_process if len(faltantes) >= self.LIMITE_MULTIPROCESSO else 1
+            docs = self.nlp.pipe(faltantes, batch_size=self.tamanho_lote, n_process=n_process)
+            novos = {texto: self.__limpa_doc(doc) for texto, doc in zip(faltantes, docs)}
+            limpos.update(novos)
+
+            if self.tamanho_memo > 0:
+                with self.__lock_memo:
+                    self.__memo.update(novos)
+                    while len(self.__memo) > self.tamanho_memo:
+                        self.__memo.popitem(last=False)
+
+        return [limpos[texto] for texto in normalizados]
       
     def preparar_textos(self, textos):
         """ Prepara os dados recebidos do front para serem usados no modelo. """
         textos_limpos = []
         if isinstance(textos, (list, np.ndarray)):
-            textos_limpos= [self.__clean_text(texto) for texto in textos]
+            textos_limpos = self.limpar_textos(textos)
         elif isinstance(textos, str):
-           textos_limpos = [self.__clean_text(textos)]   
+           textos_limpos = self.limpar_textos([textos])
         else:
             raise ValueError('Tipo de dado inválido')   
 
-        return self.tokenizer.transform(textos_limpos)
+        with Metricas.mede("vetorizacao"):
+            return self.tokenizer.transform(textos_limpos)
        
     def scaler(self, X_train):
         """ Normaliza os dados. """
         # normalização/padronização
         reescaled_X_train = self.scaler.transform(X_train)
         return reescaled_X_train
+
+
+class RegistroPreProcessadores(Registro):
+    """ Registro dos pré-processadores carregados. Os modelos scikit-learn compartilham
+    o mesmo pré-processador (vetorizador, scaler e spaCy), assim como as versões do DistilBERT
+    compartilham o mesmo tokenizer.
+    """
+    ETAPA_CARGA = "carga_preprocessador"
+
+    @staticmethod
+    def _cria(tipo_modelo: str) -> PreProcessador:
+        return PreProcessadorFactory.cria_preprocessador(tipo_modelo)
+
+    @classmethod
+    def _chave(cls, tipo_modelo: str) -> str:
+        if tipo_modelo == TipoModelo.PIPELINE_SCIKIT_LEARN:
+            return TipoModelo.MODEL_SCIKIT_LEARN
+        if tipo_modelo in TipoModelo.transformers():
+            return TipoModelo.MODEL_TRANSFORMERS
+        return tipo_modelo
+
+    @classmethod
+    def obtem_preprocessador(cls, tipo_modelo: str) -> PreProcessador:
+        """ Retorna o pré-processador compartilhado do tipo de modelo informado. """
+        return cls.obter(tipo_modelo)
@@ -0,0 +1,178 @@
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RecursosCPU:
+    """ Divide os núcleos disponíveis entre os workers e limita as threads de cada biblioteca.
+
+    Sem limites, cada worker do gunicorn usa todos os núcleos no torch (intra-op e inter-op),
+    no BLAS/OpenMP do NumPy e do scikit-learn, e o spaCy e o Extra Trees podem abrir os seus
+    próprios processos e threads, o que sobrecarrega a máquina quando vários workers atendem
+    ao mesmo tempo. A configuração vem das variáveis de ambiente:
+
+    * CPU_GOVERNADOR: com `0`, não aplica nenhum limite;
+    * CPU_WORKERS: quantidade de workers que dividem os núcleos (definida pelo gunicorn.conf.py);
+    * CPU_THREADS_POR_WORKER: threads de cada worker, por padrão núcleos / workers;
+    * CPU_THREADS_INTEROP: threads inter-op do torch (padrão `1`).
+
+    A configuração é calculada da mesma forma no processo principal e nos workers, e é
+    aplicada no início de cada worker (`aplica`) e quando cada biblioteca é carregada.
+    """
+
+    __configuracao: dict = None
+    __lock = threading.Lock()
+    __limitador_blas = None
+
+    @staticmethod
+    def nucleos_disponiveis() -> int:
+        """ Núcleos que o processo pode usar: a afinidade de CPU, limitada pela cota do cgroup (containers). """
+        try:
+            nucleos = len(os.sched_getaffinity(0))
+        except AttributeError:
+            nucleos = os.cpu_count() or 1
+
+        try:
+            with open("/sys/fs/cgroup/cpu.max") as arquivo:
+                cota, periodo = arquivo.read().split()
+            if cota != "max":
+                nucleos = min(nucleos, max(1, int(int(cota) / int(periodo))))
+        except (OSError, ValueError):
+            pass
+        return nucleos
+
+    @staticmethod
+    def configuracao() -> dict:
+        """ Threads de cada biblioteca neste worker, calculadas a partir das variáveis de ambiente. """
+        if RecursosCPU.__configuracao is None:
+            nucleos = RecursosCPU.nucleos_disponiveis()
+            workers = max(1, int(os.environ.get("CPU_WORKERS", 1)))
+            threads = int(os.environ.get("CPU_THREADS_POR_WORKER", 0)) or max(1, nucleos // workers)
+            RecursosCPU.__configuracao = {
+                "ativo": os.environ.get("CPU_GOVERNADOR", "1") != "0",
+                "nucleos": nucleos,
+                "workers": workers,
+                "threads": threads,
+                "threads_interop": max(1, int(os.environ.get("CPU_THREADS_INTEROP", 1))),
+                # O Extra Trees paraleliza as árvores com threads do joblib
+                "n_jobs": threads,
+                # Processos do spaCy em listas grandes, dentro da parcela de núcleos do worker
+                "processos_spacy": max(1, min(threads, int(os.environ.get("SPACY_N_PROCESS", threads)))),
+            }
+        return RecursosCPU.__configuracao
+
+    @staticmethod
+    def ativo() -> bool:
+        return RecursosCPU.configuracao()["ativo"]
+
+    @staticmethod
+    def aplica() -> dict:
+        """ Aplica os limites às bibliotecas já carregadas no processo e às variáveis de ambiente
+        lidas pelas que ainda serão carregadas (inclusive em processos filhos, como os pools de jobs).
+        """
+        configuracao = RecursosCPU.configuracao()
+        if not configuracao["ativo"]:
+            return configuracao
+
+        threads = str(configuracao["threads"])
+        for variavel in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+            os.environ[variavel] = threads
+
+        if "torch" in sys.modules:
+            RecursosCPU.configura_torch()
+        RecursosCPU.configura_blas()
+        logger.info("Limites de CPU: %d núcleos, %d workers, %d threads por worker",
+                    configuracao["nucleos"], configuracao["workers"], configuracao["threads"])
+        return configuracao
+
+    @staticmethod
+    def configura_torch():
+        """ Threads intra-op e inter-op do torch. O número de threads inter-op só pode ser definido
+        antes do primeiro uso do pool inter-op, e é herdado pelos workers criados com fork.
+        """
+        configuracao = RecursosCPU.configuracao()
+        if not configuracao["ativo"]:
+            return
+
+        import torch
+
+        torch.set_num_threads(configuracao["threads"])
+        try:
+            torch.set_num_interop_threads(configuracao["threads_interop"])
+        except RuntimeError:
+            logger.debug("Threads inter-op do torch já definidas: %d", torch.get_num_interop_threads())
+
+    @staticmethod
+    def configura_blas():
+        """ Limita as threads do BLAS e do OpenMP das bibliotecas nativas já carregadas (NumPy, scikit-learn). """
+        configuracao = RecursosCPU.configuracao()
+        if not configuracao["ativo"]:
+            return
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            return
+        with RecursosCPU.__lock:
+            # O limitador é mantido para que os limites continuem valendo
+            RecursosCPU.__limitador_blas = threadpool_limits(limits=configuracao["threads"])
+
+    @staticmethod
+    def configura_estimador(estimador):
+        """ Ajusta o n_jobs do estimador scikit-learn (ou do último passo de um Pipeline) à parcela do worker. """
+        configuracao = RecursosCPU.configuracao()
+        if not configuracao["ativo"]:
+            return estimador
+        final = estimador.steps[-1][1] if hasattr(estimador, "steps") else estimador
+        if hasattr(final, "n_jobs"):
+            final.n_jobs = configuracao["n_jobs"]
+        # O scikit-learn e o SciPy já estão carregados: os limites do BLAS passam a valer para eles
+        RecursosCPU.configura_blas()
+        return estimador
+
+    @staticmethod
+    def processos_spacy() -> int:
+        """ Processos usados pelo spaCy em listas grandes, sem passar da parcela do worker. """
+        configuracao = RecursosCPU.configuracao()
+        if not configuracao["ativo"]:
+            return int(os.environ.get("SPACY_N_PROCESS", 1))
+        return configuracao["processos_spacy"]
+
+    @staticmethod
+    def threads_por_processo(processos: int) -> int:
+        """ Threads de cada processo de um pool que divide a parcela de núcleos deste worker. """
+        return max(1, RecursosCPU.configuracao()["threads"] // max(1, processos))
+
+    @staticmethod
+    def inicia_processo(threads: int):
+        """ Inicializador dos processos de pools (jobs, ferramentas.pontuar): cada processo
+        recebe `threads` threads, e não a parcela inteira do worker que o criou.
+        """
+        os.environ["CPU_WORKERS"] = "1"
+        os.environ["CPU_THREADS_POR_WORKER"] = str(threads)
+        # O pool já paraleliza os blocos: o spaCy não abre processos dentro dos processos do pool
+        os.environ["SPACY_N_PROCESS"] = "1"
+        RecursosCPU.limpar()
+        RecursosCPU.aplica()
+
+    @staticmethod
+    def estatisticas() -> dict:
+        """ Configuração em uso e threads efetivas das bibliotecas carregadas neste worker. """
+        estatisticas = dict(RecursosCPU.configuracao())
+        if "torch" in sys.modules:
+            torch = sys.modules["torch"]
+            estatisticas["torch_threads"] = torch.get_num_threads()
+            estatisticas["torch_threads_interop"] = torch.get_num_interop_threads()
+        try:
+            from threadpoolctl import threadpool_info
+            estatisticas["blas"] = [{"biblioteca": info["internal_api"], "threads": info["num_threads"]} for info in threadpool_info()]
+        except ImportError:
+            pass
+        return estatisticas
+
+    @staticmethod
+    def limpar():
+        """ Descarta a configuração calculada, para que seja relida das variáveis de ambiente (útil em testes). """
+        RecursosCPU.__configuracao = None
@@ -0,0 +1,104 @@
+import base64
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, delete
+from sqlalchemy.dialects.sqlite import insert
+
+from model.review import Review
+
+
+class RepositorioReview:
+    """ Operações em lote sobre a tabela de reviews. """
+
+    # Linhas por comando da importação: cada linha usa 6 parâmetros, e o SQLite aceita até 32766 por comando
+    TAMANHO_BLOCO_IMPORTACAO = 1000
+
+    @staticmethod
+    def busca_textos_existentes(session, textos: list, modelo: str) -> set:
+        """ Retorna, com uma única consulta, quais dos textos já foram analisados pelo modelo. """
+        if not textos:
+            return set()
+        consulta = session.query(Review.texto).filter(Review.modelo == modelo, Review.texto.in_(set(textos)))
+        return {texto for (texto,) in consulta}
+
+    @staticmethod
+    def busca_sentimentos_existentes(session, textos: list, modelo: str) -> dict:
+        """ Retorna, com uma única consulta, o sentimento dos textos já analisados pelo modelo. """
+        if not textos:
+            return {}
+        consulta = session.query(Review.texto, Review.sentimento).filter(Review.modelo == modelo, Review.texto.in_(set(textos)))
+        return {texto: sentimento for texto, sentimento in consulta}
+
+    @staticmethod
+    def insere_lote(session, reviews: list):
+        """ Adiciona os reviews à sessão para serem inseridos em uma única transação. """
+        session.add_all(reviews)
+        session.flush()
+
+    @staticmethod
+    def remove_lote(session, uids: list = None, modelo: str = None, sentimento: int = None,
+                    inicio: datetime = None, fim: datetime = None) -> int:
+        """ Remove, com um único DELETE, os reviews da lista de uids que atendem aos filtros
+        informados (`inicio` e `fim` são dias inclusivos). Retorna a quantidade de reviews removidos.
+        Lança ValueError se nenhum critério for informado, para não apagar a tabela inteira.
+        """
+        filtros = []
+        if uids:
+            filtros.append(Review.uid.in_(set(uids)))
+        if modelo:
+            filtros.append(Review.modelo == modelo)
+        if sentimento is not None:
+            filtros.append(Review.sentimento == sentimento)
+        if inicio:
+            filtros.append(Review.data_criacao >= inicio)
+        if fim:
+            filtros.append(Review.data_criacao < fim + timedelta(days=1))
+        if not filtros:
+            raise ValueError("Nenhum critério de remoção informado")
+        return session.execute(delete(Review).where(*filtros), execution_options={"synchronize_session": False}).rowcount
+
+    @staticmethod
+    def importa_lote(session, rotulados: dict, modelo: str, data_criacao: datetime = None) -> dict:
+        """ Grava os reviews já rotulados ({texto: sentimento}) do modelo sem passar pela predição,
+        com um único INSERT ... ON CONFLICT(modelo, texto) DO UPDATE por bloco de linhas: os textos
+        que ainda não existem são inseridos e os existentes com outro sentimento são atualizados,
+        sem repetir textos mesmo com importações, requisições ou jobs simultâneos.
+        Retorna a quantidade de reviews inseridos, atualizados e inalterados.
+        """
+        tabela = Review.__table__
+        data_criacao = data_criacao or datetime.now()
+        linhas = [{"uid": str(uuid.uuid4()), "texto": texto, "sentimento": sentimento, "modelo": modelo,
+                   "data_criacao": data_criacao, "estagio": None} for texto, sentimento in rotulados.items()]
+
+        gravados = set()
+        for inicio in range(0, len(linhas), RepositorioReview.TAMANHO_BLOCO_IMPORTACAO):
+            comando = insert(tabela).values(linhas[inicio:inicio + RepositorioReview.TAMANHO_BLOCO_IMPORTACAO])
+            # O estágio só faz sentido para a predição da cascata, que o rótulo importado substitui
+            comando = comando.on_conflict_do_update(index_elements=[tabela.c.modelo, tabela.c.texto],
+                                                    set_={"sentimento": comando.excluded.sentimento, "estagio": None},
+                                                    where=tabela.c.sentimento != comando.excluded.sentimento)
+            # Retorna as linhas inseridas, com o uid gerado aqui, e as atualizadas, com o uid já gravado
+            gravados.update(session.execute(comando.returning(tabela.c.uid)).scalars())
+
+        inseridos = sum(1 for linha in linhas if linha["uid"] in gravados)
+        return {"inseridos": inseridos, "atualizados": len(gravados) - inseridos,
+                "inalterados": len(linhas) - len(gravados)}
+
+    @staticmethod
+    def codifica_cursor(review: Review) -> str:
+        """ Cursor opaco que aponta para a posição do review na ordenação (data_criacao, id). """
+        valor = f"{review.data_criacao.isoformat()}|{review.id}"
+        return base64.urlsafe_b64encode(valor.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def filtro_cursor(cursor: str):
+        """ Filtro dos reviews posteriores ao cursor na ordenação decrescente por (data_criacao, id).
+        Lança ValueError se o cursor for inválido.
+        """
+        try:
+            data_criacao, id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+            data_criacao, id = datetime.fromisoformat(data_criacao), int(id)
+        except Exception as e:
+            raise ValueError(f"Cursor inválido: {cursor}") from e
+        return or_(Review.data_criacao < data_criacao, and_(Review.data_criacao == data_criacao, Review.id < id))
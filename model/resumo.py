@@ -0,0 +1,104 @@
+from sqlalchemy import text
+
+
+class ResumoSentimentos:
+    """ Contagem de reviews por modelo, dia e sentimento, mantida na tabela reviews_resumo.
+
+    Triggers atualizam a contagem dentro da própria transação que insere, altera ou remove
+    reviews, de forma que todos os caminhos de escrita (POST /review, lote, jobs e remoção)
+    ficam consistentes sem mudanças no código que os executa. As consultas leem apenas o
+    resumo, cujo tamanho depende da quantidade de dias e modelos e não da quantidade de reviews.
+    """
+
+    # Expressão SQLite que agrupa os dias (AAAA-MM-DD) em cada granularidade
+    GRANULARIDADES = {
+        "dia": "dia",
+        "semana": "strftime('%Y-W%W', dia)",
+        "mes": "substr(dia, 1, 7)",
+        "ano": "substr(dia, 1, 4)",
+        "total": "'total'",
+    }
+
+    DDL = [
+        "CREATE TABLE IF NOT EXISTS reviews_resumo ("
+        "modelo VARCHAR NOT NULL, dia VARCHAR NOT NULL, sentimento INTEGER NOT NULL, total INTEGER NOT NULL, "
+        "PRIMARY KEY (modelo, dia, sentimento)) WITHOUT ROWID",
+        "CREATE TRIGGER IF NOT EXISTS reviews_resumo_ai AFTER INSERT ON reviews BEGIN "
+        "INSERT INTO reviews_resumo(modelo, dia, sentimento, total) "
+        "VALUES (new.modelo, date(new.data_criacao), new.sentimento, 1) "
+        "ON CONFLICT(modelo, dia, sentimento) DO UPDATE SET total = total + 1; END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_resumo_ad AFTER DELETE ON reviews BEGIN "
+        "UPDATE reviews_resumo SET total = total - 1 "
+        "WHERE modelo = old.modelo AND dia = date(old.data_criacao) AND sentimento = old.sentimento; "
+        "DELETE FROM reviews_resumo "
+        "WHERE modelo = old.modelo AND dia = date(old.data_criacao) AND sentimento = old.sentimento AND total <= 0; END",
+        "CREATE TRIGGER IF NOT EXISTS reviews_resumo_au AFTER UPDATE OF modelo, sentimento, data_criacao ON reviews BEGIN "
+        "UPDATE reviews_resumo SET total = total - 1 "
+        "WHERE modelo = old.modelo AND dia = date(old.data_criacao) AND sentimento = old.sentimento; "
+        "DELETE FROM reviews_resumo "
+        "WHERE modelo = old.modelo AND dia = date(old.data_criacao) AND sentimento = old.sentimento AND total <= 0; "
+        "INSERT INTO reviews_resumo(modelo, dia, sentimento, total) "
+        "VALUES (new.modelo, date(new.data_criacao), new.sentimento, 1) "
+        "ON CONFLICT(modelo, dia, sentimento) DO UPDATE SET total = total + 1; END",
+    ]
+
+    RECONSTRUCAO = [
+        "DELETE FROM reviews_resumo",
+        "INSERT INTO reviews_resumo(modelo, dia, sentimento, total) "
+        "SELECT modelo, date(data_criacao), sentimento, count(*) FROM reviews "
+        "GROUP BY modelo, date(data_criacao), sentimento",
+    ]
+
+    @staticmethod
+    def cria(engine):
+        """ Cria a tabela de resumo e os triggers, se ainda não existirem. Uma tabela recém-criada
+        é preenchida com os reviews já existentes.
+        """
+        with engine.begin() as conexao:
+            existia = conexao.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reviews_resumo'")
+            ).first() is not None
+            for comando in ResumoSentimentos.DDL:
+                conexao.execute(text(comando))
+            if not existia:
+                for comando in ResumoSentimentos.RECONSTRUCAO:
+                    conexao.execute(text(comando))
+
+    @staticmethod
+    def reconstroi(engine) -> int:
+        """ Recalcula o resumo a partir da tabela reviews. Retorna a quantidade de reviews contados. """
+        with engine.begin() as conexao:
+            for comando in ResumoSentimentos.DDL + ResumoSentimentos.RECONSTRUCAO:
+                conexao.execute(text(comando))
+            return conexao.execute(text("SELECT coalesce(sum(total), 0) FROM reviews_resumo")).scalar()
+
+    @staticmethod
+    def consulta(session, granularidade: str = "dia", modelo: str = None, inicio: str = None, fim: str = None) -> list:
+        """ Quantidade de reviews positivos e negativos por período e modelo, em ordem de período.
+        `inicio` e `fim` (AAAA-MM-DD, inclusivos) limitam os dias considerados.
+        Lança ValueError se a granularidade não for suportada.
+        """
+        if granularidade not in ResumoSentimentos.GRANULARIDADES:
+            raise ValueError(f"Granularidade não suportada: {granularidade}")
+
+        filtros, parametros = [], {}
+        if modelo:
+            filtros.append("modelo = :modelo")
+            parametros["modelo"] = modelo
+        if inicio:
+            filtros.append("dia >= :inicio")
+            parametros["inicio"] = inicio
+        if fim:
+            filtros.append("dia <= :fim")
+            parametros["fim"] = fim
+
+        periodo = ResumoSentimentos.GRANULARIDADES[granularidade]
+        consulta = (
+            f"SELECT {periodo} AS periodo, modelo, "
+            "sum(CASE WHEN sentimento = 1 THEN total ELSE 0 END) AS positivos, "
+            "sum(CASE WHEN sentimento = 0 THEN total ELSE 0 END) AS negativos, "
+            "sum(total) AS total FROM reviews_resumo "
+            + (f"WHERE {' AND '.join(filtros)} " if filtros else "")
+            + "GROUP BY periodo, modelo ORDER BY periodo, modelo"
+        )
+        return [dict(linha._mapping) for linha in session.execute(text(consulta), parametros)]
@@ -1,5 +1,5 @@
 from model.modelo import TipoModelo
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, Index
 from datetime import datetime
 import uuid
 
@@ -9,15 +9,26 @@ from  model import Base
 
 class Review(Base):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        Index('ix_reviews_uid', 'uid', unique=True),
+        # checagem de duplicados por modelo e texto, único para o INSERT ... ON CONFLICT da importação
+        Index('ix_reviews_modelo_texto', 'modelo', 'texto', unique=True),
+        # listagem ordenada por data, com ou sem filtro por sentimento ou modelo
+        Index('ix_reviews_data_criacao_id', 'data_criacao', 'id'),
+        Index('ix_reviews_sentimento_data_criacao_id', 'sentimento', 'data_criacao', 'id'),
+        Index('ix_reviews_modelo_data_criacao_id', 'modelo', 'data_criacao', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     uid = Column(String, nullable=False, default=lambda: str(uuid.uuid4()))
     texto = Column("texto", String(250), nullable=False)
     sentimento = Column("sentimento", Integer, nullable=False)
     modelo =  Column(String, nullable=False)
+    # Modelo que decidiu o sentimento na cascata (pipeline-et ou model-distilbert), vazio nos demais modelos
+    estagio = Column(String, nullable=True)
     data_criacao = Column(DateTime, default=datetime.now(), nullable=False)
     
-    def __init__(self, texto:str, sentimento:str, modelo:str, data_criacao:datetime = datetime.now()): 
+    def __init__(self, texto:str, sentimento:str, modelo:str, data_criacao:datetime = datetime.now(), estagio:str = None): 
         """
         Cria um Review
 
@@ -25,9 +36,11 @@ class Review(Base):
         texto: texto do review
         sentimento: emoção expressa no texto do review
         data_insercao: data de quando o review foi inserido à base
+        estagio: modelo que decidiu o sentimento, quando o modelo é a cascata
         """
         self.uid = str(uuid.uuid4())
         self.texto = texto
         self.sentimento = sentimento
         self.modelo = modelo
-        self.data_criacao = data_criacao
\ No newline at end of file
+        self.data_criacao = data_criacao
+        self.estagio = estagio
\ No newline at end of file
@@ -1,5 +1,11 @@
 from schemas.review_schema import ReviewSchema,  ReviewViewSchema, ReviewDelSchema, ListaReviewsSchema, BuscaReviewSchema, \
+                                    ReviewLoteSchema, ResultadoLoteSchema, ListaResultadoLoteSchema, \
+                                    BuscaResumoSchema, PeriodoResumoSchema, ResumoSchema, \
+                                    ReviewRemocaoLoteSchema, ResultadoRemocaoLoteSchema, ReviewRotuladoSchema, \
+                                    ReviewImportacaoSchema, ResultadoImportacaoSchema, \
                                     apresenta_review, apresenta_reviews
                                         
 from schemas.error_schema import ErrorSchema
+from schemas.estatisticas_schema import EstatisticasSchema
+from schemas.job_schema import JobSchema, JobArquivoSchema, JobBuscaSchema, JobViewSchema, apresenta_job
                                     
\ No newline at end of file
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class EstatisticasSchema(BaseModel):
+    """ Define como as estatísticas de carga dos modelos do worker serão representadas
+    """
+    modelos: Dict[str, dict] = {}
+    preprocessadores: Dict[str, dict] = {}
+    agendadores: Dict[str, dict] = {}
+    cache: Dict[str, float] = {}
+    tokenizacao: Optional[dict] = None
+    cpu: Optional[dict] = None
+    inferencia: Optional[dict] = None
+    cache_respostas: Dict[str, float] = {}
@@ -0,0 +1,55 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from flask_openapi3 import FileStorage
+from model.job import Job
+
+class JobSchema(BaseModel):
+    """ Define como um job de análise de uma lista de textos deve ser representado
+    """
+    modelo: str = None
+    textos: List[str] = []
+
+class JobArquivoSchema(BaseModel):
+    """ Define como um job de análise de um arquivo CSV deve ser representado
+    """
+    modelo: str = None
+    coluna: str = "content"
+    arquivo: FileStorage
+
+class JobBuscaSchema(BaseModel):
+    """ Define como deve ser a estrutura que representa a busca de um job, feita pelo ID
+    """
+    id: str = "c303282d-f2e6-46ca-a04a-35d3d873712d"
+
+class JobViewSchema(BaseModel):
+    """ Define como o estado de um job será retornado
+    """
+    id: str = "c303282d-f2e6-46ca-a04a-35d3d873712d"
+    modelo: str = "pipeline-et"
+    status: str = Job.EXECUTANDO
+    total: int = 10000
+    processados: int = 2500
+    inseridos: int = 2300
+    existentes: int = 200
+    textos_por_segundo: float = 850.0
+    eta_segundos: Optional[float] = 8.8
+    erro: Optional[str] = None
+
+
+def apresenta_job(job: Job):
+    """ Retorna uma representação do job seguindo o schema definido em
+        JobViewSchema.
+    """
+    eta = job.eta_segundos()
+    return {
+        "id": job.uid,
+        "modelo": job.modelo,
+        "status": job.status,
+        "total": job.total,
+        "processados": job.processados,
+        "inseridos": job.inseridos,
+        "existentes": job.existentes,
+        "textos_por_segundo": round(job.textos_por_segundo(), 2),
+        "eta_segundos": round(eta, 1) if eta is not None else None,
+        "erro": job.erro,
+    }
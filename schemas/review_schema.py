@@ -8,18 +8,37 @@ class ReviewSchema(BaseModel):
     modelo: str = None
     texto: str = None
     
+class ReviewLoteSchema(BaseModel):
+    """ Define como um lote de reviews a serem analisados pelo mesmo modelo deve ser representado
+    """
+    modelo: str = None
+    textos: List[str] = []
+
 class ReviewViewSchema(BaseModel):
     """Define como um review será retornado
     """
     id: str = "c303282d-f2e6-46ca-a04a-35d3d873712d"
     texto: str = "Excelente app! A entrega foi super rápida, e a comida chegou quentinha. Adorei a variedade de restaurantes disponíveis. Super recomendo para quem gosta de praticidade!"
     sentimento: int = 1
+    estagio: Optional[str] = None
     
 class ListaReviewsSchema(BaseModel):
     """Define como uma lista de reviews será representada
     """
     reviews: List[ReviewViewSchema]
 
+class ResultadoLoteSchema(BaseModel):
+    """Define como o resultado de cada texto de um lote será representado
+    """
+    indice: int = 0
+    review: Optional[ReviewViewSchema] = None
+    error: Optional[str] = None
+
+class ListaResultadoLoteSchema(BaseModel):
+    """Define como o resultado da análise de um lote será representado
+    """
+    resultados: List[ResultadoLoteSchema]
+
 class BuscaReviewSchema(BaseModel):
     """ Define como representação dos parametros de busca do Review
     """
@@ -27,11 +46,73 @@ class BuscaReviewSchema(BaseModel):
     texto: Optional[str] = None
     sentimento: Optional[int] = None
     modelo: Optional[str] = None
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    stream: Optional[bool] = False
     
+class BuscaResumoSchema(BaseModel):
+    """ Define como representação dos parametros de consulta do resumo de sentimentos
+    """
+    granularidade: str = "dia"
+    modelo: Optional[str] = None
+    inicio: Optional[str] = None
+    fim: Optional[str] = None
+
+class PeriodoResumoSchema(BaseModel):
+    """Define como a contagem de reviews de um período e modelo será representada
+    """
+    periodo: str = "2024-06-01"
+    modelo: str = "pipeline-et"
+    positivos: int = 0
+    negativos: int = 0
+    total: int = 0
+
+class ResumoSchema(BaseModel):
+    """Define como o resumo de sentimentos será representado
+    """
+    granularidade: str = "dia"
+    periodos: List[PeriodoResumoSchema]
+
 class ReviewDelSchema(BaseModel):
     """Define como um review para deleção será representado
     """
     id:str = None
+
+class ReviewRemocaoLoteSchema(BaseModel):
+    """Define como os reviews a serem removidos em lote serão selecionados: pela lista de ids
+    ou pelos filtros (modelo, sentimento e dias de criação, AAAA-MM-DD, inclusivos)
+    """
+    ids: List[str] = []
+    modelo: Optional[str] = None
+    sentimento: Optional[int] = None
+    inicio: Optional[str] = None
+    fim: Optional[str] = None
+
+class ResultadoRemocaoLoteSchema(BaseModel):
+    """Define como o resultado de uma remoção em lote será representado
+    """
+    removidos: int = 0
+    duracao_ms: float = 0.0
+
+class ReviewRotuladoSchema(BaseModel):
+    """Define como um review com o sentimento já conhecido será representado
+    """
+    texto: str = None
+    sentimento: int = None
+
+class ReviewImportacaoSchema(BaseModel):
+    """Define como um lote de reviews já rotulados pelo mesmo modelo deve ser representado
+    """
+    modelo: str = None
+    reviews: List[ReviewRotuladoSchema] = []
+
+class ResultadoImportacaoSchema(BaseModel):
+    """Define como o resultado de uma importação em lote será representado
+    """
+    inseridos: int = 0
+    atualizados: int = 0
+    inalterados: int = 0
+    duracao_ms: float = 0.0
     
 # Apresenta apenas os dados de um paciente    
 def apresenta_review(review: Review):
@@ -43,6 +124,7 @@ def apresenta_review(review: Review):
         "texto": review.texto,
         "sentimento": review.sentimento,
         "modelo": review.modelo,  
+        "estagio": review.estagio,
         "data_criacao": review.data_criacao.strftime("%d/%m/%Y %H:%M:%S")    
     }
     
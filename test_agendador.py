@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from model.agendador import AgendadorLotes
+
+
+# To run: pytest -v test_agendador.py
+
+def analisa_concorrente(agendador: AgendadorLotes, chamadas: list) -> list:
+    """ Envia cada lista de textos ao agendador em uma thread própria e retorna o resultado de cada uma. """
+    resultados = [None] * len(chamadas)
+
+    def chama(indice, textos):
+        try:
+            resultados[indice] = agendador.analisar(textos)
+        except Exception as e:
+            resultados[indice] = e
+
+    linhas = [threading.Thread(target=chama, args=(indice, textos)) for indice, textos in enumerate(chamadas)]
+    for linha in linhas:
+        linha.start()
+    for linha in linhas:
+        linha.join(timeout=10)
+    return resultados
+
+
+# Método para testar se chamadas concorrentes são agrupadas em um lote e cada uma recebe apenas as suas predições
+def test_agendador_agrupa_chamadas():
+    lotes = []
+    agendador = AgendadorLotes(lambda textos: lotes.append(list(textos)) or [texto.upper() for texto in textos],
+                               tamanho_maximo_lote=8, espera_maxima_ms=500)
+
+    chamadas = [[f"a{indice}", f"b{indice}"] for indice in range(4)]
+    resultados = analisa_concorrente(agendador, chamadas)
+
+    assert resultados == [[texto.upper() for texto in textos] for textos in chamadas]
+    assert len(lotes) == 1 and sorted(lotes[0]) == sorted(texto for textos in chamadas for texto in textos)
+    estatisticas = agendador.estatisticas()
+    assert estatisticas["lotes_processados"] == 1
+    assert estatisticas["tamanhos_lote"] == {"8": 1}
+    assert estatisticas["profundidade_fila"] == 0
+
+
+# Método para testar se o lote é fechado no tamanho máximo e os textos seguintes vão para os próximos lotes
+def test_agendador_tamanho_maximo():
+    lotes = []
+    agendador = AgendadorLotes(lambda textos: lotes.append(len(textos)) or list(textos), tamanho_maximo_lote=3,
+                               espera_maxima_ms=50)
+
+    textos = [str(indice) for indice in range(7)]
+    assert agendador.analisar(textos) == textos
+    assert lotes == [3, 3, 1]
+
+
+# Método para testar se um texto sozinho é processado após a espera máxima, sem aguardar o lote encher
+def test_agendador_espera_maxima():
+    agendador = AgendadorLotes(lambda textos: [len(texto) for texto in textos], tamanho_maximo_lote=64,
+                               espera_maxima_ms=20)
+
+    inicio = time.perf_counter()
+    assert agendador.analisar(["abc"]) == [3]
+    assert time.perf_counter() - inicio < 1.0
+    assert agendador.estatisticas()["tamanhos_lote"] == {"1": 1}
+
+
+# Método para testar se o erro da predição chega a todos os chamadores do lote e o agendador continua atendendo
+def test_agendador_repassa_excecoes():
+    def processar(textos):
+        if any("erro" in texto for texto in textos):
+            raise RuntimeError("falha no modelo")
+        if any("incompleto" in texto for texto in textos):
+            return textos[:-1]
+        return list(textos)
+
+    agendador = AgendadorLotes(processar, tamanho_maximo_lote=8, espera_maxima_ms=500)
+
+    resultados = analisa_concorrente(agendador, [["ok 1"], ["erro"], ["ok 2", "ok 3"]])
+    assert all(isinstance(resultado, RuntimeError) for resultado in resultados)
+
+    # Menos predições que textos também é repassado como erro, sem deixar chamadores aguardando
+    with pytest.raises(ValueError):
+        agendador.analisar(["incompleto", "ok"])
+
+    assert agendador.analisar(["ok"]) == ["ok"]
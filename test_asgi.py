@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+from model import Analisador, ExecutorInferencia, TipoModelo
+
+
+# To run: pytest -v test_asgi.py
+
+MODELO = TipoModelo.PIPELINE_SCIKIT_LEARN
+
+
+@pytest.fixture
+def cliente_asgi(monkeypatch):
+    """ Test client do modo ASGI, com a base temporária e uma predição fixa no lugar do modelo.
+    Sem o bloco `with`, o ciclo de vida não é executado e o executor do módulo não é encerrado.
+    """
+    def analisar_com_estagio(textos, tipo_modelo):
+        return [1] * len(textos), [None] * len(textos)
+
+    monkeypatch.setattr(Analisador, "analisar_com_estagio", staticmethod(analisar_com_estagio))
+    return TestClient(asgi.app)
+
+
+# Método para testar a inclusão de um review pelo modo ASGI e a sua busca por GET /review
+def test_asgi_review(cliente_asgi):
+    texto = f"app bom {uuid.uuid4().hex}"
+    resposta = cliente_asgi.post("/review", data={"texto": texto, "modelo": MODELO})
+    assert resposta.status_code == 200
+    review = resposta.json()
+    assert (review["texto"], review["sentimento"], review["modelo"]) == (texto, 1, MODELO)
+    assert resposta.headers["X-Request-ID"]
+
+    assert cliente_asgi.post("/review", data={"texto": texto, "modelo": MODELO}).json() == \
+        {"error": "Review já existente na base :/"}
+    assert cliente_asgi.post("/review", data={"texto": texto, "modelo": "inexistente"}).json() == \
+        {"error": "Tipo de modelo não suportado"}
+
+    busca = {"texto": texto, "modelo": MODELO}
+    resposta = cliente_asgi.get("/review", params=busca)
+    assert resposta.status_code == 200
+    assert [encontrado["id"] for encontrado in resposta.json()] == [review["id"]]
+    # A mesma consulta, sem alterações na base, é validada pelo ETag
+    assert cliente_asgi.get("/review", params=busca,
+                            headers={"If-None-Match": resposta.headers["ETag"]}).status_code == 304
+
+
+# Método para testar a inclusão em lote pelo modo ASGI, com os erros de cada posição
+def test_asgi_review_lote(cliente_asgi):
+    textos = [f"app {indice} {uuid.uuid4().hex}" for indice in range(2)]
+    resposta = cliente_asgi.post("/review/batch", json={"modelo": MODELO, "textos": textos + ["", textos[0]]})
+    assert resposta.status_code == 200
+    resultados = resposta.json()["resultados"]
+    assert [resultado["review"]["texto"] for resultado in resultados[:2]] == textos
+    assert resultados[2:] == [{"indice": 2, "error": "Texto do review não informado"},
+                              {"indice": 3, "error": "Review repetido no lote"}]
+
+    resultados = cliente_asgi.post("/review/batch", json={"modelo": MODELO, "textos": textos[:1]}).json()["resultados"]
+    assert resultados == [{"indice": 0, "error": "Review já existente na base :/"}]
+
+
+# Método para testar se corpos inválidos, ausentes ou malformados são recusados com 422, como no app Flask
+def test_asgi_validacao(cliente_asgi, cliente):
+    assert cliente_asgi.post("/review/batch", json={"modelo": MODELO, "textos": "app bom"}).status_code == 422
+    assert cliente_asgi.get("/review", params={"limit": "muitos"}).status_code == 422
+
+    for corpo in [{"content": "{malformado", "headers": {"Content-Type": "application/json"}}, {}, {"content": b"\xff"}]:
+        resposta = cliente_asgi.post("/review/batch", **corpo)
+        assert resposta.status_code == 422
+        esperada = cliente.post("/review/batch", data=corpo.get("content"), headers=corpo.get("headers"))
+        assert esperada.status_code == 422
+        assert [erro["type"] for erro in resposta.json()] == [erro["type"] for erro in esperada.get_json()]
+
+
+# Método para testar se, com o executor de inferência cheio, a requisição é recusada com 503 e Retry-After
+def test_asgi_saturado(cliente_asgi, monkeypatch):
+    executor = ExecutorInferencia(threads=1, fila_maxima=0)
+    monkeypatch.setattr(asgi, "executor_inferencia", executor)
+    liberado = threading.Event()
+    ocupante = threading.Thread(target=asyncio.run, args=(executor.executa(liberado.wait, 5),))
+    ocupante.start()
+    try:
+        while executor.estatisticas()["em_andamento"] < 1:
+            time.sleep(0.01)
+
+        resposta = cliente_asgi.post("/review", data={"texto": f"app bom {uuid.uuid4().hex}", "modelo": MODELO})
+        assert resposta.status_code == 503
+        assert resposta.headers["Retry-After"] == str(asgi.ESPERA_SATURADO)
+        assert resposta.json() == {"error": "Servidor ocupado, tente novamente em instantes"}
+        resposta = cliente_asgi.post("/review/batch", json={"modelo": MODELO, "textos": [f"app bom {uuid.uuid4().hex}"]})
+        assert resposta.status_code == 503
+    finally:
+        liberado.set()
+        ocupante.join()
+        executor.encerra()
+
+    assert executor.estatisticas()["recusadas"] == 2
@@ -0,0 +1,38 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.base import Base
+from model.busca import IndiceTextual
+from model.review import Review
+
+
+# To run: pytest -v test_busca.py
+
+# Método para testar a caixa e os acentos na busca pelo índice trigram e pelo ILIKE
+def test_busca_textual_maiusculas_acentuadas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    assert IndiceTextual.cria(engine)
+    session = sessionmaker(bind=engine)()
+
+    textos = ["Ótimo aplicativo", "entrega ótima", "OTIMO", "app otimo", "ÁGIL no pedido", "nada a declarar"]
+    session.add_all([Review(texto=texto, sentimento=1, modelo="pipeline-et") for texto in textos])
+    session.commit()
+
+    def encontrados(filtro) -> set:
+        return {texto for (texto,) in session.query(Review.texto).filter(filtro)}
+
+    # Índice: ignora a caixa de qualquer letra, mas não os acentos
+    assert encontrados(IndiceTextual.filtro("ÓTIM")) == {"Ótimo aplicativo", "entrega ótima"}
+    assert encontrados(IndiceTextual.filtro("ótim")) == {"Ótimo aplicativo", "entrega ótima"}
+    assert encontrados(IndiceTextual.filtro("Otimo")) == {"OTIMO", "app otimo"}
+    assert encontrados(IndiceTextual.filtro("ágil")) == {"ÁGIL no pedido"}
+
+    # ILIKE: ignora apenas a caixa das letras ASCII
+    assert encontrados(Review.texto.ilike("%ÓTIM%")) == {"Ótimo aplicativo"}
+    assert encontrados(Review.texto.ilike("%ótim%")) == {"entrega ótima"}
+    assert encontrados(Review.texto.ilike("%Otimo%")) == {"OTIMO", "app otimo"}
+
+    # Trechos curtos usam o ILIKE
+    assert encontrados(IndiceTextual.filtro("Ót")) == {"Ótimo aplicativo"}
+    session.close()
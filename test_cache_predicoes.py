@@ -0,0 +1,102 @@
+import os
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.analisador import Analisador
+from model.base import Base
+from model.cache import CachePredicoes
+from model.migracao import Migracao
+from model.modelo import ModelFactory, TipoModelo
+from model.predicao import PredicaoCache
+from model.preprocessador import PreProcessadorFactory
+
+
+# To run: pytest -v test_cache_predicoes.py
+
+# Método para testar se artefatos substituídos ou configurações diferentes invalidam as predições guardadas
+def test_cache_predicoes_versao(tmp_path, monkeypatch):
+    artefato = tmp_path / "modelo.pkl"
+    artefato.write_bytes(b"modelo v1")
+    monkeypatch.setattr(ModelFactory, "artefatos", staticmethod(lambda tipo_modelo: [str(artefato)]))
+    monkeypatch.setattr(PreProcessadorFactory, "artefatos", staticmethod(lambda tipo_modelo: [str(tmp_path / "ausente.pkl")]))
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    modelo = f"modelo-{uuid.uuid4().hex}"
+    versao = CachePredicoes.versao(modelo)
+    assert CachePredicoes.versao(modelo) == versao
+    assert CachePredicoes.versao(modelo, limiar=0.8) != versao
+
+    chave = CachePredicoes.chave("app muito bom")
+    CachePredicoes.grava(session, {chave: (1, None)}, modelo, versao)
+    session.commit()
+    assert CachePredicoes.busca(session, [chave], modelo, versao) == {chave: (1, None)}
+
+    # Novo artefato, visto por um novo processo (as versões calculadas são guardadas por processo)
+    artefato.write_bytes(b"modelo v2, substituido")
+    os.utime(artefato, ns=(0, 0))
+    monkeypatch.setattr(CachePredicoes, "_CachePredicoes__versoes", {})
+    nova = CachePredicoes.versao(modelo)
+    assert nova != versao
+    assert CachePredicoes.busca(session, [chave], modelo, nova) == {}
+
+    CachePredicoes.grava(session, {chave: (0, None)}, modelo, nova)
+    session.commit()
+    assert CachePredicoes.busca(session, [chave], modelo, nova) == {chave: (0, None)}
+    assert session.query(PredicaoCache).filter(PredicaoCache.modelo == modelo).count() == 1
+    session.close()
+
+
+# Método para testar se, na cascata, a troca do limiar invalida as predições guardadas com o limiar anterior
+def test_cache_predicoes_limiar_cascata(tmp_path, monkeypatch):
+    chamadas = []
+
+    def analisar_com_estagio(textos, tipo_modelo):
+        chamadas.append(list(textos))
+        estagio = TipoModelo.MODEL_TRANSFORMERS if Analisador.LIMIAR_CASCATA > 0.9 else TipoModelo.PIPELINE_SCIKIT_LEARN
+        return [1] * len(textos), [estagio] * len(textos)
+
+    monkeypatch.setattr(Analisador, "analisar_com_estagio", staticmethod(analisar_com_estagio))
+    monkeypatch.setattr(Analisador, "LIMIAR_CASCATA", 0.8)
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    textos = [f"app bom {uuid.uuid4().hex}"]
+    assert Analisador.analisar_com_cache(session, textos, TipoModelo.CASCATA) == [(1, TipoModelo.PIPELINE_SCIKIT_LEARN)]
+    assert Analisador.analisar_com_cache(session, textos, TipoModelo.CASCATA) == [(1, TipoModelo.PIPELINE_SCIKIT_LEARN)]
+    assert len(chamadas) == 1
+
+    monkeypatch.setattr(Analisador, "LIMIAR_CASCATA", 0.95)
+    assert Analisador.versao_cache(TipoModelo.CASCATA) != CachePredicoes.versao(TipoModelo.CASCATA, limiar=0.8)
+    assert Analisador.analisar_com_cache(session, textos, TipoModelo.CASCATA) == [(1, TipoModelo.MODEL_TRANSFORMERS)]
+    assert len(chamadas) == 2
+    session.close()
+
+
+# Método para testar se a tabela é podada, das predições mais antigas, ao passar do limite de linhas
+def test_cache_predicoes_poda(tmp_path, monkeypatch):
+    monkeypatch.setattr(CachePredicoes, "maximo_banco", 50)
+    monkeypatch.setattr(CachePredicoes, "INTERVALO_PODA", 30)
+    monkeypatch.setattr(CachePredicoes, "_CachePredicoes__gravadas", 0)
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    Migracao.aplica(engine)
+    session = sessionmaker(bind=engine)()
+
+    modelo = f"modelo-{uuid.uuid4().hex}"
+    lotes = [{CachePredicoes.chave(f"texto {lote} {indice}"): (indice % 2, None) for indice in range(20)} for lote in range(4)]
+    for lote in lotes:
+        CachePredicoes.grava(session, lote, modelo, "v1")
+        session.commit()
+
+    # Verificações após 40 gravações (40 linhas, abaixo do limite) e 80 (as 30 mais antigas são removidas)
+    assert session.query(PredicaoCache).count() == 50
+    restantes = {chave for (chave,) in session.query(PredicaoCache.hash)}
+    assert not restantes & set(lotes[0])
+    assert set(lotes[2]) | set(lotes[3]) <= restantes
+    assert CachePredicoes.estatisticas()["podadas"] >= 30
+    session.close()
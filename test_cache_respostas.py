@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.base import Base
+from model.cache_respostas import CacheRespostas
+from model.repositorio import RepositorioReview
+from model.review import Review
+
+
+# To run: pytest -v test_cache_respostas.py
+
+# Método para testar se toda escrita em reviews invalida as respostas guardadas e o ETag
+def test_cache_respostas_invalidado_por_escritas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    CacheRespostas.cria(engine)
+    session = sessionmaker(bind=engine)()
+
+    chave = CacheRespostas.chave({"modelo": "pipeline-et", "limit": 10, "stream": False})
+    assert chave == CacheRespostas.chave({"limit": 10, "modelo": "pipeline-et"})
+
+    versoes = [CacheRespostas.versao(session)]
+    CacheRespostas.grava(chave, versoes[0], b"[]", {})
+    assert CacheRespostas.busca(chave, versoes[0]) == (b"[]", {})
+    assert CacheRespostas.nao_modificado(f'W/{CacheRespostas.etag(chave, versoes[0])}', CacheRespostas.etag(chave, versoes[0]))
+
+    # Inserção, importação com atualização, remoção de um review e remoção em lote
+    session.add(Review(texto="review", sentimento=1, modelo="pipeline-et"))
+    session.commit()
+    versoes.append(CacheRespostas.versao(session))
+    RepositorioReview.importa_lote(session, {"review": 0, "outro": 1}, "pipeline-et")
+    session.commit()
+    versoes.append(CacheRespostas.versao(session))
+    session.delete(session.query(Review).filter(Review.texto == "review").one())
+    session.commit()
+    versoes.append(CacheRespostas.versao(session))
+    RepositorioReview.remove_lote(session, modelo="pipeline-et")
+    session.commit()
+    versoes.append(CacheRespostas.versao(session))
+
+    assert len(set(versoes)) == len(versoes)
+    assert CacheRespostas.busca(chave, versoes[-1]) is None
+    assert not CacheRespostas.nao_modificado(CacheRespostas.etag(chave, versoes[0]), CacheRespostas.etag(chave, versoes[-1]))
+    session.close()
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from model import Carregador
+
+
+# To run: pytest -v test_carregador.py
+
+def grava_reviews(caminho) -> str:
+    """ CSV rotulado com todos os scores, de 1 a 5, reviews sem score e colunas não usadas. """
+    linhas = []
+    for indice in range(30):
+        score = "" if indice % 7 == 6 else str(indice % 5 + 1)
+        linhas.append(f"{indice},app {indice},{score},usuario {indice}")
+    caminho.write_text("reviewId,content,score,userName\n" + "\n".join(linhas) + "\n", encoding="utf-8")
+    return str(caminho)
+
+
+# Método para testar o mapeamento dos scores em sentimentos, sem os neutros e os sem score
+def test_carregar_dados_sentimentos(tmp_path):
+    url = grava_reviews(tmp_path / "reviews.csv")
+    original = pd.read_csv(url)
+    dados = Carregador.carregar_dados(url)
+
+    assert list(dados.columns) == ["content", "sentiment"]
+    scores = original.loc[dados.index, "score"]
+    assert scores.notna().all() and (scores != 3).all()
+    assert (dados["sentiment"] == (scores > 3).astype(int)).all()
+    # Apenas os scores 3 e ausentes ficam de fora
+    descartados = original.drop(index=dados.index)["score"]
+    assert (descartados.isna() | (descartados == 3)).all()
+    assert len(descartados) == original["score"].isna().sum() + (original["score"] == 3).sum()
+
+
+# Método para testar se a carga em blocos gera os mesmos dados da carga completa
+def test_carregar_em_lotes(tmp_path):
+    url = grava_reviews(tmp_path / "reviews.csv")
+    dados = Carregador.carregar_dados(url)
+    lotes = list(Carregador.carregar_em_lotes(url, tamanho_lote=8))
+
+    assert len(lotes) > 1
+    assert pd.concat(lotes).equals(dados)
+
+
+# Método para testar a carga em blocos de arquivos sem score, com os textos ausentes trocados por vazio
+def test_carregar_em_lotes_sem_rotulo(tmp_path):
+    caminho = tmp_path / "textos.csv"
+    caminho.write_text("texto\napp bom\n\"\"\napp ruim\n", encoding="utf-8")
+    lotes = list(Carregador.carregar_em_lotes(str(caminho), tamanho_lote=2, coluna="texto", rotulado=False))
+
+    assert pd.concat(lotes)["texto"].tolist() == ["app bom", "", "app ruim"]
@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+import pytest
+
+from model.executor_inferencia import ExecutorInferencia, InferenciaSaturada
+
+
+# To run: pytest -v test_executor_inferencia.py
+
+# Método para testar se o executor do modo ASGI recusa chamadas além da capacidade sem bloquear o loop
+def test_executor_inferencia_saturado():
+    executor = ExecutorInferencia(threads=1, fila_maxima=1)
+    liberado = threading.Event()
+
+    async def executa():
+        ocupadas = [asyncio.ensure_future(executor.executa(liberado.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(InferenciaSaturada):
+            await executor.executa(sum, [1, 2])
+        liberado.set()
+        assert await asyncio.gather(*ocupadas) == [True, True]
+        return await executor.executa(sum, [1, 2])
+
+    assert asyncio.run(executa()) == 3
+    estatisticas = executor.estatisticas()
+    assert estatisticas["recusadas"] == 1
+    assert estatisticas["executadas"] == 3
+    assert estatisticas["em_andamento"] == 0
+    executor.encerra()
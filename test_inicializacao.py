@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+
+# To run: pytest -v test_inicializacao.py
+
+# Parâmetros
+# Tempo máximo, em segundos, para importar a aplicação sem aquecer modelos
+TEMPO_MAXIMO_IMPORTACAO = float(os.environ.get("TEMPO_INICIALIZACAO_MAXIMO_S", 3.0))
+# Dependências que só devem ser importadas no primeiro uso do seu TipoModelo
+MODULOS_PESADOS = ["torch", "transformers", "spacy", "sklearn", "pandas", "joblib"]
+
+
+def importa_app(*argumentos) -> subprocess.CompletedProcess:
+    """ Importa a aplicação em um novo interpretador, sem aquecer modelos. """
+    ambiente = dict(os.environ, AQUECER_MODELOS="")
+    codigo = f"import sys, json, app; print(json.dumps([m for m in {MODULOS_PESADOS!r} if m in sys.modules]))"
+    return subprocess.run([sys.executable, *argumentos, "-c", codigo], capture_output=True, text=True,
+                          env=ambiente, check=True)
+
+
+# Método para testar se a importação da aplicação não carrega as dependências dos modelos
+def test_importacao_sem_dependencias_pesadas():
+    carregados = json.loads(importa_app().stdout.strip().splitlines()[-1])
+
+    assert carregados == [], f"Módulos importados na inicialização: {carregados}"
+
+
+# Método para testar o tempo de importação da aplicação, medido com -X importtime
+def test_tempo_importacao():
+    saida = importa_app("-X", "importtime").stderr
+
+    # Formato: "import time: <próprio us> | <acumulado us> | <módulo>"
+    acumulados = {}
+    for linha in saida.splitlines():
+        if linha.startswith("import time:") and "|" in linha:
+            _, acumulado, modulo = linha.split("|")
+            if acumulado.strip().isdigit():
+                acumulados[modulo.strip()] = int(acumulado) / 1e6
+
+    maiores = sorted(acumulados.items(), key=lambda item: item[1], reverse=True)[:10]
+    print("Importações mais lentas (s):", ", ".join(f"{modulo} {tempo:.3f}" for modulo, tempo in maiores))
+
+    assert acumulados["app"] <= TEMPO_MAXIMO_IMPORTACAO, \
+        f"Importação da aplicação em {acumulados['app']:.2f}s, acima de {TEMPO_MAXIMO_IMPORTACAO}s"
@@ -0,0 +1,206 @@
+import csv
+import io
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import app as aplicacao
+from model import Analisador, Review, Session, TipoModelo
+from model.job import Job
+
+
+# To run: pytest -v test_jobs.py
+
+@pytest.fixture
+def executor(monkeypatch):
+    """ Executor de jobs da aplicação com um pool de threads no lugar do pool de processos (os
+    processos criados com spawn não veriam a predição substituída), blocos de 2 textos e a
+    predição por regra fixa: sentimento 1 para textos com "bom".
+    """
+    def analisar_com_estagio(textos, tipo_modelo):
+        return np.array([int("bom" in texto) for texto in textos]), [None] * len(textos)
+
+    monkeypatch.setattr(Analisador, "analisar_com_estagio", staticmethod(analisar_com_estagio))
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(aplicacao.executor_jobs, "_ExecutorJobs__obtem_pool", lambda: pool)
+    monkeypatch.setattr(aplicacao.executor_jobs, "tamanho_bloco", 2)
+    yield aplicacao.executor_jobs
+    pool.shutdown()
+
+
+def aguarda_job(cliente, uid: str, limite: float = 10) -> dict:
+    """ Consulta o job até que deixe de estar pendente ou em execução. """
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        job = cliente.get(f"/job?id={uid}").get_json()
+        if job["status"] not in (Job.PENDENTE, Job.EXECUTANDO):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"O job {uid} não terminou em {limite}s")
+
+
+def resultado_job(cliente, uid: str) -> list:
+    resposta = cliente.get(f"/job/resultado?id={uid}")
+    assert resposta.mimetype == "text/csv"
+    return list(csv.DictReader(io.StringIO(resposta.get_data(as_text=True))))
+
+
+def grava_job(**colunas) -> str:
+    """ Grava diretamente na base um job em execução, como se conduzido por outro processo. """
+    session = Session()
+    try:
+        job = Job(modelo=TipoModelo.PIPELINE_SCIKIT_LEARN, total=10)
+        job.status = Job.EXECUTANDO
+        job.data_inicio = datetime.now()
+        for coluna, valor in colunas.items():
+            setattr(job, coluna, valor)
+        session.add(job)
+        session.commit()
+        return job.uid
+    finally:
+        session.close()
+
+
+# Método para testar a criação de um job de textos, o progresso, o status e o arquivo de resultado
+def test_job_textos(cliente, executor):
+    sufixo = uuid.uuid4().hex
+    existente = f"app bom já gravado {sufixo}"
+    cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": [existente]})
+
+    textos = [f"app bom {sufixo}", "", f"app ruim {sufixo}", existente, f"app bom {sufixo}"]
+    resposta = cliente.post("/job", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": textos})
+    criado = resposta.get_json()
+    assert criado["status"] == Job.PENDENTE and criado["total"] == len(textos)
+
+    job = aguarda_job(cliente, criado["id"])
+    assert job["status"] == Job.CONCLUIDO and job["erro"] is None
+    assert job["processados"] == len(textos)
+    assert job["inseridos"] == 2
+    # O texto repetido no job é gravado pelo primeiro bloco e encontrado pelo terceiro
+    assert job["existentes"] == 2
+
+    linhas = resultado_job(cliente, criado["id"])
+    assert [linha["texto"] for linha in linhas] == textos
+    assert [linha["situacao"] for linha in linhas] == ["novo", "vazio", "novo", "existente", "existente"]
+    assert [linha["sentimento"] for linha in linhas] == ["1", "", "0", "1", "1"]
+    # O arquivo de entrada é removido ao final do job
+    assert not os.path.exists(os.path.join(executor.diretorio, f"{criado['id']}.entrada.csv"))
+
+
+# Método para testar a criação de um job a partir de um arquivo CSV, com a coluna informada
+def test_job_arquivo(cliente, executor):
+    sufixo = uuid.uuid4().hex
+    arquivo = f"id,texto\n1,bom {sufixo}\n2,ruim {sufixo}\n3,\"bom, muito bom {sufixo}\"\n".encode("utf-8")
+
+    resposta = cliente.post("/job/arquivo", data={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "coluna": "texto",
+                                                  "arquivo": (io.BytesIO(arquivo), "reviews.csv")},
+                            content_type="multipart/form-data")
+    criado = resposta.get_json()
+    assert criado["total"] == 3
+
+    job = aguarda_job(cliente, criado["id"])
+    assert job["status"] == Job.CONCLUIDO and job["inseridos"] == 3
+    assert [(linha["texto"], linha["sentimento"]) for linha in resultado_job(cliente, criado["id"])] == \
+        [(f"bom {sufixo}", "1"), (f"ruim {sufixo}", "0"), (f"bom, muito bom {sufixo}", "1")]
+
+    resposta = cliente.post("/job/arquivo", data={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "coluna": "content",
+                                                  "arquivo": (io.BytesIO(arquivo), "reviews.csv")},
+                            content_type="multipart/form-data")
+    assert resposta.get_json() == {"error": "Coluna 'content' não encontrada no arquivo"}
+
+
+# Método para testar os erros de criação e a busca de um job ou resultado inexistente
+def test_job_erros(cliente, executor):
+    resposta = cliente.post("/job", json={"modelo": "inexistente", "textos": ["bom"]})
+    assert resposta.get_json() == {"error": "Tipo de modelo não suportado"}
+    resposta = cliente.post("/job", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": []})
+    assert resposta.get_json() == {"error": "Nenhum texto informado no job"}
+
+    uid = str(uuid.uuid4())
+    assert cliente.get(f"/job?id={uid}").get_json() == {"error": "Job não encontrado na base :/"}
+    assert cliente.get(f"/job/resultado?id={uid}").get_json() == {"error": "Resultado do job não encontrado :/"}
+
+
+# Método para testar se um texto removido da base entre o envio do bloco ao pool e a gravação é analisado e gravado
+def test_job_texto_removido(cliente, executor, monkeypatch):
+    sufixo = uuid.uuid4().hex
+    existente = f"app bom removido {sufixo}"
+    cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": [existente]})
+    chamadas = []
+
+    def analisar_com_estagio(textos, tipo_modelo):
+        # Remoção do texto existente enquanto o restante do bloco é analisado
+        if not chamadas:
+            session = Session()
+            try:
+                session.query(Review).filter(Review.texto == existente).delete(synchronize_session=False)
+                session.commit()
+            finally:
+                session.close()
+        chamadas.append(list(textos))
+        return np.array([int("bom" in texto) for texto in textos]), [None] * len(textos)
+
+    monkeypatch.setattr(Analisador, "analisar_com_estagio", staticmethod(analisar_com_estagio))
+    textos = [f"app ruim {sufixo}", existente]
+    criado = cliente.post("/job", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": textos}).get_json()
+
+    job = aguarda_job(cliente, criado["id"])
+    assert job["status"] == Job.CONCLUIDO and job["erro"] is None
+    assert job["inseridos"] == 2 and job["existentes"] == 0
+    assert chamadas == [[textos[0]], [existente]]
+    assert [(linha["sentimento"], linha["situacao"]) for linha in resultado_job(cliente, criado["id"])] == \
+        [("0", "novo"), ("1", "novo")]
+    session = Session()
+    try:
+        assert session.query(Review).filter(Review.texto == existente).count() == 1
+    finally:
+        session.close()
+
+
+# Método para testar se a falha da predição termina o job com erro
+def test_job_falha_predicao(cliente, executor, monkeypatch):
+    def analisar_com_estagio(textos, tipo_modelo):
+        raise RuntimeError("modelo indisponível")
+
+    monkeypatch.setattr(Analisador, "analisar_com_estagio", staticmethod(analisar_com_estagio))
+    criado = cliente.post("/job", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN,
+                                        "textos": [f"bom {uuid.uuid4().hex}"]}).get_json()
+    job = aguarda_job(cliente, criado["id"])
+    assert job["status"] == Job.ERRO and job["erro"] == "modelo indisponível"
+
+
+# Método para testar se os jobs cujo processo terminou, ou sem progresso, são marcados com erro
+def test_job_orfao(cliente, executor):
+    encerrado = subprocess.Popen([sys.executable, "-c", "pass"])
+    encerrado.wait()
+    processo_encerrado = grava_job(processo=f"{executor.identificacao_processo().rpartition(':')[0]}:{encerrado.pid}",
+                                   data_atualizacao=datetime.now())
+    sem_progresso = grava_job(processo=executor.identificacao_processo(),
+                              data_atualizacao=datetime.now() - timedelta(seconds=executor.tempo_orfao + 1))
+    ativo = grava_job(processo=executor.identificacao_processo(), data_atualizacao=datetime.now())
+    # Job de outra máquina: apenas o tempo sem progresso é considerado
+    outra_maquina = grava_job(processo=f"outra-maquina:{encerrado.pid}", data_atualizacao=datetime.now())
+
+    for uid in (processo_encerrado, sem_progresso):
+        job = cliente.get(f"/job?id={uid}").get_json()
+        assert job["status"] == Job.ERRO and job["erro"].startswith("Job interrompido")
+    assert cliente.get(f"/job?id={ativo}").get_json()["status"] == Job.EXECUTANDO
+    assert cliente.get(f"/job?id={outra_maquina}").get_json()["status"] == Job.EXECUTANDO
+
+    # Na inicialização da aplicação, os jobs interrompidos são marcados sem precisar de consulta
+    orfao = grava_job(processo=f"{executor.identificacao_processo().rpartition(':')[0]}:{encerrado.pid}",
+                      data_atualizacao=datetime.now())
+    assert executor.recupera_orfaos() == 1
+    session = Session()
+    try:
+        assert session.query(Job).filter(Job.uid == orfao).one().status == Job.ERRO
+        assert session.query(Job).filter(Job.uid == ativo).one().status == Job.EXECUTANDO
+    finally:
+        session.close()
@@ -0,0 +1,136 @@
+import io
+import json
+import logging
+import os
+
+import pytest
+
+import logger as modulo_logger
+from logger import configura_logs, id_requisicao
+
+
+# To run: pytest -v test_logger.py
+
+@pytest.fixture
+def logs(tmp_path):
+    """ Configura os logs em um diretório temporário e, ao final, restaura a configuração da
+    aplicação (handlers da raiz e loggers desabilitados pelo dictConfig).
+    """
+    raiz = logging.getLogger()
+    handlers, nivel = list(raiz.handlers), raiz.level
+    gunicorn = logging.getLogger("gunicorn.error")
+    handlers_gunicorn = list(gunicorn.handlers)
+    desabilitados = {nome: registro.disabled for nome, registro in logging.root.manager.loggerDict.items()
+                     if isinstance(registro, logging.Logger)}
+    console = io.StringIO()
+
+    def configura(**parametros):
+        listener = configura_logs(str(tmp_path), console=console, nivel="DEBUG", **parametros)
+        configurados.append(listener)
+        return listener
+
+    configurados = []
+    yield configura, tmp_path, console
+
+    for listener in configurados:
+        if listener._thread is not None:
+            listener.stop()
+    raiz.handlers, gunicorn.handlers = handlers, handlers_gunicorn
+    raiz.setLevel(nivel)
+    for nome, desabilitado in desabilitados.items():
+        logging.getLogger(nome).disabled = desabilitado
+
+
+def le(caminho) -> str:
+    return caminho.read_text(encoding="utf-8") if caminho.exists() else ""
+
+
+# Cada teste usa o seu logger: o dictConfig de configura_logs desabilita os loggers já existentes
+
+# Método para testar se os registros passam pela fila e são escritos pela thread do listener nos arquivos de cada logger
+def test_logs_fila(logs):
+    configura, diretorio, console = logs
+    listener = configura(formato_json=False)
+    assert [type(handler).__name__ for handler in logging.getLogger().handlers] == ["QueueHandler"]
+
+    token = id_requisicao.set("req-123")
+    try:
+        logging.getLogger("teste.fila").warning("Review '%s' já existente", "app bom")
+    finally:
+        id_requisicao.reset(token)
+    logging.getLogger("gunicorn.error").info("Worker iniciado")
+    listener.stop()
+
+    detalhado = le(diretorio / "gunicorn.detailed.log")
+    erros = le(diretorio / "gunicorn.error.log")
+    assert "[req-123]" in detalhado and "Review 'app bom' já existente" in detalhado
+    assert "Worker iniciado" in erros and "Worker iniciado" not in detalhado
+    assert "Review 'app bom' já existente" in console.getvalue()
+
+
+# Método para testar o formato JSON, com o id da requisição e os campos passados em extra
+def test_logs_json(logs):
+    configura, diretorio, console = logs
+    listener = configura(formato_json=True)
+
+    token = id_requisicao.set("req-456")
+    try:
+        logging.getLogger("teste.json").debug("POST /review 200", extra={"duracao_ms": 12.5, "etapas_ms": {"inferencia": 10.0}})
+    finally:
+        id_requisicao.reset(token)
+    listener.stop()
+
+    registro = json.loads(le(diretorio / "gunicorn.detailed.log").splitlines()[-1])
+    assert registro["nivel"] == "DEBUG" and registro["logger"] == "teste.json"
+    assert registro["mensagem"] == "POST /review 200"
+    assert registro["id_requisicao"] == "req-456"
+    assert registro["duracao_ms"] == 12.5 and registro["etapas_ms"] == {"inferencia": 10.0}
+
+
+# Método para testar se, após o fork de um worker, o processo filho reinicia a thread de escrita e os dois continuam registrando
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requer os.fork")
+def test_logs_apos_fork(logs):
+    configura, diretorio, console = logs
+    listener = configura(formato_json=False)
+    logging.getLogger("teste.fork").info("Antes do fork")
+
+    pid = os.fork()
+    if pid == 0:
+        # Processo filho: sem a nova thread do listener, o registro ficaria na fila para sempre
+        codigo = 1
+        try:
+            logging.getLogger("teste.fork").info("Registro do filho %d", os.getpid())
+            listener.stop()
+            codigo = 0
+        finally:
+            os._exit(codigo)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    logging.getLogger("teste.fork").info("Registro do pai depois do fork")
+    listener.stop()
+
+    detalhado = le(diretorio / "gunicorn.detailed.log")
+    assert "Antes do fork" in detalhado
+    assert f"Registro do filho {pid}" in detalhado
+    assert "Registro do pai depois do fork" in detalhado
+
+
+# Método para testar se várias configurações registram os ganchos do fork e do encerramento uma única vez
+def test_logs_ganchos_unicos(logs, monkeypatch):
+    configura, diretorio, console = logs
+    registros = []
+    monkeypatch.setattr(modulo_logger, "ganchos_registrados", False)
+    monkeypatch.setattr(modulo_logger, "configuracoes", list(modulo_logger.configuracoes))
+    monkeypatch.setattr(os, "register_at_fork", lambda **ganchos: registros.append(("fork", ganchos)))
+    monkeypatch.setattr(modulo_logger.atexit, "register", lambda funcao: registros.append(("atexit", funcao)))
+
+    primeiro = configura(formato_json=False)
+    primeiro.stop()
+    segundo = configura(formato_json=False)
+    configura(formato_json=False)
+
+    assert [tipo for tipo, _ in registros] == ["fork", "atexit"]
+    # O listener encerrado deixa de ser acompanhado e não é reiniciado no fork
+    listeners = [listener for listener, _ in modulo_logger.configuracoes]
+    assert primeiro not in listeners and segundo in listeners
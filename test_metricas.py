@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+from prometheus_client.parser import text_string_to_metric_families
+
+
+# To run: pytest -v test_metricas.py
+
+# Worker que analisa a quantidade de textos informada, gravando as métricas no diretório multiprocesso
+CODIGO_WORKER = """
+import sys
+from model.metricas import Metricas
+quantidade = int(sys.argv[1])
+Metricas.TEXTOS.labels("pipeline-et").inc(quantidade)
+Metricas.DURACAO_ETAPA.labels("inferencia", "pipeline-et").observe(0.01 * quantidade)
+"""
+
+# Outro worker, que atende GET /metrics com o test client do Flask
+CODIGO_METRICS = """
+import sys
+from app import app
+resposta = app.test_client().get("/metrics")
+sys.stdout.write(resposta.get_data(as_text=True))
+"""
+
+
+def amostras(texto: str) -> dict:
+    """ Valor de cada amostra, indexado pelo nome e pelos rótulos. """
+    return {(amostra.name, frozenset(amostra.labels.items())): amostra.value
+            for familia in text_string_to_metric_families(texto) for amostra in familia.samples}
+
+
+def valor(valores: dict, nome: str, **rotulos) -> float:
+    return valores.get((nome, frozenset(rotulos.items())), 0.0)
+
+
+# Método para testar se /metrics expõe as métricas das requisições atendidas pelo processo
+def test_metrics_processo(cliente, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    requisicoes = dict(nome="sentimento_requisicoes_total", metodo="POST", rota="/review/batch", status="200")
+    erros = dict(nome="sentimento_erros_total", rota="/review/batch", modelo="invalido")
+
+    antes = amostras(cliente.get("/metrics").get_data(as_text=True))
+    cliente.post("/review/batch", json={"modelo": "inexistente", "textos": ["bom"]})
+    cliente.post("/review/batch", json={"modelo": "inexistente", "textos": ["bom"]})
+    resposta = cliente.get("/metrics")
+    depois = amostras(resposta.get_data(as_text=True))
+
+    assert resposta.mimetype == "text/plain"
+    assert valor(depois, **requisicoes) - valor(antes, **requisicoes) == 2
+    assert valor(depois, **erros) - valor(antes, **erros) == 2
+    assert valor(depois, "sentimento_requisicao_duracao_segundos_count", metodo="POST", rota="/review/batch") >= 2
+
+
+# Método para testar se, em modo multiprocesso, /metrics agrega as métricas gravadas por todos os workers
+def test_metrics_multiprocesso(tmp_path):
+    ambiente = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), AQUECER_MODELOS="")
+    for quantidade in (3, 4):
+        subprocess.run([sys.executable, "-c", CODIGO_WORKER, str(quantidade)], env=ambiente, check=True)
+    saida = subprocess.run([sys.executable, "-c", CODIGO_METRICS], env=ambiente, check=True,
+                           capture_output=True, text=True).stdout
+    valores = amostras(saida)
+
+    # Os contadores e histogramas dos dois workers, já encerrados, são somados
+    assert valor(valores, "sentimento_textos_analisados_total", modelo="pipeline-et") == 7
+    etapa = dict(etapa="inferencia", modelo="pipeline-et")
+    assert valor(valores, "sentimento_etapa_duracao_segundos_count", **etapa) == 2
+    assert abs(valor(valores, "sentimento_etapa_duracao_segundos_sum", **etapa) - 0.07) < 1e-9
+    assert valor(valores, "sentimento_etapa_duracao_segundos_bucket", le="0.05", **etapa) == 2
+    assert valor(valores, "sentimento_etapa_duracao_segundos_bucket", le="0.025", **etapa) == 0
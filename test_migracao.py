@@ -0,0 +1,81 @@
+from sqlalchemy import create_engine, inspect, text
+
+from model.banco import cria_engine
+from model.base import Base
+from model.migracao import Migracao
+
+
+# To run: pytest -v test_migracao.py
+
+# Esquema das versões anteriores às migrações: reviews sem índices nem estágio, cache de predições sem estágio nem versão
+# e jobs sem o processo e a data do último progresso
+ESQUEMA_ANTIGO = [
+    "CREATE TABLE reviews (id INTEGER PRIMARY KEY, uid VARCHAR NOT NULL, texto VARCHAR(250) NOT NULL, "
+    "sentimento INTEGER NOT NULL, modelo VARCHAR NOT NULL, data_criacao DATETIME NOT NULL)",
+    "CREATE TABLE predicoes_cache (hash VARCHAR(64) NOT NULL, modelo VARCHAR NOT NULL, sentimento INTEGER NOT NULL, "
+    "data_criacao DATETIME NOT NULL, PRIMARY KEY (hash, modelo))",
+    "CREATE TABLE jobs (id INTEGER PRIMARY KEY, uid VARCHAR NOT NULL UNIQUE, modelo VARCHAR NOT NULL, "
+    "status VARCHAR NOT NULL, total INTEGER NOT NULL, processados INTEGER NOT NULL, inseridos INTEGER NOT NULL, "
+    "existentes INTEGER NOT NULL, erro TEXT, arquivo_resultado VARCHAR, data_criacao DATETIME NOT NULL, "
+    "data_inicio DATETIME, data_fim DATETIME)",
+    "INSERT INTO reviews (uid, texto, sentimento, modelo, data_criacao) VALUES ('u1', 'app bom', 1, 'pipeline-et', '2024-06-01 10:00:00')",
+    # Texto repetido, gravado por requisições simultâneas antes do índice único (modelo, texto)
+    "INSERT INTO reviews (uid, texto, sentimento, modelo, data_criacao) VALUES ('u2', 'app bom', 1, 'pipeline-et', '2024-06-01 10:00:01')",
+]
+
+
+def esquema(engine) -> dict:
+    """ Colunas e índices, com a indicação de índice único, de cada tabela migrada. """
+    inspetor = inspect(engine)
+    return {tabela: ({coluna["name"] for coluna in inspetor.get_columns(tabela)},
+                     {(indice["name"], bool(indice["unique"])) for indice in inspetor.get_indexes(tabela)})
+            for tabela in ("reviews", "predicoes_cache", "jobs")}
+
+
+# Método para testar se uma base antiga é migrada para o esquema atual, mantendo os dados, e se reaplicar não muda nada
+def test_migracao_base_antiga(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'antiga.sqlite3'}")
+    with engine.begin() as conexao:
+        for comando in ESQUEMA_ANTIGO:
+            conexao.execute(text(comando))
+
+    assert Migracao.aplica(engine) == len(Migracao.MIGRACOES)
+    migrado = esquema(engine)
+
+    # Mesmo esquema de uma base criada pelo create_all
+    atual = create_engine(f"sqlite:///{tmp_path / 'atual.sqlite3'}")
+    Base.metadata.create_all(atual)
+    assert migrado == esquema(atual)
+    with engine.connect() as conexao:
+        # Do texto repetido, fica apenas o review mais antigo
+        assert conexao.execute(text("SELECT uid, texto, estagio FROM reviews")).all() == [("u1", "app bom", None)]
+    assert ("ix_reviews_modelo_texto", True) in migrado["reviews"][1]
+
+    # Reaplicar não executa nada e não altera o esquema
+    assert Migracao.aplica(engine) == len(Migracao.MIGRACOES)
+    assert esquema(engine) == migrado
+
+
+# Método para testar se cada migração é idempotente, como exigido para bases já criadas no esquema atual
+def test_migracao_idempotente(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    criado = esquema(engine)
+
+    # Base nova: versão 0, todas as migrações são aplicadas sobre o esquema já atual
+    assert Migracao.aplica(engine) == len(Migracao.MIGRACOES)
+    with engine.begin() as conexao:
+        for migracao in Migracao.MIGRACOES:
+            migracao(conexao)
+            migracao(conexao)
+    assert esquema(engine) == criado
+
+
+# Método para testar se as conexões da engine usam WAL e os pragmas de desempenho
+def test_engine_pragmas(tmp_path):
+    engine = cria_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    with engine.connect() as conexao:
+        assert conexao.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conexao.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conexao.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
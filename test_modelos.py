@@ -1,4 +1,7 @@
 from model import *
+import os
+import pandas as pd
+import pytest
 import torch
 
 
@@ -6,66 +9,108 @@ import torch
 
 # Parâmetros    
 url_dados = "./machine-learning/data/android_app_reviews.csv"
+url_X_teste = "./machine-learning/data/X_test_dataset_sentiment.csv"
+url_y_teste = "./machine-learning/data/y_test_dataset_sentiment.csv"
 
-# Carga dos dados
-dataset = Carregador.carregar_dados(url_dados)
+# Divisão de teste e textos pré-processados ficam em cache em disco (ver CacheAvaliacao),
+# calculados apenas na primeira execução ou quando os dados ou os artefatos mudam
+cache = CacheAvaliacao()
+X_test, y_test = cache.separa_teste(url_dados, percentual_teste=0.2, seed=7)
 
 # Método para testar o pipeline do Extra Trees + Max Abs Scaler
 def test_modelo_et():  
-    pp_et = PreProcessadorFactory.cria_preprocessador(TipoModelo.MODEL_SCIKIT_LEARN)
-    model_et = ModelFactory.cria_modelo(TipoModelo.MODEL_SCIKIT_LEARN)    
-
-    X = dataset['content']
-    y = dataset['sentiment']
-
-    # Divide os dados em treino e teste
-    X_train, X_test, y_train, y_test = PreProcessador.separa_teste_treino(X, y, percentual_teste=0.2, seed=7)
-
-    # Vetoriza e limpa os textos
-    X_vec = pp_et.preparar_textos(X_test.tolist())
-
     # Obtendo as métricas do modelo Extra Trees
-    acuracia_model_et = Avaliador.avaliar(model_et, X_vec, y_test)
+    resultado = Avaliador.avaliar_com_cache(TipoModelo.MODEL_SCIKIT_LEARN, X_test, y_test, cache=cache)
+    print(resultado)
 
     # Testando as métricas do pipeline do Extra Trees  
-    assert acuracia_model_et >= 0.78, f"Acurácia do modelo abaixo do esperado: {acuracia_model_et}"
+    assert resultado["acuracia"] >= 0.78, f"Acurácia do modelo abaixo do esperado: {resultado['acuracia']}"
 
 # Método para testar o pipeline do Extra Trees + Max Abs Scaler
 def test_pipeline_et():  
-    pp_et = PreProcessadorFactory.cria_preprocessador(TipoModelo.PIPELINE_SCIKIT_LEARN)
-    pipeline_et = ModelFactory.cria_modelo(TipoModelo.PIPELINE_SCIKIT_LEARN)    
-
-    X = dataset['content']
-    y = dataset['sentiment']
-
-    # Divide os dados em treino e teste
-    X_train, X_test, y_train, y_test = PreProcessador.separa_teste_treino(X, y, percentual_teste=0.2, seed=7)
-
-    # Vetoriza e limpa os textos
-    X_vec = pp_et.preparar_textos(X_test.tolist())
-
     # Obtendo as métricas do pipeline do Extra Trees + Max Abs Scaler
-    acuracia_pipeline_et = Avaliador.avaliar(pipeline_et, X_vec, y_test)
+    resultado = Avaliador.avaliar_com_cache(TipoModelo.PIPELINE_SCIKIT_LEARN, X_test, y_test, cache=cache)
+    print(resultado)
 
     # Testando as métricas do pipeline do Extra Trees + Max Abs Scaler 
-    assert acuracia_pipeline_et >= 0.85, f"Acurácia do modelo abaixo do esperado: {acuracia_pipeline_et}" 
+    assert resultado["acuracia"] >= 0.85, f"Acurácia do modelo abaixo do esperado: {resultado['acuracia']}" 
 
 # Método para testar o modelo distilbert (deep learning) (!!!Tenha uma GPU disponível!!!)
 def test_modelo_tf():  
+    # Obtendo as métricas do distilbert, em lotes de tamanho limitado
+    resultado = Avaliador.avaliar_com_cache(TipoModelo.MODEL_TRANSFORMERS, X_test, y_test, cache=cache)
+    print(resultado)
+
+    # Testando as métricas do distilbert  
+    assert resultado["acuracia"] >= 0.88, f"Acurácia do modelo abaixo do esperado: {resultado['acuracia']}"
+
+# Método para testar se o spaCy enxuto e em lote gera os mesmos textos limpos do pipeline completo
+def test_preprocessador_enxuto():
+    textos = pd.read_csv(url_X_teste)['content'].tolist()
+
+    pp_completo = PreProcessadorScikitLearn(enxuto=False, tamanho_memo=0)
+    pp_enxuto = PreProcessadorScikitLearn(enxuto=True)
+
+    textos_completo = pp_completo.limpar_textos(textos)
+
+    # Compara também a segunda passada, que vem da memoização
+    assert pp_enxuto.limpar_textos(textos) == textos_completo
+    assert pp_enxuto.limpar_textos(textos) == textos_completo
+
+# Método para testar se o padding dinâmico, com lotes agrupados por tamanho, mantém as predições do distilbert
+def test_padding_dinamico():
     model_tf = ModelFactory.cria_modelo(TipoModelo.MODEL_TRANSFORMERS)
-    pp_model_tf = PreProcessadorFactory.cria_preprocessador(TipoModelo.MODEL_TRANSFORMERS)
+    textos = pd.read_csv(url_X_teste)['content'].tolist()[:500]
 
-    X = dataset['content']
-    y = dataset['sentiment']    
+    pp_fixo = PreProcessadorTransformers(padding_dinamico=False)
+    pp_dinamico = PreProcessadorTransformers(padding_dinamico=True, tamanho_lote=32)
 
-    # Divide os dados em treino e teste
-    X_train, X_test, y_train, y_test = PreProcessador.separa_teste_treino(X, y, percentual_teste=0.2, seed=7)
+    predicoes_fixo = model_tf.realizar_predicao(pp_fixo.preparar_textos(textos))
+    predicoes_dinamico = model_tf.realizar_predicao(pp_dinamico.preparar_textos(textos))
 
-    X_tf = pp_model_tf.preparar_textos(X_test) 
+    assert (predicoes_fixo == predicoes_dinamico).all()
+    assert pp_dinamico.estatisticas()["tokens_padding"] < pp_fixo.estatisticas()["tokens_padding"]
 
-    # Obtendo as métricas do pipeline do Extra Trees + Max Abs Scaler
-    acuracia_model_tf = Avaliador.avaliar(model_tf, X_tf, y_test)
+# Método para testar se o distilbert quantizado em int8 mantém a acurácia do modelo original
+# (gere o modelo antes com: python -m ferramentas.quantizar_modelo)
+def test_modelo_tf_quantizado():
+    # O artefato int8 só existe depois de gerado pela ferramenta: sem ele, o teste é pulado em vez de falhar na carga
+    pesos_int8 = os.path.join(ModelTransformersQuantizado.CAMINHO, ModelTransformersQuantizado.ARQUIVO_PESOS)
+    if not os.path.exists(pesos_int8):
+        pytest.skip(f"Modelo quantizado não encontrado em {pesos_int8}, gere com: python -m ferramentas.quantizar_modelo")
 
-    # Testando as métricas do pipeline do Extra Trees  
-    assert acuracia_model_tf >= 0.88, f"Acurácia do modelo abaixo do esperado: {acuracia_model_tf}"    
+    model_tf = ModelFactory.cria_modelo(TipoModelo.MODEL_TRANSFORMERS)
+    model_tf_int8 = ModelFactory.cria_modelo(TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO)
+    pp_model_tf = PreProcessadorFactory.cria_preprocessador(TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO)
+
+    X_tf = pp_model_tf.preparar_textos(pd.read_csv(url_X_teste)['content'].tolist())
+    y = pd.read_csv(url_y_teste)['sentiment']
+
+    acuracia_model_tf = Avaliador.avaliar(model_tf, X_tf, y)
+    acuracia_model_tf_int8 = Avaliador.avaliar(model_tf_int8, X_tf, y)
+
+    # Testando a perda de acurácia do modelo quantizado
+    assert acuracia_model_tf - acuracia_model_tf_int8 <= 0.01, f"Acurácia do modelo quantizado abaixo do esperado: {acuracia_model_tf_int8}"
+
+# Método para testar se a floresta compilada gera as mesmas predições dos modelos Extra Trees
+def test_floresta_compilada():
+    pp_et = PreProcessadorFactory.cria_preprocessador(TipoModelo.PIPELINE_SCIKIT_LEARN)
+    X_vec = pp_et.preparar_textos(pd.read_csv(url_X_teste)['content'].tolist())
+
+    for tipo_modelo in [TipoModelo.PIPELINE_SCIKIT_LEARN, TipoModelo.MODEL_SCIKIT_LEARN]:
+        model_et = ModelFactory.cria_modelo(tipo_modelo)
+        floresta = FlorestaCompilada.compila(model_et.model)
+
+        assert (floresta.predict(X_vec) == model_et.model.predict(X_vec)).all()
+        assert (floresta.predict_proba(X_vec) == model_et.model.predict_proba(X_vec)).all()
+
+# Método para testar o modelo em cascata, que só envia ao distilbert os textos incertos para o pipeline do Extra Trees
+def test_cascata():
+    textos = pd.read_csv(url_X_teste)['content'].tolist()
+    y = pd.read_csv(url_y_teste)['sentiment']
+
+    predicoes, estagios = Analisador.analisar_cascata(textos)
+    acuracia_cascata = (predicoes == y.to_numpy()).mean()
 
+    assert acuracia_cascata >= 0.85, f"Acurácia da cascata abaixo do esperado: {acuracia_cascata}"
+    assert estagios.count(TipoModelo.MODEL_TRANSFORMERS) < len(textos)
@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime, timedelta
+
+from model import Session, Review
+
+
+# To run: pytest -v test_paginacao.py
+
+def insere_reviews(modelo: str, datas: list) -> list:
+    """ Grava um review do modelo para cada data e retorna os uids na ordem da listagem (data e id decrescentes). """
+    session = Session()
+    reviews = [Review(texto=f"review {indice} {uuid.uuid4().hex}", sentimento=indice % 2, modelo=modelo, data_criacao=data)
+               for indice, data in enumerate(datas)]
+    session.add_all(reviews)
+    session.commit()
+    ordenados = sorted(reviews, key=lambda review: (review.data_criacao, review.id), reverse=True)
+    uids = [review.uid for review in ordenados]
+    session.close()
+    return uids
+
+
+def pagina(cliente, modelo: str, limit, cursor: str = None) -> tuple:
+    parametros = {"modelo": modelo, "limit": limit}
+    if cursor:
+        parametros["cursor"] = cursor
+    resposta = cliente.get("/review", query_string=parametros)
+    return [review["id"] for review in resposta.get_json()], resposta.headers.get("X-Proximo-Cursor")
+
+
+# Método para testar se as páginas do cursor cobrem todos os reviews, sem repetições, mesmo com datas iguais
+# e com reviews inseridos durante a paginação
+def test_paginacao_cursor(cliente):
+    modelo = f"teste-cursor-{uuid.uuid4().hex}"
+    inicio = datetime(2024, 6, 1, 12, 0)
+    # Cinco reviews com a mesma data: o desempate é pelo id
+    esperados = insere_reviews(modelo, [inicio + timedelta(minutes=indice) for indice in range(6)] + [inicio] * 5)
+
+    vistos, cursor = pagina(cliente, modelo, 4)
+    assert vistos == esperados[:4] and cursor
+
+    # Um review mais recente, inserido entre as páginas, não desloca as páginas seguintes
+    insere_reviews(modelo, [inicio + timedelta(days=1)])
+    while cursor:
+        ids, cursor = pagina(cliente, modelo, 4, cursor)
+        vistos.extend(ids)
+
+    assert vistos == esperados
+
+
+# Método para testar os limites de `limit` e a recusa de um cursor inválido
+def test_paginacao_limites(cliente):
+    modelo = f"teste-cursor-{uuid.uuid4().hex}"
+    esperados = insere_reviews(modelo, [datetime(2024, 6, 1) + timedelta(hours=indice) for indice in range(3)])
+
+    # Limite negativo vale como 1; sem limite (ou 0), todos os reviews, sem cursor
+    assert pagina(cliente, modelo, -5)[0] == esperados[:1]
+    assert pagina(cliente, modelo, 0) == (esperados, None)
+    # Última página exata: sem cursor da próxima
+    assert pagina(cliente, modelo, 3) == (esperados, None)
+
+    for cursor in ("invalido", "bm9uLWRhdGF8MQ==", "MjAyNC0wNi0wMXRleHRv"):
+        resposta = cliente.get("/review", query_string={"modelo": modelo, "limit": 2, "cursor": cursor})
+        assert resposta.get_json() == {"error": "Cursor inválido"}
+
+
+# Método para testar se a listagem em streaming traz os mesmos reviews, na mesma ordem, com e sem limite
+def test_listagem_stream(cliente):
+    modelo = f"teste-stream-{uuid.uuid4().hex}"
+    esperados = insere_reviews(modelo, [datetime(2024, 6, 1) + timedelta(minutes=indice) for indice in range(7)])
+
+    resposta = cliente.get("/review", query_string={"modelo": modelo, "stream": "true"})
+    assert resposta.mimetype == "application/json"
+    assert [review["id"] for review in resposta.get_json()] == esperados
+
+    resposta = cliente.get("/review", query_string={"modelo": modelo, "stream": "true", "limit": 2})
+    assert [review["id"] for review in resposta.get_json()] == esperados[:2]
+
+    resposta = cliente.get("/review", query_string={"modelo": f"inexistente-{uuid.uuid4().hex}", "stream": "true"})
+    assert resposta.get_json() == []
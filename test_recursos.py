@@ -0,0 +1,96 @@
+import io
+import os
+
+import pytest
+
+from model import recursos
+from model.recursos import RecursosCPU
+
+
+# To run: pytest -v test_recursos.py
+
+VARIAVEIS = ("CPU_GOVERNADOR", "CPU_WORKERS", "CPU_THREADS_POR_WORKER", "CPU_THREADS_INTEROP", "SPACY_N_PROCESS",
+             "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+@pytest.fixture
+def recursos_cpu(monkeypatch):
+    """ Configura a quantidade de núcleos, sem depender da máquina que executa os testes, e as
+    variáveis de ambiente. As bibliotecas não são alteradas: as chamadas são apenas registradas.
+    """
+    chamadas = []
+    monkeypatch.setattr(RecursosCPU, "configura_torch", staticmethod(lambda: chamadas.append("torch")))
+    monkeypatch.setattr(RecursosCPU, "configura_blas", staticmethod(lambda: chamadas.append("blas")))
+
+    def configura(nucleos: int, **variaveis) -> dict:
+        monkeypatch.setattr(RecursosCPU, "nucleos_disponiveis", staticmethod(lambda: chamadas.append("nucleos") or nucleos))
+        for variavel in VARIAVEIS:
+            monkeypatch.delenv(variavel, raising=False)
+        for variavel, valor in variaveis.items():
+            monkeypatch.setenv(variavel, str(valor))
+        RecursosCPU.limpar()
+        return RecursosCPU.configuracao()
+
+    yield configura, chamadas
+    RecursosCPU.limpar()
+
+
+# Método para testar a divisão dos núcleos entre os workers, inclusive com menos núcleos do que workers
+@pytest.mark.parametrize("nucleos, workers, threads", [(8, 1, 8), (8, 3, 2), (8, 4, 2), (2, 3, 1), (1, 4, 1)])
+def test_recursos_divisao(recursos_cpu, nucleos, workers, threads):
+    configura, _ = recursos_cpu
+    configuracao = configura(nucleos, CPU_WORKERS=workers)
+    assert (configuracao["nucleos"], configuracao["workers"], configuracao["threads"]) == (nucleos, workers, threads)
+    assert configuracao["n_jobs"] == configuracao["processos_spacy"] == threads
+    assert configuracao["threads_interop"] == 1 and configuracao["ativo"]
+    assert RecursosCPU.threads_por_processo(2) == max(1, threads // 2)
+
+
+# Método para testar se as variáveis de ambiente substituem os valores calculados
+def test_recursos_variaveis(recursos_cpu):
+    configura, _ = recursos_cpu
+    configuracao = configura(8, CPU_WORKERS=3, CPU_THREADS_POR_WORKER=5, CPU_THREADS_INTEROP=2, SPACY_N_PROCESS=3)
+    assert (configuracao["threads"], configuracao["n_jobs"], configuracao["threads_interop"]) == (5, 5, 2)
+    assert RecursosCPU.processos_spacy() == 3
+
+    # Os processos do spaCy não passam da parcela do worker, e valores menores que 1 viram 1
+    assert configura(8, CPU_WORKERS=4, SPACY_N_PROCESS=16)["processos_spacy"] == 2
+    configuracao = configura(8, CPU_WORKERS=0, CPU_THREADS_INTEROP=0)
+    assert (configuracao["workers"], configuracao["threads"], configuracao["threads_interop"]) == (1, 8, 1)
+
+    # Desligado, nada é limitado e o spaCy usa SPACY_N_PROCESS sem o limite do worker
+    assert not configura(8, CPU_GOVERNADOR=0, CPU_WORKERS=4, SPACY_N_PROCESS=6)["ativo"]
+    assert RecursosCPU.processos_spacy() == 6
+
+
+# Método para testar se a configuração é calculada uma vez e se aplica pode ser chamada várias vezes com o mesmo resultado
+def test_recursos_aplica_idempotente(recursos_cpu, monkeypatch):
+    configura, chamadas = recursos_cpu
+    monkeypatch.delitem(recursos.sys.modules, "torch", raising=False)
+    configuracao = configura(8, CPU_WORKERS=3)
+
+    assert RecursosCPU.aplica() == RecursosCPU.aplica() == configuracao
+    assert chamadas == ["nucleos", "blas", "blas"]
+    assert all(os.environ[variavel] == "2" for variavel in VARIAVEIS[5:])
+
+    # Desligado, aplica não altera as variáveis nem as bibliotecas
+    chamadas.clear()
+    configura(8, CPU_GOVERNADOR=0)
+    RecursosCPU.aplica()
+    assert chamadas == ["nucleos"]
+    assert not any(variavel in os.environ for variavel in VARIAVEIS[5:])
+
+
+# Método para testar se os núcleos disponíveis respeitam a afinidade e a cota do cgroup
+@pytest.mark.parametrize("cota, nucleos", [("max 100000", 6), ("200000 100000", 2), ("50000 100000", 1), (None, 6)])
+def test_recursos_nucleos_cgroup(monkeypatch, cota, nucleos):
+    monkeypatch.setattr(recursos.os, "sched_getaffinity", lambda pid: set(range(6)), raising=False)
+
+    def abre(caminho, *args, **kwargs):
+        assert caminho == "/sys/fs/cgroup/cpu.max"
+        if cota is None:
+            raise FileNotFoundError(caminho)
+        return io.StringIO(cota + "\n")
+
+    monkeypatch.setattr(recursos, "open", abre, raising=False)
+    assert RecursosCPU.nucleos_disponiveis() == nucleos
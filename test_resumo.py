@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from model.base import Base
+from model.review import Review
+from model.repositorio import RepositorioReview
+from model.resumo import ResumoSentimentos
+
+
+# To run: pytest -v test_resumo.py
+
+# Método para testar se o resumo mantido pelos triggers é igual ao recalculado a partir dos reviews
+def test_resumo_sentimentos(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    ResumoSentimentos.cria(engine)
+    session = sessionmaker(bind=engine)()
+
+    inicio = datetime(2024, 6, 1, 22, 0)
+    reviews = [Review(texto=f"review {indice}", sentimento=indice % 2, modelo=["pipeline-et", "model-et"][indice % 3 == 0],
+                      data_criacao=inicio + timedelta(hours=5 * indice)) for indice in range(60)]
+    session.add_all(reviews)
+    session.commit()
+
+    # Remoções e alterações de sentimento, modelo e data
+    for review in reviews[:10]:
+        session.delete(review)
+    reviews[10].sentimento = 1 - reviews[10].sentimento
+    reviews[11].modelo = "model-distilbert"
+    reviews[12].data_criacao = inicio + timedelta(days=30)
+    session.commit()
+
+    incremental = {granularidade: ResumoSentimentos.consulta(session, granularidade) for granularidade in ResumoSentimentos.GRANULARIDADES}
+    assert ResumoSentimentos.reconstroi(engine) == 50
+    for granularidade, periodos in incremental.items():
+        assert ResumoSentimentos.consulta(session, granularidade) == periodos
+
+    assert sum(periodo["total"] for periodo in ResumoSentimentos.consulta(session, "total")) == 50
+    session.close()
+
+
+# Método para testar se a importação e a remoção em lote mantêm o resumo consistente
+def test_resumo_operacoes_em_lote(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reviews.sqlite3'}")
+    Base.metadata.create_all(engine)
+    ResumoSentimentos.cria(engine)
+    session = sessionmaker(bind=engine)()
+
+    rotulados = {f"review {indice}": indice % 2 for indice in range(100)}
+    assert RepositorioReview.importa_lote(session, rotulados, "pipeline-et") == {"inseridos": 100, "atualizados": 0, "inalterados": 0}
+    session.commit()
+
+    rotulados.update({"review 0": 1, "review 1": 1, "review novo": 0})
+    assert RepositorioReview.importa_lote(session, rotulados, "pipeline-et") == {"inseridos": 1, "atualizados": 1, "inalterados": 99}
+    session.commit()
+
+    uids = [uid for (uid,) in session.query(Review.uid).limit(5)]
+    assert RepositorioReview.remove_lote(session, uids=uids) == 5
+    negativos = session.query(Review).filter(Review.sentimento == 0).count()
+    assert RepositorioReview.remove_lote(session, modelo="pipeline-et", sentimento=0) == negativos
+    session.commit()
+    assert session.query(Review).count() == 101 - 5 - negativos
+
+    periodos = ResumoSentimentos.consulta(session, "total")
+    assert ResumoSentimentos.reconstroi(engine) == session.query(Review).count()
+    assert ResumoSentimentos.consulta(session, "total") == periodos
+    session.close()
@@ -0,0 +1,163 @@
+import threading
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import app as aplicacao
+from model import Review, RepositorioReview, Session, TipoModelo
+
+
+# To run: pytest -v test_review_importacao.py
+
+def busca_reviews(textos: list, modelo: str) -> dict:
+    """ Sentimento, estágio e uid de cada texto gravado para o modelo. """
+    session = Session()
+    try:
+        consulta = session.query(Review.texto, Review.sentimento, Review.estagio, Review.uid) \
+            .filter(Review.modelo == modelo, Review.texto.in_(textos))
+        return {texto: (sentimento, estagio, uid) for texto, sentimento, estagio, uid in consulta}
+    finally:
+        session.close()
+
+
+def importa(cliente, reviews: list, modelo: str = TipoModelo.PIPELINE_SCIKIT_LEARN) -> dict:
+    resposta = cliente.put("/review/batch", json={"modelo": modelo, "reviews": reviews})
+    return resposta.get_json()
+
+
+# Método para testar a contagem de inseridos, atualizados e inalterados e a duração informada
+def test_importacao_contagens(cliente, monkeypatch):
+    # Blocos de 2 linhas: a importação é dividida em vários comandos
+    monkeypatch.setattr(RepositorioReview, "TAMANHO_BLOCO_IMPORTACAO", 2)
+    textos = [f"app {indice} {uuid.uuid4().hex}" for indice in range(5)]
+
+    resultado = importa(cliente, [{"texto": texto, "sentimento": indice % 2} for indice, texto in enumerate(textos)])
+    assert (resultado["inseridos"], resultado["atualizados"], resultado["inalterados"]) == (5, 0, 0)
+    assert isinstance(resultado["duracao_ms"], float) and resultado["duracao_ms"] >= 0
+    gravados = busca_reviews(textos, TipoModelo.PIPELINE_SCIKIT_LEARN)
+    assert {texto: sentimento for texto, (sentimento, _, _) in gravados.items()} == \
+        {texto: indice % 2 for indice, texto in enumerate(textos)}
+
+    # Dois sentimentos alterados, três mantidos, um texto novo e um repetido, que fica com o último sentimento
+    novo = f"app novo {uuid.uuid4().hex}"
+    reviews = [{"texto": textos[0], "sentimento": 1}, {"texto": textos[1], "sentimento": 0},
+               {"texto": textos[2], "sentimento": 0}, {"texto": textos[3], "sentimento": 1},
+               {"texto": textos[4], "sentimento": 0}, {"texto": novo, "sentimento": 0}, {"texto": novo, "sentimento": 1}]
+    resultado = importa(cliente, reviews)
+    assert (resultado["inseridos"], resultado["atualizados"], resultado["inalterados"]) == (1, 2, 3)
+
+    atualizados = busca_reviews(textos + [novo], TipoModelo.PIPELINE_SCIKIT_LEARN)
+    assert [atualizados[texto][0] for texto in textos + [novo]] == [1, 0, 0, 1, 0, 1]
+    # Os reviews atualizados mantêm o uid
+    assert all(atualizados[texto][2] == gravados[texto][2] for texto in textos)
+
+
+# Método para testar se o rótulo importado substitui o estágio da cascata e se o índice único impede textos repetidos
+def test_importacao_cascata_e_indice_unico(cliente):
+    texto = f"app bom {uuid.uuid4().hex}"
+    session = Session()
+    try:
+        session.add(Review(texto=texto, sentimento=0, modelo=TipoModelo.CASCATA, estagio=TipoModelo.PIPELINE_SCIKIT_LEARN))
+        session.commit()
+        session.add(Review(texto=texto, sentimento=1, modelo=TipoModelo.CASCATA))
+        with pytest.raises(IntegrityError):
+            session.commit()
+        session.rollback()
+    finally:
+        session.close()
+
+    resultado = importa(cliente, [{"texto": texto, "sentimento": 1}], TipoModelo.CASCATA)
+    assert (resultado["inseridos"], resultado["atualizados"]) == (0, 1)
+    assert busca_reviews([texto], TipoModelo.CASCATA)[texto][:2] == (1, None)
+
+
+# Método para testar se importações simultâneas dos mesmos textos não gravam textos repetidos
+def test_importacao_concorrente(cliente):
+    textos = [f"app {indice} {uuid.uuid4().hex}" for indice in range(50)]
+    reviews = [{"texto": texto, "sentimento": 1} for texto in textos]
+    resultados = []
+
+    def importa_em_thread():
+        resultados.append(importa(aplicacao.app.test_client(), reviews))
+
+    linhas = [threading.Thread(target=importa_em_thread) for _ in range(4)]
+    for linha in linhas:
+        linha.start()
+    for linha in linhas:
+        linha.join()
+
+    assert all("error" not in resultado for resultado in resultados)
+    assert sum(resultado["inseridos"] for resultado in resultados) == len(textos)
+    assert sum(resultado["inalterados"] for resultado in resultados) == 3 * len(textos)
+    session = Session()
+    try:
+        repetidos = session.query(Review.texto).filter(Review.texto.in_(textos)) \
+            .group_by(Review.modelo, Review.texto).having(func.count() > 1).all()
+        assert repetidos == []
+    finally:
+        session.close()
+
+
+# Método para testar as validações da importação
+def test_importacao_erros(cliente, monkeypatch):
+    monkeypatch.setattr(aplicacao, "TAMANHO_MAXIMO_IMPORTACAO", 2)
+
+    assert importa(cliente, [{"texto": "bom", "sentimento": 1}], "inexistente") == {"error": "Tipo de modelo não suportado"}
+    assert importa(cliente, []) == {"error": "Nenhum review informado na importação"}
+    assert importa(cliente, [{"texto": "a", "sentimento": 1}] * 3) == \
+        {"error": "Importação excede o tamanho máximo de 2 reviews"}
+    assert importa(cliente, [{"texto": "a", "sentimento": 1}, {"texto": "", "sentimento": 2}]) == \
+        {"error": "Reviews sem texto ou com sentimento diferente de 0 e 1 nas posições [1]"}
+
+
+# Método para testar a remoção em lote pelos ids e pelos filtros, com a duração informada
+def test_remocao_lote(cliente):
+    textos = [f"app {indice} {uuid.uuid4().hex}" for indice in range(4)]
+    importa(cliente, [{"texto": texto, "sentimento": 1} for texto in textos])
+    uids = [uid for _, _, uid in busca_reviews(textos, TipoModelo.PIPELINE_SCIKIT_LEARN).values()]
+
+    resultado = cliente.delete("/review/batch", json={"ids": uids[:2] + [str(uuid.uuid4())]}).get_json()
+    assert resultado["removidos"] == 2
+    assert isinstance(resultado["duracao_ms"], float) and resultado["duracao_ms"] >= 0
+    assert len(busca_reviews(textos, TipoModelo.PIPELINE_SCIKIT_LEARN)) == 2
+
+    # Filtros: apenas os reviews negativos do modelo criados hoje
+    modelo = TipoModelo.MODEL_TRANSFORMERS_QUANTIZADO
+    filtrados = [f"app {indice} {uuid.uuid4().hex}" for indice in range(4)]
+    importa(cliente, [{"texto": texto, "sentimento": indice % 2} for indice, texto in enumerate(filtrados)], modelo)
+    hoje = date.today().isoformat()
+    resultado = cliente.delete("/review/batch", json={"modelo": modelo, "sentimento": 0, "inicio": hoje, "fim": hoje}).get_json()
+    assert resultado["removidos"] == 2
+    assert sorted(busca_reviews(filtrados, modelo)) == sorted(filtrados[1::2])
+
+
+# Método para testar as validações da remoção em lote
+def test_remocao_lote_erros(cliente, monkeypatch):
+    monkeypatch.setattr(aplicacao, "TAMANHO_MAXIMO_IMPORTACAO", 2)
+
+    assert cliente.delete("/review/batch", json={}).get_json() == \
+        {"error": "Informe os ids ou ao menos um filtro dos reviews a remover"}
+    assert cliente.delete("/review/batch", json={"inicio": "01/06/2024"}).get_json() == \
+        {"error": "Data inválida, use o formato AAAA-MM-DD"}
+    assert cliente.delete("/review/batch", json={"ids": ["a", "b", "c"]}).get_json() == \
+        {"error": "Lista excede o tamanho máximo de 2 ids"}
+
+
+# Método para testar se um erro do banco na importação ou na remoção é retornado como erro tratado
+def test_lote_erro_banco(cliente, monkeypatch):
+    def falha(*args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(RepositorioReview, "importa_lote", staticmethod(falha))
+    monkeypatch.setattr(RepositorioReview, "remove_lote", staticmethod(falha))
+
+    resposta = cliente.put("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN,
+                                                  "reviews": [{"texto": "bom", "sentimento": 1}]})
+    assert resposta.status_code == 200
+    assert resposta.get_json() == {"error": "Não foi possível importar os reviews :/"}
+    resposta = cliente.delete("/review/batch", json={"ids": [str(uuid.uuid4())]})
+    assert resposta.status_code == 200
+    assert resposta.get_json() == {"error": "Não foi possível remover os reviews :/"}
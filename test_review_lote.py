@@ -0,0 +1,80 @@
+import uuid
+
+import numpy as np
+import pytest
+
+import app as aplicacao
+from model import Analisador, TipoModelo
+
+
+# To run: pytest -v test_review_lote.py
+
+@pytest.fixture
+def analisados(monkeypatch):
+    """ Substitui a predição por uma regra fixa (sentimento 1 para textos com "bom") e guarda os
+    textos enviados ao modelo em cada chamada, para testar a rota sem depender dos artefatos.
+    """
+    chamadas = []
+
+    def analisar_com_estagio(textos, tipo_modelo):
+        chamadas.append(list(textos))
+        return np.array([int("bom" in texto) for texto in textos]), [None] * len(textos)
+
+    monkeypatch.setattr(Analisador, "analisar_com_estagio", staticmethod(analisar_com_estagio))
+    return chamadas
+
+
+# Método para testar se o lote devolve os resultados na ordem enviada, com os erros de cada texto
+def test_lote_ordem_e_erros(cliente, analisados):
+    sufixo = uuid.uuid4().hex
+    existente = f"app bom já gravado {sufixo}"
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": [existente]})
+    assert "review" in resposta.get_json()["resultados"][0]
+
+    textos = [f"app bom {sufixo}", "", f"app ruim {sufixo}", existente, f"app bom {sufixo}"]
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": textos})
+    resultados = resposta.get_json()["resultados"]
+
+    assert [resultado["indice"] for resultado in resultados] == list(range(len(textos)))
+    assert resultados[0]["review"]["texto"] == textos[0] and resultados[0]["review"]["sentimento"] == 1
+    assert resultados[1]["error"] == "Texto do review não informado"
+    assert resultados[2]["review"]["texto"] == textos[2] and resultados[2]["review"]["sentimento"] == 0
+    assert resultados[3]["error"] == "Review já existente na base :/"
+    assert resultados[4]["error"] == "Review repetido no lote"
+
+    # Uma única chamada ao modelo no segundo lote, apenas com os textos novos e sem repetições
+    assert analisados[-1] == [textos[0], textos[2]]
+
+
+# Método para testar se textos já analisados por outro lote vêm do cache de predições, sem passar pelo modelo
+def test_lote_cache_predicoes(cliente, analisados):
+    sufixo = uuid.uuid4().hex
+    textos = [f"bom {sufixo}", f"ruim {sufixo}"]
+    cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": textos})
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.MODEL_SCIKIT_LEARN, "textos": textos})
+    assert [resultado["review"]["sentimento"] for resultado in resposta.get_json()["resultados"]] == [1, 0]
+
+    # O cache é por modelo: o segundo lote passa pelo modelo, o terceiro (espaços extras) não
+    assert len(analisados) == 2
+    espacados = [f"  {texto}  " for texto in textos]
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.MODEL_SCIKIT_LEARN, "textos": espacados})
+    assert [resultado["review"]["sentimento"] for resultado in resposta.get_json()["resultados"]] == [1, 0]
+    assert len(analisados) == 2
+
+
+# Método para testar os limites do lote: modelo, lote vazio e tamanho máximo
+def test_lote_limites(cliente, analisados, monkeypatch):
+    monkeypatch.setattr(aplicacao, "TAMANHO_MAXIMO_LOTE", 3)
+
+    resposta = cliente.post("/review/batch", json={"modelo": "inexistente", "textos": ["bom"]})
+    assert resposta.get_json() == {"error": "Tipo de modelo não suportado"}
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": []})
+    assert resposta.get_json() == {"error": "Nenhum texto informado no lote"}
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN,
+                                                   "textos": [f"bom {indice} {uuid.uuid4().hex}" for indice in range(4)]})
+    assert resposta.get_json() == {"error": "Lote excede o tamanho máximo de 3 textos"}
+    assert analisados == []
+
+    textos = [f"bom {indice} {uuid.uuid4().hex}" for indice in range(3)]
+    resposta = cliente.post("/review/batch", json={"modelo": TipoModelo.PIPELINE_SCIKIT_LEARN, "textos": textos})
+    assert [resultado["review"]["texto"] for resultado in resposta.get_json()["resultados"]] == textos